@@ -45,6 +45,26 @@ SHIP_PRICE_GOOGLE_SHEET_CELL_RANGE = env.str(
 RUN_WEEKLY_MARKET_DATA_FULL_SYNC = env.bool(
     "RUN_WEEKLY_MARKET_DATA_FULL_SYNC", default=False
 )
+MARKET_DATA_BULK_INGEST = env.bool("MARKET_DATA_BULK_INGEST", default=True)
+# How long a users permissions, groups and characters are cached between requests.
+# Changes invalidate the cache straight away in the process which made them, other
+# processes only see them once this expires unless CACHES is shared between them.
+ACCESS_IDENTITY_CACHE_SECONDS = env.int("ACCESS_IDENTITY_CACHE_SECONDS", default=60)
+# How long the navigation badge counts are cached, changes to the counted rows clear
+# them sooner but fleets start and finish without any change being made.
+BADGE_COUNTS_CACHE_SECONDS = env.int("BADGE_COUNTS_CACHE_SECONDS", default=60)
+# How long the market data tables cache their row counts for each search.
+MARKET_DATA_COUNT_CACHE_SECONDS = env.int("MARKET_DATA_COUNT_CACHE_SECONDS", default=30)
+# Run jobs like profit transfers inside the request which submitted them instead of
+# queueing them for `manage.py run_jobs` or the RunJobs cron.
+JOBS_RUN_IMMEDIATELY = env.bool("JOBS_RUN_IMMEDIATELY", default=False)
+# How many tenants each cron runs in at once, each in its own thread and database
+# connection.
+CRON_TENANT_WORKERS = env.int("CRON_TENANT_WORKERS", default=4)
+# When set crons only run for the tenants with these schema names.
+CRON_TENANTS = env.list("CRON_TENANTS", default=[])
+# How long the per tenant timing and outcome of each cron run is kept for.
+CRON_TENANT_RUN_RETENTION_DAYS = env.int("CRON_TENANT_RUN_RETENTION_DAYS", default=30)
 # GENERAL
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#debug
@@ -144,6 +164,7 @@ TENANT_APPS = [
     "goosetools.mapbot.apps.MapBotConfig",
     "goosetools.industry.apps.IndustryConfig",
     "goosetools.discord_bot.apps.DiscordBotConfig",
+    "goosetools.jobs.apps.JobsConfig",
 ]
 
 if not SINGLE_TENANT:
@@ -377,8 +398,10 @@ CRON_CLASSES = [
     "goosetools.industry.cron.lookup_ship_prices.LookupShipPrices",
     "goosetools.industry.cron.cleanup_old_orders.CleanUpOldOrders",
     "goosetools.market.cron.get_market_data.GetMarketData",
+    "goosetools.pricing.cron.market_data_partitions.MarketDataPartitions",
     "goosetools.users.cron.update_discord_roles.UpdateDiscordRoles",
     "goosetools.fleets.cron.repeat_groups.RepeatGroups",
+    "goosetools.jobs.cron.run_jobs.RunJobs",
 ]
 
 if RUN_WEEKLY_MARKET_DATA_FULL_SYNC:
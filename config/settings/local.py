@@ -25,6 +25,7 @@ CACHES = {
 }
 
 STUB_DISCORD = env.bool("STUB_DISCORD", default=False)
+JOBS_RUN_IMMEDIATELY = env.bool("JOBS_RUN_IMMEDIATELY", default=True)
 
 # WhiteNoise
 # ------------------------------------------------------------------------------
@@ -25,6 +25,10 @@ SECRET_KEY = env.str(
 
 STUB_DISCORD = env.bool("STUB_DISCORD", True)
 
+JOBS_RUN_IMMEDIATELY = True
+# Tenants are run in the test case's own connection so they see its data.
+CRON_TENANT_WORKERS = 1
+
 # WhiteNoise
 # ------------------------------------------------------------------------------
 # http://whitenoise.evans.io/en/latest/django.html#using-whitenoise-in-development
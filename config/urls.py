@@ -34,6 +34,7 @@ urlpatterns = [
                 path("mapbot/", include("mapbot.urls")),
                 path("industry/", include("industry.urls")),
                 path("pricing/", include("pricing.urls")),
+                path("jobs/", include("jobs.urls")),
             ]
             + settings.ENV_SPECIFIC_URLS
         ),
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BankConfig(AppConfig):
     name = "goosetools.bank"
+
+    def ready(self) -> None:
+        # noinspection PyUnresolvedReferences
+        import goosetools.bank.signals  # pylint: disable=unused-import
@@ -0,0 +1,204 @@
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import connection, transaction
+
+# Each row is the change one transaction makes: isk, non debt eggs and debt eggs
+# for its item, plus the user those eggs are owed to.
+ISK_TRANSACTION_DELTAS_SQL = """
+SELECT t.item_id, t.isk AS isk, 0 AS eggs, 0 AS debt_eggs,
+    NULL::integer AS counterparty_id
+FROM bank_isktransaction t
+"""
+
+EGG_TRANSACTION_DELTAS_SQL = """
+SELECT t.item_id, 0 AS isk,
+    CASE WHEN t.debt THEN 0 ELSE t.eggs END AS eggs,
+    CASE WHEN t.debt THEN t.eggs ELSE 0 END AS debt_eggs,
+    t.counterparty_id
+FROM bank_eggtransaction t
+"""
+
+# An items isk counts towards whoever currently owns it, its loot group and that
+# groups fleet, so the deltas are joined onto the items current placement.
+PLACED_DELTAS_SQL = """
+SELECT d.item_id, d.isk * %(sign)s AS isk, d.eggs * %(sign)s AS eggs,
+    d.debt_eggs * %(sign)s AS debt_eggs, d.counterparty_id,
+    i.loot_group_id, fa.fleet_id, c.user_id AS owner_id
+FROM ({deltas_sql}) d
+JOIN items_inventoryitem i ON i.id = d.item_id
+LEFT JOIN ownership_lootgroup g ON g.id = i.loot_group_id
+LEFT JOIN fleets_fleetanom fa ON fa.id = g.fleet_anom_id
+LEFT JOIN items_itemlocation l ON l.id = i.location_id
+LEFT JOIN items_characterlocation cl ON cl.id = l.character_location_id
+LEFT JOIN users_character c ON c.id = cl.character_id
+"""
+
+ITEM_BALANCES_SQL = """
+SELECT item_id, sum(isk) AS isk, sum(eggs + debt_eggs) AS eggs,
+    sum(eggs) AS non_debt_eggs
+FROM deltas GROUP BY item_id
+"""
+
+LOOT_GROUP_BALANCES_SQL = """
+SELECT loot_group_id, sum(isk) AS isk, sum(eggs + debt_eggs) AS eggs,
+    sum(eggs) AS non_debt_eggs
+FROM deltas WHERE loot_group_id IS NOT NULL GROUP BY loot_group_id
+"""
+
+FLEET_BALANCES_SQL = """
+SELECT fleet_id, sum(isk) AS isk, sum(eggs + debt_eggs) AS eggs,
+    sum(eggs) AS non_debt_eggs
+FROM deltas WHERE fleet_id IS NOT NULL GROUP BY fleet_id
+"""
+
+USER_BALANCES_SQL = """
+SELECT user_id, sum(isk) AS isk, sum(eggs) AS eggs, sum(debt_eggs) AS debt_eggs
+FROM (
+    SELECT owner_id AS user_id, isk, 0 AS eggs, 0 AS debt_eggs
+    FROM deltas WHERE owner_id IS NOT NULL
+    UNION ALL
+    SELECT counterparty_id, 0, eggs, debt_eggs
+    FROM deltas WHERE counterparty_id IS NOT NULL
+) users
+GROUP BY user_id
+"""
+
+# (table, key, balances query, balance columns)
+LEDGERS = [
+    (
+        "bank_inventoryitembalance",
+        "item_id",
+        ITEM_BALANCES_SQL,
+        ["isk", "eggs", "non_debt_eggs"],
+    ),
+    (
+        "bank_lootgroupbalance",
+        "loot_group_id",
+        LOOT_GROUP_BALANCES_SQL,
+        ["isk", "eggs", "non_debt_eggs"],
+    ),
+    (
+        "bank_fleetbalance",
+        "fleet_id",
+        FLEET_BALANCES_SQL,
+        ["isk", "eggs", "non_debt_eggs"],
+    ),
+    ("bank_userbalance", "user_id", USER_BALANCES_SQL, ["isk", "eggs", "debt_eggs"]),
+]
+
+
+def _add_to_ledgers_sql(deltas_sql: str, include_items: bool = True) -> str:
+    """
+    A single statement adding the deltas selected by deltas_sql, multiplied by
+    %(sign)s, onto every ledger. A user who both owns an item and is owed its eggs
+    only gets one row as a statement can only upsert the same row once.
+    """
+    upserts = []
+    for table, key, balances_sql, columns in LEDGERS:
+        if table == "bank_inventoryitembalance" and not include_items:
+            continue
+        increments = ", ".join(f"{c} = {table}.{c} + EXCLUDED.{c}" for c in columns)
+        upserts.append(
+            f"""
+            INSERT INTO {table} ({key}, {", ".join(columns)})
+            {balances_sql}
+            ON CONFLICT ({key}) DO UPDATE SET {increments}
+            """
+        )
+    ctes = ",\n".join(
+        f"ledger_{i} AS ({upsert})" for i, upsert in enumerate(upserts[:-1])
+    )
+    return f"""
+    WITH deltas AS ({PLACED_DELTAS_SQL.format(deltas_sql=deltas_sql)}),
+    {ctes}
+    {upserts[-1]}
+    """
+
+
+def _apply_transactions(deltas_sql: str, transaction_ids: Iterable[int], sign: int):
+    transaction_ids = list(transaction_ids)
+    if not transaction_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _add_to_ledgers_sql(f"{deltas_sql} WHERE t.id = ANY(%(ids)s)"),
+            {"sign": sign, "ids": transaction_ids},
+        )
+
+
+def apply_isk_transactions(transaction_ids: Iterable[int], sign: int = 1):
+    """
+    Adds, or with a sign of -1 takes away, the given isk transactions as they are
+    currently stored in the database to the balance ledgers.
+    """
+    _apply_transactions(ISK_TRANSACTION_DELTAS_SQL, transaction_ids, sign)
+
+
+def apply_egg_transactions(transaction_ids: Iterable[int], sign: int = 1):
+    _apply_transactions(EGG_TRANSACTION_DELTAS_SQL, transaction_ids, sign)
+
+
+def shift_item_balances(item_ids: Iterable[int], sign: int):
+    """
+    Takes (sign -1) the given items balances away from their current owner, loot
+    group and fleet or adds (sign 1) them back on. Call with -1 before items change
+    owner or loot group and with 1 afterwards to move their balances along with them.
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    # Eggs are owed to the counterparty and not the owner so no user is given them,
+    # only the loot group.
+    item_deltas_sql = """
+    SELECT b.item_id, b.isk, b.non_debt_eggs AS eggs,
+        b.eggs - b.non_debt_eggs AS debt_eggs, NULL::integer AS counterparty_id
+    FROM bank_inventoryitembalance b
+    WHERE b.item_id = ANY(%(ids)s)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _add_to_ledgers_sql(item_deltas_sql, include_items=False),
+            {"sign": sign, "ids": item_ids},
+        )
+
+
+def rebuild_balance_ledgers():
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table, _, _, _ in LEDGERS:
+            cursor.execute(f"DELETE FROM {table}")
+        for deltas_sql in (ISK_TRANSACTION_DELTAS_SQL, EGG_TRANSACTION_DELTAS_SQL):
+            cursor.execute(_add_to_ledgers_sql(deltas_sql), {"sign": 1})
+
+
+def find_inconsistent_balances() -> Dict[str, List[Tuple]]:
+    """
+    Recalculates every balance from the transactions and returns, per ledger table,
+    (key, expected balances, stored balances) for each row which does not match.
+    """
+    all_deltas_sql = (
+        f"{ISK_TRANSACTION_DELTAS_SQL} UNION ALL {EGG_TRANSACTION_DELTAS_SQL}"
+    )
+    inconsistent = {}
+    with connection.cursor() as cursor:
+        for table, key, balances_sql, columns in LEDGERS:
+            expected = ", ".join(f"coalesce(e.{c}, 0)" for c in columns)
+            stored = ", ".join(f"coalesce(s.{c}, 0)" for c in columns)
+            mismatched = " OR ".join(
+                f"coalesce(e.{c}, 0) <> coalesce(s.{c}, 0)" for c in columns
+            )
+            cursor.execute(
+                f"""
+                WITH deltas AS (
+                    {PLACED_DELTAS_SQL.format(deltas_sql=all_deltas_sql)}
+                ),
+                expected AS ({balances_sql})
+                SELECT coalesce(e.{key}, s.{key}), ARRAY[{expected}], ARRAY[{stored}]
+                FROM expected e
+                FULL OUTER JOIN {table} s ON s.{key} = e.{key}
+                WHERE {mismatched}
+                ORDER BY 1
+                """,
+                {"sign": 1},
+            )
+            inconsistent[table] = cursor.fetchall()
+    return inconsistent
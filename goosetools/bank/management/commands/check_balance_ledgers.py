@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import tenant_context
+
+from goosetools.bank.ledger import find_inconsistent_balances, rebuild_balance_ledgers
+from goosetools.tenants.models import Client
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "check_balance_ledgers"
+    help = (
+        "Verifies every tenants item, loot group and user balance ledgers against "
+        "their isk and egg transactions, optionally rebuilding them if they do not "
+        "match."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Rebuild the ledgers from scratch without checking them first.",
+        )
+
+    def handle(self, *args, **options):
+        total_inconsistent = 0
+        for tenant in Client.objects.all():
+            with tenant_context(tenant):
+                if tenant.name != "public":
+                    if options["rebuild"]:
+                        rebuild_balance_ledgers()
+                        print(f"Rebuilt balance ledgers for {tenant.name}")
+                    else:
+                        print(f"Checking balance ledgers for {tenant.name}")
+                        total_inconsistent += self.check_ledgers(options["fix"])
+        if total_inconsistent and not options["fix"]:
+            print(
+                f"Found {total_inconsistent} inconsistent balances, rerun with --fix "
+                f"to rebuild them."
+            )
+            raise SystemExit(1)
+
+    @staticmethod
+    def check_ledgers(fix):
+        total = 0
+        for table, inconsistent in find_inconsistent_balances().items():
+            for key, expected, stored in inconsistent:
+                print(f"   {table}: {key} should be {expected} but is {stored}")
+            print(f"   {table}: {len(inconsistent)} inconsistent balances.")
+            total += len(inconsistent)
+        if total and fix:
+            rebuild_balance_ledgers()
+            print("   Rebuilt balance ledgers.")
+        return total
@@ -0,0 +1,139 @@
+# Generated by Django 3.1.4 on 2021-08-21 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+CREATE TEMPORARY TABLE ledger_deltas ON COMMIT DROP AS
+SELECT d.item_id, d.isk, d.eggs, d.debt_eggs, d.counterparty_id,
+    i.loot_group_id, c.user_id AS owner_id
+FROM (
+    SELECT item_id, isk, 0 AS eggs, 0 AS debt_eggs,
+        NULL::integer AS counterparty_id
+    FROM bank_isktransaction
+    UNION ALL
+    SELECT item_id, 0,
+        CASE WHEN debt THEN 0 ELSE eggs END,
+        CASE WHEN debt THEN eggs ELSE 0 END,
+        counterparty_id
+    FROM bank_eggtransaction
+) d
+JOIN items_inventoryitem i ON i.id = d.item_id
+LEFT JOIN items_itemlocation l ON l.id = i.location_id
+LEFT JOIN items_characterlocation cl ON cl.id = l.character_location_id
+LEFT JOIN users_character c ON c.id = cl.character_id;
+
+INSERT INTO bank_inventoryitembalance (item_id, isk, eggs, non_debt_eggs)
+SELECT item_id, sum(isk), sum(eggs + debt_eggs), sum(eggs)
+FROM ledger_deltas GROUP BY item_id;
+
+INSERT INTO bank_lootgroupbalance (loot_group_id, isk, eggs, non_debt_eggs)
+SELECT loot_group_id, sum(isk), sum(eggs + debt_eggs), sum(eggs)
+FROM ledger_deltas WHERE loot_group_id IS NOT NULL GROUP BY loot_group_id;
+
+INSERT INTO bank_userbalance (user_id, isk, eggs, debt_eggs)
+SELECT user_id, sum(isk), sum(eggs), sum(debt_eggs)
+FROM (
+    SELECT owner_id AS user_id, isk, 0 AS eggs, 0 AS debt_eggs
+    FROM ledger_deltas WHERE owner_id IS NOT NULL
+    UNION ALL
+    SELECT counterparty_id, 0, eggs, debt_eggs
+    FROM ledger_deltas WHERE counterparty_id IS NOT NULL
+) users
+GROUP BY user_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0016_auto_20210508_1403"),
+        ("ownership", "0007_auto_20210516_1217"),
+        ("items", "0011_auto_20210503_1822"),
+        ("bank", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryItemBalance",
+            fields=[
+                (
+                    "item",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ledger_balance",
+                        serialize=False,
+                        to="items.inventoryitem",
+                    ),
+                ),
+                (
+                    "isk",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "non_debt_eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LootGroupBalance",
+            fields=[
+                (
+                    "loot_group",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ledger_balance",
+                        serialize=False,
+                        to="ownership.lootgroup",
+                    ),
+                ),
+                (
+                    "isk",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "non_debt_eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UserBalance",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ledger_balance",
+                        serialize=False,
+                        to="users.gooseuser",
+                    ),
+                ),
+                (
+                    "isk",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "debt_eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
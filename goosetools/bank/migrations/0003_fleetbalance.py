@@ -0,0 +1,52 @@
+# Generated by Django 3.1.4 on 2021-09-01 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+INSERT INTO bank_fleetbalance (fleet_id, isk, eggs, non_debt_eggs)
+SELECT fa.fleet_id, sum(b.isk), sum(b.eggs), sum(b.non_debt_eggs)
+FROM bank_lootgroupbalance b
+JOIN ownership_lootgroup g ON g.id = b.loot_group_id
+JOIN fleets_fleetanom fa ON fa.id = g.fleet_anom_id
+GROUP BY fa.fleet_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fleets", "0008_fleet_start_id_idx"),
+        ("bank", "0002_balance_ledgers"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FleetBalance",
+            fields=[
+                (
+                    "fleet",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ledger_balance",
+                        serialize=False,
+                        to="fleets.fleet",
+                    ),
+                ),
+                (
+                    "isk",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "non_debt_eggs",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -3,7 +3,9 @@ from django.db.models.aggregates import Sum
 from djmoney.models.fields import MoneyField
 from djmoney.money import Money
 
+from goosetools.fleets.models import Fleet
 from goosetools.items.models import InventoryItem
+from goosetools.ownership.models import LootGroup
 from goosetools.users.models import GooseUser
 
 
@@ -77,33 +79,74 @@ class EggTransaction(models.Model):
         indexes = [models.Index(fields=["time"])]
 
 
-def isk_balance(self):
-    return to_isk(
-        model_sum(
-            IskTransaction.objects.filter(
-                item__location__character_location__character__user=self
-            ),
-            "isk",
-        )
+# The balance ledgers below are kept up to date by the receivers in
+# goosetools.bank.signals as transactions are written, so reading a balance is a
+# single row lookup. `manage.py check_balance_ledgers` verifies and rebuilds them.
+class InventoryItemBalance(models.Model):
+    item = models.OneToOneField(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ledger_balance",
     )
+    isk = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    non_debt_eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
 
 
-def debt_egg_balance(self):
-    return to_isk(
-        model_sum(
-            EggTransaction.objects.filter(counterparty=self, debt=True),
-            "eggs",
-        )
+class LootGroupBalance(models.Model):
+    loot_group = models.OneToOneField(
+        LootGroup,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ledger_balance",
     )
+    isk = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    non_debt_eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
 
 
-def egg_balance(self):
-    return to_isk(
-        model_sum(
-            EggTransaction.objects.filter(counterparty=self, debt=False),
-            "eggs",
-        )
+class FleetBalance(models.Model):
+    fleet = models.OneToOneField(
+        Fleet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ledger_balance",
     )
+    isk = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    non_debt_eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+
+class UserBalance(models.Model):
+    user = models.OneToOneField(
+        GooseUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ledger_balance",
+    )
+    isk = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    debt_eggs = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    @staticmethod
+    def balance(user: GooseUser, field: str):
+        result = (
+            UserBalance.objects.filter(user=user).values_list(field, flat=True).first()
+        )
+        return to_isk(result or 0)
+
+
+def isk_balance(self):
+    return UserBalance.balance(self, "isk")
+
+
+def debt_egg_balance(self):
+    return UserBalance.balance(self, "debt_eggs")
+
+
+def egg_balance(self):
+    return UserBalance.balance(self, "eggs")
 
 
 # TODO Fix dependency ordering instead of monkey patching
@@ -0,0 +1,79 @@
+from django.db.models.signals import post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from goosetools.bank.ledger import (
+    apply_egg_transactions,
+    apply_isk_transactions,
+    shift_item_balances,
+)
+from goosetools.bank.models import EggTransaction, IskTransaction
+from goosetools.items.models import InventoryItem
+
+# These keep the balance ledgers in step with every transaction written through the
+# ORM. Requests are atomic so a ledger update commits or rolls back with the change
+# which caused it. An edited transaction is taken off the ledgers as it is currently
+# stored before the save and its new values added back on afterwards.
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(pre_save, sender=IskTransaction)
+@receiver(pre_delete, sender=IskTransaction)
+def isk_transaction_removed(sender, instance, **kwargs):
+    if instance.pk is not None:
+        apply_isk_transactions([instance.pk], -1)
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_save, sender=IskTransaction)
+def isk_transaction_saved(sender, instance, **kwargs):
+    apply_isk_transactions([instance.pk])
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(pre_save, sender=EggTransaction)
+@receiver(pre_delete, sender=EggTransaction)
+def egg_transaction_removed(sender, instance, **kwargs):
+    if instance.pk is not None:
+        apply_egg_transactions([instance.pk], -1)
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_save, sender=EggTransaction)
+def egg_transaction_saved(sender, instance, **kwargs):
+    apply_egg_transactions([instance.pk])
+
+
+def _placement(instance):
+    # Read from __dict__ so a deferred field is not loaded just to remember it.
+    return instance.__dict__.get("location_id"), instance.__dict__.get("loot_group_id")
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_init, sender=InventoryItem)
+def inventory_item_loaded(sender, instance, **kwargs):
+    instance._ledger_placement = _placement(instance)
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(pre_save, sender=InventoryItem)
+def inventory_item_moving(sender, instance, **kwargs):
+    instance._ledger_moving = (
+        instance.pk is not None and instance._ledger_placement != _placement(instance)
+    )
+    if instance._ledger_moving:
+        shift_item_balances([instance.pk], -1)
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_save, sender=InventoryItem)
+def inventory_item_moved(sender, instance, **kwargs):
+    if instance._ledger_moving:
+        shift_item_balances([instance.pk], 1)
+    instance._ledger_placement = _placement(instance)
@@ -0,0 +1,133 @@
+from decimal import Decimal
+
+from django.utils import timezone
+
+from goosetools.bank.ledger import find_inconsistent_balances, rebuild_balance_ledgers
+from goosetools.bank.models import (
+    EggTransaction,
+    FleetBalance,
+    IskTransaction,
+    UserBalance,
+)
+from goosetools.items.models import CharacterLocation, ItemLocation
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase, isk
+
+
+class BalanceLedgerTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.loot_group = self.a_loot_group(self.a_fleet())
+        self.item = self.an_item(self.loot_group)
+
+    def an_isk_transaction(self, amount):
+        return IskTransaction.objects.create(
+            item=self.item,
+            quantity=1,
+            time=timezone.now(),
+            isk=isk(amount),
+            transaction_type="buyback",
+        )
+
+    def an_egg_transaction(self, amount, counterparty, debt):
+        return EggTransaction.objects.create(
+            item=self.item,
+            quantity=1,
+            time=timezone.now(),
+            eggs=isk(amount),
+            debt=debt,
+            counterparty=counterparty,
+        )
+
+    def assert_ledgers_consistent(self):
+        self.assertEqual(
+            find_inconsistent_balances(),
+            {
+                "bank_inventoryitembalance": [],
+                "bank_lootgroupbalance": [],
+                "bank_fleetbalance": [],
+                "bank_userbalance": [],
+            },
+        )
+
+    def test_balances_follow_created_edited_and_deleted_transactions(self):
+        isk_transaction = self.an_isk_transaction(100)
+        self.an_egg_transaction(30, self.other_user, debt=False)
+        debt = self.an_egg_transaction(20, self.user, debt=True)
+
+        self.assertEqual(self.user.isk_balance(), isk(100))
+        self.assertEqual(self.user.egg_balance(), isk(0))
+        self.assertEqual(self.user.debt_egg_balance(), isk(20))
+        self.assertEqual(self.other_user.egg_balance(), isk(30))
+        self.assertEqual(self.item.isk_balance(), isk(100))
+        self.assertEqual(self.item.egg_balance(), isk(50))
+        self.assertEqual(self.loot_group.isk_balance(), isk(100))
+        self.assertEqual(self.loot_group.non_debt_egg_balance(), isk(30))
+
+        isk_transaction.isk = isk(60)
+        isk_transaction.save()
+        debt.delete()
+
+        self.assertEqual(self.user.isk_balance(), isk(60))
+        self.assertEqual(self.user.debt_egg_balance(), isk(0))
+        self.assertEqual(self.item.isk_balance(), isk(60))
+        self.assertEqual(self.item.egg_balance(), isk(30))
+        self.assertEqual(self.loot_group.isk_balance(), isk(60))
+        self.assert_ledgers_consistent()
+
+    def test_moving_an_item_moves_its_isk_to_the_new_owner(self):
+        self.an_isk_transaction(100)
+        self.an_egg_transaction(30, self.user, debt=False)
+
+        char_loc = CharacterLocation.objects.create(character=self.other_char)
+        self.item.location = ItemLocation.objects.create(character_location=char_loc)
+        self.item.save()
+
+        self.assertEqual(self.user.isk_balance(), isk(0))
+        self.assertEqual(self.other_user.isk_balance(), isk(100))
+        # Eggs stay with whoever they are owed to.
+        self.assertEqual(self.user.egg_balance(), isk(30))
+        self.assertEqual(self.loot_group.isk_balance(), isk(100))
+        self.assert_ledgers_consistent()
+
+    def test_fleet_balances_follow_their_loot_groups(self):
+        fleet = self.loot_group.fleet()
+        self.an_egg_transaction(30, self.other_user, debt=False)
+        self.an_egg_transaction(20, self.user, debt=True)
+
+        self.assertEqual(
+            FleetBalance.objects.get(fleet=fleet).non_debt_eggs, Decimal("30")
+        )
+
+        other_fleet = self.a_fleet(fleet_name="Other Fleet")
+        self.item.loot_group = self.a_loot_group(other_fleet)
+        self.item.save()
+
+        self.assertEqual(FleetBalance.objects.get(fleet=fleet).non_debt_eggs, 0)
+        self.assertEqual(
+            FleetBalance.objects.get(fleet=other_fleet).non_debt_eggs, Decimal("30")
+        )
+        self.assert_ledgers_consistent()
+
+    def test_deleting_an_item_takes_its_balances_off_the_ledgers(self):
+        self.an_isk_transaction(100)
+        self.an_egg_transaction(30, self.other_user, debt=False)
+
+        self.item.delete()
+
+        self.assertEqual(self.user.isk_balance(), isk(0))
+        self.assertEqual(self.other_user.egg_balance(), isk(0))
+        self.assertEqual(self.loot_group.isk_balance(), isk(0))
+        self.assert_ledgers_consistent()
+
+    def test_rebuilding_fixes_a_drifted_ledger(self):
+        self.an_isk_transaction(100)
+        UserBalance.objects.filter(user=self.user).update(isk=999)
+
+        inconsistent = find_inconsistent_balances()["bank_userbalance"]
+        self.assertEqual(len(inconsistent), 1)
+        self.assertEqual(inconsistent[0][0], self.user.pk)
+
+        rebuild_balance_ledgers()
+
+        self.assertEqual(self.user.isk_balance(), isk(100))
+        self.assert_ledgers_consistent()
@@ -12,9 +12,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from goosetools.bank.ledger import shift_item_balances
 from goosetools.contracts.forms import ItemMoveAllForm
 from goosetools.contracts.models import Contract
 from goosetools.contracts.serializers import ContractSerializer
+from goosetools.core.counters import invalidate_badge_counts
 from goosetools.fleets.models import Fleet
 from goosetools.items.models import (
     CharacterLocation,
@@ -77,8 +79,14 @@ def change_contract_status(contract, status):
     if status not in ("requested", "pending"):
         contract.save_items_to_log(clear_items=False)
         if status == "accepted":
+            # The bulk update skips the ledger signals so move the items balances
+            # over to their new owner by hand.
+            item_ids = list(contract.inventoryitem_set.values_list("id", flat=True))
+            shift_item_balances(item_ids, -1)
             contract.inventoryitem_set.update(location=loc)
+            shift_item_balances(item_ids, 1)
         contract.inventoryitem_set.update(contract=None)
+        invalidate_badge_counts()
 
 
 @transaction.atomic
@@ -95,7 +103,7 @@ def accept_contract(request, pk):
 
 @transaction.atomic
 def create_contract_item_stack(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     if request.method == "POST":
         form = ItemMoveAllForm(request.POST)
         if form.is_valid():
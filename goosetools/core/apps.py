@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "goosetools.core"
+
+    def ready(self) -> None:
+        # noinspection PyUnresolvedReferences
+        import goosetools.core.signals  # pylint: disable=unused-import
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Func, IntegerField, Subquery
+from django.db.models.functions import Coalesce
+
+from goosetools.contracts.models import Contract
+from goosetools.fleets.models import (
+    active_fleets_query,
+    future_fleets_query,
+    past_fleets_query,
+)
+from goosetools.items.models import InventoryItem
+from goosetools.market.models import MarketOrder, SoldItem
+from goosetools.users.models import CorpApplication, GooseUser, UserApplication
+from goosetools.utils import bump_cache_version, tenant_cache_key
+
+
+def _count(queryset):
+    # COUNT as a plain Func so the subquery is not grouped, giving a single row.
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .annotate(count=Func(F("id"), function="COUNT"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _badge_count_annotations(gooseuser):
+    return {
+        "num_items": _count(
+            InventoryItem.objects.filter(
+                contract__isnull=True,
+                location__character_location__character__user=gooseuser,
+                quantity__gt=0,
+            )
+        ),
+        "num_orders": _count(
+            MarketOrder.objects.filter(
+                item__location__character_location__character__user=gooseuser
+            )
+        ),
+        "num_sold": _count(
+            SoldItem.objects.filter(
+                item__location__character_location__character__user=gooseuser,
+                transfered_quantity__lt=F("quantity"),
+            )
+        ),
+        "num_pending_contracts": _count(
+            Contract.objects.filter(to_char__user=gooseuser, status="pending")
+        ),
+        "num_requested_contracts": _count(
+            Contract.objects.filter(from_user=gooseuser, status="requested")
+        ),
+        "num_active_fleets": _count(active_fleets_query()),
+        "num_past_fleets": _count(past_fleets_query()),
+        "num_future_fleets": _count(future_fleets_query()),
+        "num_pending_user_apps": _count(UserApplication.unapproved_applications()),
+        "num_pending_corp_apps": _count(CorpApplication.unapproved_applications()),
+    }
+
+
+def _version_key():
+    return tenant_cache_key("badge_counts_version")
+
+
+def invalidate_badge_counts():
+    """
+    Makes every users badge counts in the current tenant be recalculated on their
+    next page load. Called by the receivers in goosetools.core.signals and by
+    anything changing the counted rows with a bulk update.
+    """
+    bump_cache_version(_version_key())
+
+
+def calculate_badge_counts(gooseuser):
+    annotations = _badge_count_annotations(gooseuser)
+    counts = (
+        GooseUser.objects.filter(pk=gooseuser.pk)
+        .annotate(**annotations)
+        .values(*annotations.keys())
+        .first()
+    )
+    counts["num_contracts"] = (
+        counts["num_pending_contracts"] + counts["num_requested_contracts"]
+    )
+    counts["all_sales"] = (
+        counts["num_items"] + counts["num_orders"] + counts["num_sold"]
+    )
+    counts["num_pending_apps"] = (
+        counts["num_pending_user_apps"] + counts["num_pending_corp_apps"]
+    )
+    return counts
+
+
+def badge_counts(gooseuser):
+    """
+    All of the navigation badge counts for a user, calculated in a single query and
+    cached until one of the counted tables changes. Fleets become active and past
+    as time passes without any write, so the cache also expires after
+    BADGE_COUNTS_CACHE_SECONDS.
+    """
+    version = cache.get(_version_key(), 0)
+    key = tenant_cache_key("badge_counts", gooseuser.pk, version)
+    counts = cache.get(key)
+    if counts is None:
+        counts = calculate_badge_counts(gooseuser)
+        cache.set(key, counts, settings.BADGE_COUNTS_CACHE_SECONDS)
+    return counts
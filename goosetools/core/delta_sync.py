@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Any, List, Tuple
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from goosetools.items.models import committed_change_seq
+
+
+class DeltaSyncMixin:
+    """
+    Lets a list endpoint be polled with `?since=<token>` for just the rows whose
+    change_seq is after the token, plus the keys of rows deleted since then. Start with
+    since=0 and pass the returned token next time, polling again straight away while
+    more is true. Nothing new is returned while changes are still being written.
+    Viewsets implement deleted_since and set delta_key to the field which deleted
+    keys refer to.
+    """
+
+    delta_limit = 1000
+    delta_key = "id"
+
+    def deleted_since(
+        self, since: int, until: int, limit: int
+    ) -> List[Tuple[int, Any]]:
+        """
+        The first limit (change_seq, key) of rows deleted after since and up to until,
+        in order.
+        """
+        raise NotImplementedError()
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get("since", None)
+        if since is None:
+            return super().list(request, *args, **kwargs)
+        try:
+            since = int(since)
+        except ValueError:
+            raise ValidationError({"since": "Must be a token returned by this API."})
+
+        # Only return changes which every change before them has committed ahead of,
+        # otherwise the token could skip past one still to commit.
+        until = committed_change_seq()
+        if until is None or until <= since:
+            return self._delta_response(since, False, [], [])
+
+        limit = self.delta_limit
+        changed = list(
+            self.filter_queryset(self.get_queryset())
+            .filter(change_seq__gt=since, change_seq__lte=until)
+            .order_by("change_seq")[:limit]
+        )
+        deleted = self.deleted_since(since, until, limit)
+        # When either list is cut short only return what happened up to the last
+        # change in it, so the next poll carries on from there without a gap.
+        upto = None
+        if len(changed) == limit:
+            upto = changed[-1].change_seq
+        if len(deleted) == limit:
+            upto = min(deleted[-1][0], upto or deleted[-1][0])
+        if upto is not None:
+            changed = [row for row in changed if row.change_seq <= upto]
+            deleted = [(seq, key) for seq, key in deleted if seq <= upto]
+        token = max(
+            [since] + [row.change_seq for row in changed] + [seq for seq, _ in deleted]
+        )
+        # A row can be deleted and added back, or changed and then deleted, between
+        # polls, so only its newest change is returned.
+        newest = {}
+        for row in changed:
+            newest[getattr(row, self.delta_key)] = row.change_seq
+        for seq, key in deleted:
+            newest[key] = max(seq, newest.get(key, seq))
+        changed = [
+            row
+            for row in changed
+            if newest[getattr(row, self.delta_key)] == row.change_seq
+        ]
+        deleted = [key for seq, key in deleted if newest[key] == seq]
+        return self._delta_response(token, upto is not None, changed, deleted)
+
+    def _delta_response(self, token: int, more: bool, changed, deleted: List[Any]):
+        return Response(
+            OrderedDict(
+                [
+                    ("token", str(token)),
+                    ("more", more),
+                    ("changed", self.get_serializer(changed, many=True).data),
+                    ("deleted", deleted),
+                ]
+            )
+        )
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+
+from goosetools.contracts.models import Contract
+from goosetools.core.counters import invalidate_badge_counts
+from goosetools.fleets.models import Fleet
+from goosetools.items.models import InventoryItem
+from goosetools.market.models import MarketOrder, SoldItem
+from goosetools.users.models import Character, CorpApplication, UserApplication
+
+COUNTED_MODELS = [
+    InventoryItem,
+    MarketOrder,
+    SoldItem,
+    Contract,
+    Fleet,
+    UserApplication,
+    CorpApplication,
+    # Moving a character to another user moves all of its items with it.
+    Character,
+]
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+def counted_model_changed(sender, instance, **kwargs):
+    invalidate_badge_counts()
+
+
+for counted_model in COUNTED_MODELS:
+    post_save.connect(counted_model_changed, sender=counted_model)
+    post_delete.connect(counted_model_changed, sender=counted_model)
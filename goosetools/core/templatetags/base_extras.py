@@ -2,18 +2,15 @@ import math as m
 import numbers
 
 from django import template
-from django.db.models.expressions import F
 from django.utils.text import capfirst
 
-from goosetools.contracts.models import Contract
+from goosetools.core.counters import badge_counts
 from goosetools.fleets.models import (
     FleetMember,
     active_fleets_query,
     future_fleets_query,
     past_fleets_query,
 )
-from goosetools.items.models import InventoryItem
-from goosetools.market.models import MarketOrder, SoldItem
 from goosetools.notifications.models import Notification
 from goosetools.users.models import CorpApplication, UserApplication
 
@@ -28,28 +25,36 @@ def notifications(user):
         return []
 
 
-@register.simple_tag
-def num_items(user):
-    return InventoryItem.objects.filter(
-        contract__isnull=True,
-        location__character_location__character__user=user.gooseuser,
-        quantity__gt=0,
-    ).count()
+def _badge_counts(context, gooseuser):
+    request = context["request"]
+    if not hasattr(request, "badge_counts"):
+        request.badge_counts = {}
+    if gooseuser.pk not in request.badge_counts:
+        request.badge_counts[gooseuser.pk] = badge_counts(gooseuser)
+    return request.badge_counts[gooseuser.pk]
 
 
-@register.simple_tag
-def num_orders(user):
-    return MarketOrder.objects.filter(
-        item__location__character_location__character__user=user.gooseuser
-    ).count()
+def _site_badge_count(context, name, fallback_query):
+    gooseuser = getattr(context["request"], "gooseuser", None)
+    if gooseuser:
+        return _badge_counts(context, gooseuser)[name]
+    else:
+        return fallback_query().count()
 
 
-@register.simple_tag
-def num_sold(user):
-    return SoldItem.objects.filter(
-        item__location__character_location__character__user=user.gooseuser,
-        transfered_quantity__lt=F("quantity"),
-    ).count()
+@register.simple_tag(takes_context=True)
+def num_items(context, user):
+    return _badge_counts(context, user.gooseuser)["num_items"]
+
+
+@register.simple_tag(takes_context=True)
+def num_orders(context, user):
+    return _badge_counts(context, user.gooseuser)["num_orders"]
+
+
+@register.simple_tag(takes_context=True)
+def num_sold(context, user):
+    return _badge_counts(context, user.gooseuser)["num_sold"]
 
 
 @register.simple_tag
@@ -57,17 +62,14 @@ def can_change_contract_status_to(user, contract, status):
     return contract.can_change_status_to(user.gooseuser, status)
 
 
-@register.simple_tag
-def num_contracts(user):
-    return (
-        Contract.objects.filter(to_char__user=user.gooseuser, status="pending").count()
-        + Contract.objects.filter(from_user=user.gooseuser, status="requested").count()
-    )
+@register.simple_tag(takes_context=True)
+def num_contracts(context, user):
+    return _badge_counts(context, user.gooseuser)["num_contracts"]
 
 
-@register.simple_tag
-def all_sales(user):
-    return sum([num_items(user), num_orders(user), num_sold(user)])
+@register.simple_tag(takes_context=True)
+def all_sales(context, user):
+    return _badge_counts(context, user.gooseuser)["all_sales"]
 
 
 @register.simple_tag(takes_context=True)
@@ -77,14 +79,14 @@ def has_perm(context, user, perm):
     return hasattr(user, "gooseuser") and user.gooseuser.has_perm(perm)
 
 
-@register.simple_tag
-def num_active_fleets():
-    return len(active_fleets_query())
+@register.simple_tag(takes_context=True)
+def num_active_fleets(context):
+    return _site_badge_count(context, "num_active_fleets", active_fleets_query)
 
 
-@register.simple_tag
-def num_past_fleets():
-    return len(past_fleets_query())
+@register.simple_tag(takes_context=True)
+def num_past_fleets(context):
+    return _site_badge_count(context, "num_past_fleets", past_fleets_query)
 
 
 @register.filter()
@@ -120,29 +122,33 @@ def nicemoney(value):
     return floored
 
 
-@register.simple_tag
-def num_future_fleets():
-    return len(future_fleets_query())
+@register.simple_tag(takes_context=True)
+def num_future_fleets(context):
+    return _site_badge_count(context, "num_future_fleets", future_fleets_query)
 
 
-@register.simple_tag
-def num_pending_user_apps():
-    return UserApplication.unapproved_applications().count()
+@register.simple_tag(takes_context=True)
+def num_pending_user_apps(context):
+    return _site_badge_count(
+        context, "num_pending_user_apps", UserApplication.unapproved_applications
+    )
 
 
-@register.simple_tag
-def num_pending_corp_apps():
-    return CorpApplication.unapproved_applications().count()
+@register.simple_tag(takes_context=True)
+def num_pending_corp_apps(context):
+    return _site_badge_count(
+        context, "num_pending_corp_apps", CorpApplication.unapproved_applications
+    )
 
 
-@register.simple_tag
-def num_pending_apps():
-    return num_pending_corp_apps() + num_pending_user_apps()
+@register.simple_tag(takes_context=True)
+def num_pending_apps(context):
+    return num_pending_corp_apps(context) + num_pending_user_apps(context)
 
 
 @register.simple_tag
 def num_fleet_members(fleet_id):
-    return len(FleetMember.objects.filter(fleet=fleet_id))
+    return FleetMember.objects.filter(fleet=fleet_id).count()
 
 
 @register.simple_tag
@@ -0,0 +1,44 @@
+from django.urls.base import reverse
+
+from goosetools.core.counters import badge_counts, calculate_badge_counts
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class BadgeCountsTest(GooseToolsTestCase):
+    def test_counts_are_calculated_in_one_query(self):
+        loot_group = self.a_loot_group(self.a_fleet())
+        self.an_item(loot_group)
+        self.an_item(loot_group, item=self.another_item)
+
+        with self.assertNumQueries(1):
+            counts = calculate_badge_counts(self.user)
+
+        self.assertEqual(counts["num_items"], 2)
+        self.assertEqual(counts["num_orders"], 0)
+        self.assertEqual(counts["num_sold"], 0)
+        self.assertEqual(counts["all_sales"], 2)
+        self.assertEqual(counts["num_contracts"], 0)
+        self.assertEqual(counts["num_past_fleets"], 1)
+        self.assertEqual(counts["num_active_fleets"], 0)
+        self.assertEqual(counts["num_future_fleets"], 0)
+
+    def test_counts_are_cached_until_a_counted_row_changes(self):
+        loot_group = self.a_loot_group(self.a_fleet())
+        self.an_item(loot_group)
+        self.assertEqual(badge_counts(self.user)["num_items"], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(badge_counts(self.user)["num_items"], 1)
+
+        self.an_item(loot_group, item=self.another_item)
+        self.assertEqual(badge_counts(self.user)["num_items"], 2)
+
+    def test_pages_show_the_counts(self):
+        loot_group = self.a_loot_group(self.a_fleet())
+        self.an_item(loot_group)
+
+        response = self.get(reverse("fleet"))
+
+        self.assertEqual(
+            response.wsgi_request.badge_counts[self.user.pk]["num_items"], 1
+        )
@@ -1,80 +1,154 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from django_cron import CronJobBase, Schedule
-from django_tenants.utils import tenant_context
+from django_cron import Schedule
 
 from goosetools.fleets.models import FleetAnom
-from goosetools.ownership.forms import LootGroupForm
-from goosetools.ownership.models import LootGroup
-from goosetools.ownership.views import loot_group_create_internal
-from goosetools.tenants.models import Client
-from goosetools.utils import cron_header_line
-
-
-def _run_for_tenant(now):
-    plus_5_minutes = now + timezone.timedelta(minutes=5)
-    plus_5_minutes = plus_5_minutes.replace(second=0, microsecond=0)
-    anoms = FleetAnom.objects.filter(
-        minute_repeat_period__isnull=False,
-        next_repeat__lt=plus_5_minutes,
+from goosetools.items.models import InventoryItem
+from goosetools.ownership.models import LootGroup, LootShare
+from goosetools.tenants.cron import TenantCronJob
+
+
+def repeat_schedule(
+    next_repeat, minute_repeat_period: int, now
+) -> Tuple[datetime, datetime, int]:
+    """
+    The start and next repeat of the group repeating a group which ends at
+    next_repeat, along with how many repeat periods it is on from that group.
+
+    Normally this is simply the next period. When the cron has not run for a while
+    whole periods which have already finished are skipped over, the new group is for
+    the period now is in and stays on the same schedule as the groups before it, so
+    the outcome does not depend on exactly when the cron runs again.
+    """
+    period = timezone.timedelta(minutes=minute_repeat_period)
+    periods = 1
+    if next_repeat + period <= now:
+        periods = (now - next_repeat) // period + 1
+    start = next_repeat + period * (periods - 1)
+    return start, start + period, periods
+
+
+def repeat_due_groups(now) -> int:
+    """
+    Makes the next loot group of every repeating loot group due to repeat within the
+    next 5 minutes, and stops repeating those which were closed or whose fleet is
+    over. Runs a fixed number of queries however many groups are repeated.
+    """
+    due_before = (now + timezone.timedelta(minutes=5)).replace(second=0, microsecond=0)
+    loot_groups = (
+        LootGroup.objects.filter(
+            fleet_anom__minute_repeat_period__isnull=False,
+            fleet_anom__next_repeat__lt=due_before,
+        )
+        .select_related("fleet_anom", "fleet_anom__fleet")
+        .order_by("fleet_anom_id", "id")
     )
+    group_for_anom: Dict[int, LootGroup] = {}
+    for loot_group in loot_groups:
+        if loot_group.fleet_anom_id in group_for_anom:
+            print(
+                f"WARNING: Not repeating {loot_group} as its anom "
+                f"{loot_group.fleet_anom} is used by more than one loot group."
+            )
+            continue
+        group_for_anom[loot_group.fleet_anom_id] = loot_group
     print(
-        f"Found {anoms.count()} anoms to repeat with a next repeat upto {plus_5_minutes}"
+        f"Found {len(group_for_anom)} anoms to repeat with a next repeat upto "
+        f"{due_before}"
     )
-    for anom in anoms:
-        lootgroup = anom.lootgroup_set.get()
-        fleet_closed = lootgroup.fleet() and not lootgroup.fleet().is_open()
-        if lootgroup.closed or fleet_closed:
-            anom.minute_repeat_period = None
-            anom.save()
-            print(f"Unsetting repeat on {anom} as it was manually closed")
+
+    stopped_anom_ids: List[int] = []
+    repeated: List[Tuple[LootGroup, FleetAnom]] = []
+    for anom_id, loot_group in group_for_anom.items():
+        anom = loot_group.fleet_anom
+        fleet = anom.fleet
+        if loot_group.closed or not fleet.is_open():
+            stopped_anom_ids.append(anom_id)
             continue
-        new_rep_count = anom.repeat_count + 1
-        timedelta = timezone.timedelta(minutes=anom.minute_repeat_period)
-        next_repeat = anom.next_repeat + timedelta
-        start = anom.next_repeat
-        if next_repeat <= timezone.now():
-            # Catchup Old groups
-            next_repeat = timezone.now() + timedelta
-            print(f"Catching up {anom} to {next_repeat}")
-        new_group = loot_group_create_internal(
-            anom.fleet,
-            LootGroupForm.ANOM_LOOT_GROUP,
-            anom.anom_type.level,
-            anom.anom_type.type,
-            anom.anom_type.faction,
-            lootgroup.bucket.pk,
-            start,
-            anom.system,
-            lootgroup.name,
-            anom.minute_repeat_period,
-            next_repeat,
-            new_rep_count,
+        start, next_repeat, periods = repeat_schedule(
+            anom.next_repeat, anom.minute_repeat_period, now
+        )
+        if periods > 1:
+            print(f"Catching up {anom} by {periods} repeats to {next_repeat}")
+        repeated.append(
+            (
+                loot_group,
+                FleetAnom(
+                    fleet_id=anom.fleet_id,
+                    anom_type_id=anom.anom_type_id,
+                    time=start,
+                    system_id=anom.system_id,
+                    minute_repeat_period=anom.minute_repeat_period,
+                    next_repeat=next_repeat,
+                    repeat_count=anom.repeat_count + periods,
+                ),
+            )
+        )
+
+    with transaction.atomic():
+        FleetAnom.objects.bulk_create([anom for _, anom in repeated])
+        created_at = timezone.now()
+        LootGroup.objects.bulk_create(
+            [
+                LootGroup(
+                    name=loot_group.name,
+                    bucket_id=loot_group.bucket_id,
+                    fleet_anom=anom,
+                    created_at=created_at,
+                )
+                for loot_group, anom in repeated
+            ]
+        )
+        FleetAnom.objects.filter(
+            id__in=stopped_anom_ids
+            + [loot_group.fleet_anom_id for loot_group, _ in repeated]
+        ).update(minute_repeat_period=None)
+    print(
+        f"Unset repeat on {len(stopped_anom_ids)} anoms as they were manually closed "
+        f"and successfully repeated {len(repeated)} anoms."
+    )
+    return len(repeated)
+
+
+def cleanup_finished_groups(now):
+    """
+    Closes repeated loot groups which finished over 9 minutes ago and were used,
+    deleting the unused ones instead.
+    """
+    finished_before = now - timezone.timedelta(minutes=9)
+    old_groups = list(
+        LootGroup.objects.filter(
+            fleet_anom__minute_repeat_period__isnull=True,
+            fleet_anom__next_repeat__lte=finished_before,
+            closed=False,
+        ).values(
+            "id",
+            has_shares=Exists(LootShare.objects.filter(loot_group=OuterRef("pk"))),
+            has_items=Exists(InventoryItem.objects.filter(loot_group=OuterRef("pk"))),
         )
-        anom.minute_repeat_period = None
-        anom.save()
-
-        print(f"Successfully repeated {new_group}")
-    minus_9_minutes = now - timezone.timedelta(minutes=9)
-    old_groups = LootGroup.objects.filter(
-        fleet_anom__minute_repeat_period__isnull=True,
-        fleet_anom__next_repeat__lte=minus_9_minutes,
-        closed=False,
     )
     print(
-        f"Found {old_groups.count()} to be cleaned up who finished before {minus_9_minutes}."
+        f"Found {len(old_groups)} to be cleaned up who finished before "
+        f"{finished_before}."
     )
-    for old in old_groups:
-        has_been_used = old.lootshare_set.exists() or old.inventoryitem_set.exists()
-        if has_been_used:
-            old.closed = True
-            old.save()
-            print(f"Closing {old} as it has been used.")
-        else:
-            print(f"Deleting {old} as it has not been used.")
-            old.delete()
-
-
-class RepeatGroups(CronJobBase):
+    used_ids = [g["id"] for g in old_groups if g["has_shares"] or g["has_items"]]
+    unused_ids = [
+        g["id"] for g in old_groups if not (g["has_shares"] or g["has_items"])
+    ]
+    with transaction.atomic():
+        LootGroup.objects.filter(id__in=used_ids).update(closed=True)
+        LootGroup.objects.filter(id__in=unused_ids).delete()
+    print(
+        f"Closed {len(used_ids)} as they have been used and deleted "
+        f"{len(unused_ids)} as they have not been used."
+    )
+
+
+class RepeatGroups(TenantCronJob):
     # We run the cron job every 5 minutes, if we set this to 5 minutes then django_cron
     # can skip 5 minute intervals. This way as 4 < 5 we are guaranteed that the job will
     # run every time we do runcrons.
@@ -82,12 +156,12 @@ class RepeatGroups(CronJobBase):
 
     schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
     code = "fleets.repeat_groups"
+    now = None
+
+    def prepare(self):
+        self.now = timezone.now()
+        return True
 
-    def do(self):
-        cron_header_line(self.code)
-        now = timezone.now()
-        for tenant in Client.objects.all():
-            with tenant_context(tenant):
-                if tenant.name != "public":
-                    print(f"Repeating for tenant {tenant.name}")
-                    _run_for_tenant(now)
+    def run_for_tenant(self, tenant):
+        repeat_due_groups(self.now)
+        cleanup_finished_groups(self.now)
@@ -0,0 +1,131 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_tenants.utils import tenant_context
+
+from goosetools.core.models import Region, System
+from goosetools.fleets.cron.repeat_groups import (
+    cleanup_finished_groups,
+    repeat_due_groups,
+)
+from goosetools.fleets.models import AnomType, Fleet, FleetAnom
+from goosetools.ownership.models import LootBucket, LootGroup
+from goosetools.tenants.models import Client, SiteUser
+from goosetools.users.models import CrudAccessController, GooseUser
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "benchmark_repeat_groups"
+    help = (
+        "Times the repeat_groups cron repeating and cleaning up synthetic repeating "
+        "anoms, some of them due, closed or far behind. Everything written is rolled "
+        "back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--anoms", type=int, default=10000)
+        parser.add_argument("--fleets", type=int, default=100)
+        parser.add_argument(
+            "--tenant",
+            type=str,
+            default=None,
+            help="Schema name of the tenant to benchmark in, defaults to the first "
+            "non public tenant.",
+        )
+
+    def handle(self, *args, **options):
+        if options["tenant"]:
+            tenant = Client.objects.get(schema_name=options["tenant"])
+        else:
+            tenant = Client.objects.exclude(schema_name="public").first()
+        with tenant_context(tenant):
+            with transaction.atomic():
+                now = timezone.now()
+                expected = self.setup_anoms(options["anoms"], options["fleets"], now)
+                self.run_benchmark(now, expected)
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def setup_anoms(num_anoms: int, num_fleets: int, now) -> int:
+        fc = GooseUser.objects.create(
+            site_user=SiteUser.create("Benchmark Repeat FC#0000"), status="approved"
+        )
+        fleets = [
+            Fleet.objects.create(
+                fc=fc,
+                name=f"Benchmark Repeat Fleet {i}",
+                start=now - timezone.timedelta(hours=1),
+                access_controller=CrudAccessController.objects.create(),
+            )
+            for i in range(num_fleets)
+        ]
+        anom_type, _ = AnomType.objects.get_or_create(
+            level=6, type="Scout", faction="Serpentis"
+        )
+        system = System.objects.first() or System.objects.create(
+            name="Benchmark System",
+            region=Region.objects.create(name="Benchmark Region"),
+            security="1.0",
+        )
+        anoms = []
+        for _ in range(num_anoms):
+            # Mostly due in the next few minutes, some far behind and some not yet due.
+            minutes_until_due = random.choice([2, 3, 4, -200, 60])
+            anoms.append(
+                FleetAnom(
+                    fleet=random.choice(fleets),
+                    anom_type=anom_type,
+                    time=now - timezone.timedelta(minutes=20),
+                    system=system,
+                    minute_repeat_period=20,
+                    next_repeat=now + timezone.timedelta(minutes=minutes_until_due),
+                )
+            )
+        FleetAnom.objects.bulk_create(anoms)
+        buckets = LootBucket.objects.bulk_create(
+            [LootBucket() for _ in range(num_anoms)]
+        )
+        loot_groups = [
+            LootGroup(
+                bucket=bucket,
+                fleet_anom=anom,
+                closed=random.random() < 0.05,
+                created_at=now,
+            )
+            for anom, bucket in zip(anoms, buckets)
+        ]
+        LootGroup.objects.bulk_create(loot_groups)
+        due_before = (now + timezone.timedelta(minutes=5)).replace(
+            second=0, microsecond=0
+        )
+        return sum(
+            1
+            for anom, loot_group in zip(anoms, loot_groups)
+            if anom.next_repeat < due_before and not loot_group.closed
+        )
+
+    def run_benchmark(self, now, expected: int):
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            repeated = repeat_due_groups(now)
+            elapsed = perf_counter() - start
+        self.stdout.write(
+            f"repeat_due_groups: repeated {repeated} anoms in {elapsed:.2f}s with "
+            f"{len(queries)} queries"
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            cleanup_finished_groups(now)
+            elapsed = perf_counter() - start
+        self.stdout.write(
+            f"cleanup_finished_groups: {elapsed:.2f}s with {len(queries)} queries"
+        )
+
+        if repeated != expected:
+            self.stderr.write(f"Expected to repeat {expected} anoms!")
+            raise SystemExit(1)
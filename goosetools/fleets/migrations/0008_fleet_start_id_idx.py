@@ -0,0 +1,17 @@
+# Generated by Django 3.1.4 on 2021-09-01 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fleets", "0007_fleet_access_set_level"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fleet",
+            index=models.Index(fields=["start", "id"], name="fleet_start_id_idx"),
+        ),
+    ]
@@ -200,6 +200,10 @@ class Fleet(AccessControlledModel, models.Model):
     def __str__(self):
         return str(self.name)
 
+    class Meta:
+        # Fleet lists are paged through newest first by (start, id).
+        indexes = [models.Index(fields=["start", "id"], name="fleet_start_id_idx")]
+
 
 class FleetMember(models.Model):
     fleet = models.ForeignKey(Fleet, on_delete=models.CASCADE)
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.urls.base import reverse
 from freezegun import freeze_time
 
@@ -542,6 +544,36 @@ class FleetTest(GooseToolsTestCase):
             errors, ["You do not have permissions to remove that member from the fleet"]
         )
 
+    @patch("goosetools.fleets.views.FLEET_PAGE_SIZE", 2)
+    def test_fleet_lists_are_paged_newest_first(self):
+        for i, start_date in enumerate(
+            ["Nov. 13, 2020", "Nov. 13, 2020", "Nov. 14, 2020", "Nov. 15, 2020"]
+        ):
+            self.a_fleet(fleet_name=f"Fleet {i}", start_date=start_date)
+        self.a_fleet(fleet_name="Fleet 4", start_date="Nov. 16, 2020")
+
+        def page_names(response):
+            return [fleet.name for fleet in response.context["fleets"]]
+
+        first = self.get(reverse("fleet_future"))
+        self.assertEqual(page_names(first), ["Fleet 4", "Fleet 3"])
+        self.assertIsNone(first.context["newer_url"])
+        self.assertEqual(first.context["total"], 5)
+        self.assertTrue(first.context["total_is_exact"])
+
+        second = self.get(first.context["older_url"])
+        self.assertEqual(page_names(second), ["Fleet 2", "Fleet 1"])
+
+        last = self.get(second.context["older_url"])
+        self.assertEqual(page_names(last), ["Fleet 0"])
+        self.assertIsNone(last.context["older_url"])
+
+        back = self.get(last.context["newer_url"])
+        self.assertEqual(page_names(back), ["Fleet 2", "Fleet 1"])
+        self.assertEqual(
+            page_names(self.get(back.context["newer_url"])), ["Fleet 4", "Fleet 3"]
+        )
+
     def test_user_without_loot_tracker_perm_cannot_view(self):
         s = SiteUser.create("A Brand New Test Goose User")
         GooseUser.objects.create(site_user=s)
@@ -0,0 +1,140 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from freezegun import freeze_time
+
+from goosetools.fleets.cron.repeat_groups import (
+    cleanup_finished_groups,
+    repeat_due_groups,
+    repeat_schedule,
+)
+from goosetools.fleets.models import AnomType, Fleet, FleetAnom
+from goosetools.ownership.models import LootBucket, LootGroup, LootShare
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+from goosetools.users.models import CrudAccessController
+
+
+@freeze_time("2012-01-14 12:00:00")
+class RepeatGroupsTest(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.fleet = self.a_repeating_fleet(
+            start=self.now - timezone.timedelta(hours=1)
+        )
+        self.anom_type = AnomType.objects.create(
+            level=6, type="Scout", faction="Serpentis"
+        )
+
+    def a_repeating_fleet(self, start):
+        return Fleet.objects.create(
+            fc=self.user,
+            name="Repeating Fleet",
+            start=start,
+            access_controller=CrudAccessController.objects.create(),
+        )
+
+    def a_repeating_group(self, minutes_until_due, fleet=None, closed=False):
+        anom = FleetAnom.objects.create(
+            fleet=fleet or self.fleet,
+            anom_type=self.anom_type,
+            time=self.now - timezone.timedelta(minutes=20),
+            system=self.system,
+            minute_repeat_period=20,
+            next_repeat=self.now + timezone.timedelta(minutes=minutes_until_due),
+        )
+        return LootGroup.objects.create(
+            name="Repeating",
+            bucket=LootBucket.objects.create(),
+            fleet_anom=anom,
+            closed=closed,
+        )
+
+    def repeat_of(self, loot_group):
+        return LootGroup.objects.get(
+            bucket=loot_group.bucket, fleet_anom__repeat_count__gt=0
+        )
+
+    def test_repeats_groups_due_in_the_next_5_minutes(self):
+        due = self.a_repeating_group(minutes_until_due=3)
+        not_due = self.a_repeating_group(minutes_until_due=30)
+
+        self.assertEqual(repeat_due_groups(self.now), 1)
+
+        repeat = self.repeat_of(due)
+        self.assertEqual(repeat.name, "Repeating")
+        self.assertEqual(repeat.fleet_anom.time, due.fleet_anom.next_repeat)
+        self.assertEqual(
+            repeat.fleet_anom.next_repeat,
+            due.fleet_anom.next_repeat + timezone.timedelta(minutes=20),
+        )
+        self.assertEqual(repeat.fleet_anom.minute_repeat_period, 20)
+        self.assertEqual(repeat.fleet_anom.repeat_count, 1)
+        due.fleet_anom.refresh_from_db()
+        self.assertIsNone(due.fleet_anom.minute_repeat_period)
+        not_due.fleet_anom.refresh_from_db()
+        self.assertEqual(not_due.fleet_anom.minute_repeat_period, 20)
+
+    def test_stops_repeating_closed_groups_and_finished_fleets(self):
+        closed = self.a_repeating_group(minutes_until_due=3, closed=True)
+        future_fleet = self.a_repeating_fleet(
+            start=self.now + timezone.timedelta(hours=1)
+        )
+        not_started = self.a_repeating_group(minutes_until_due=3, fleet=future_fleet)
+
+        self.assertEqual(repeat_due_groups(self.now), 0)
+
+        self.assertEqual(LootGroup.objects.count(), 2)
+        for loot_group in [closed, not_started]:
+            loot_group.fleet_anom.refresh_from_db()
+            self.assertIsNone(loot_group.fleet_anom.minute_repeat_period)
+
+    def test_catches_up_on_the_same_schedule_after_downtime(self):
+        behind = self.a_repeating_group(minutes_until_due=-50)
+
+        repeat_due_groups(self.now)
+
+        # Due at 11:10, the 11:10 and 11:30 repeats have already finished so the new
+        # group is the 11:50 one.
+        repeat = self.repeat_of(behind)
+        self.assertEqual(str(repeat.fleet_anom.time), "2012-01-14 11:50:00+00:00")
+        self.assertEqual(
+            str(repeat.fleet_anom.next_repeat), "2012-01-14 12:10:00+00:00"
+        )
+        self.assertEqual(repeat.fleet_anom.repeat_count, 3)
+
+    def test_schedule_is_the_same_whenever_the_cron_catches_up(self):
+        next_repeat = self.now - timezone.timedelta(minutes=50)
+        for minutes_later in range(0, 20):
+            now = self.now + timezone.timedelta(minutes=minutes_later)
+            start, _, _ = repeat_schedule(next_repeat, 20, now)
+            expected = "11:50" if minutes_later < 10 else "12:10"
+            self.assertEqual(start.strftime("%H:%M"), expected)
+
+    def test_queries_do_not_grow_with_the_number_of_groups(self):
+        self.a_repeating_group(minutes_until_due=3)
+        with CaptureQueriesContext(connection) as one_group:
+            repeat_due_groups(self.now)
+        for _ in range(5):
+            self.a_repeating_group(minutes_until_due=3)
+        self.a_repeating_group(minutes_until_due=3, closed=True)
+        with CaptureQueriesContext(connection) as many_groups:
+            self.assertEqual(repeat_due_groups(self.now), 5)
+        self.assertEqual(len(many_groups), len(one_group))
+
+    def test_closes_used_and_deletes_unused_finished_groups(self):
+        used = self.a_repeating_group(minutes_until_due=-10)
+        unused = self.a_repeating_group(minutes_until_due=-10)
+        recent = self.a_repeating_group(minutes_until_due=-5)
+        LootShare.objects.create(
+            character=self.char, loot_group=used, share_quantity=1, created_at=self.now
+        )
+        FleetAnom.objects.update(minute_repeat_period=None)
+
+        cleanup_finished_groups(self.now)
+
+        used.refresh_from_db()
+        self.assertTrue(used.closed)
+        self.assertFalse(LootGroup.objects.filter(pk=unused.pk).exists())
+        recent.refresh_from_db()
+        self.assertFalse(recent.closed)
@@ -1,16 +1,15 @@
 import logging
-import math
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Case, Sum
-from django.db.models.expressions import F, When
-from django.db.models.fields import IntegerField
+from django.db.models import F, Q
 from django.http.response import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render
 from django.urls.base import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 
 from goosetools.fleets.forms import FleetAddMemberForm, FleetForm, JoinFleetForm
 from goosetools.fleets.models import (
@@ -37,6 +36,7 @@ from goosetools.users.utils import (
     can_view,
     filter_controlled_qs_to_viewable,
 )
+from goosetools.utils import estimated_count
 
 logger = logging.getLogger(__name__)
 
@@ -46,28 +46,62 @@ def forbidden(request):
     return render(request, "core/403.html")
 
 
+FLEET_PAGE_SIZE = 20
+
+
+def _fleet_cursor(fleet: Fleet) -> str:
+    return f"{fleet.start.isoformat()}_{fleet.id}"
+
+
+def _parse_fleet_cursor(cursor: str) -> Optional[Tuple]:
+    start, _, pk = cursor.rpartition("_")
+    start = parse_datetime(start) if start else None
+    if start is None or not pk.isdigit():
+        return None
+    return start, int(pk)
+
+
+def _fleet_page(fleets, after, before):
+    """
+    A page of fleets newest first along with whether there are older and newer
+    fleets. Pages are found by seeking from the (start, id) of the fleet either side
+    of them instead of an offset, so every page costs the same however far back it
+    is.
+    """
+    if before is not None:
+        start, pk = before
+        page = list(
+            fleets.filter(Q(start__gt=start) | Q(start=start, id__gt=pk)).order_by(
+                "start", "id"
+            )[: FLEET_PAGE_SIZE + 1]
+        )
+        return page[:FLEET_PAGE_SIZE][::-1], True, len(page) > FLEET_PAGE_SIZE
+    if after is not None:
+        start, pk = after
+        fleets = fleets.filter(Q(start__lt=start) | Q(start=start, id__lt=pk))
+    page = list(fleets.order_by("-start", "-id")[: FLEET_PAGE_SIZE + 1])
+    return page[:FLEET_PAGE_SIZE], len(page) > FLEET_PAGE_SIZE, after is not None
+
+
 def fleet_list_view(request, fleets_to_display, page_url_name):
-    viewable_fleets = filter_controlled_qs_to_viewable(
-        fleets_to_display, request, return_as_qs=True
+    viewable_fleets = (
+        filter_controlled_qs_to_viewable(fleets_to_display, request, return_as_qs=True)
+        .select_related("fc")
+        .annotate(isk_and_eggs_balance=F("ledger_balance__non_debt_eggs"))
     )
 
-    viewable_fleets = viewable_fleets.annotate(
-        isk_and_eggs_balance=Sum(
-            Case(
-                When(
-                    fleetanom__lootgroup__inventoryitem__eggtransaction__debt=False,
-                    then=F("fleetanom__lootgroup__inventoryitem__eggtransaction__eggs"),
-                ),
-                output_field=IntegerField(),
-                default=0,
-            )
-        )
-    ).order_by("-start")
+    after = _parse_fleet_cursor(request.GET.get("after", ""))
+    before = _parse_fleet_cursor(request.GET.get("before", ""))
+    fleets, has_older, has_newer = _fleet_page(viewable_fleets, after, before)
+    page_url = reverse(page_url_name)
+    older_url = None
+    newer_url = None
+    if fleets and has_older:
+        older_url = f"{page_url}?{urlencode({'after': _fleet_cursor(fleets[-1])})}"
+    if fleets and has_newer:
+        newer_url = f"{page_url}?{urlencode({'before': _fleet_cursor(fleets[0])})}"
+    total, total_is_exact = estimated_count(viewable_fleets)
 
-    page = int(request.GET.get("page", 0))
-    page_size = 20
-    total_pages = math.floor(len(viewable_fleets) / page_size)
-    viewable_fleets = viewable_fleets[page * page_size : (page + 1) * page_size]
     header = "Active Fleets"
     if page_url_name == "fleet_past":
         header = "Past Fleets"
@@ -75,11 +109,12 @@ def fleet_list_view(request, fleets_to_display, page_url_name):
         header = "Future Fleets"
     context = {
         "page_url_name": page_url_name,
-        "fleets": viewable_fleets,
+        "fleets": fleets,
         "header": header,
-        "page": page,
-        "total_pages": total_pages,
-        "total_pages_range": range(total_pages),
+        "older_url": older_url,
+        "newer_url": newer_url,
+        "total": total,
+        "total_is_exact": total_is_exact,
     }
     return render(request, "fleets/fleet.html", context)
 
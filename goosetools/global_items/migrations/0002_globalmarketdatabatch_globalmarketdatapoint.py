@@ -0,0 +1,96 @@
+# Generated by Django 3.1.4 on 2021-08-16 10:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("global_items", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GlobalMarketDataBatch",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.TextField()),
+                (
+                    "started",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                ("last_staged_market_id", models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GlobalMarketDataPoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("eve_echoes_market_id", models.TextField()),
+                ("time", models.DateTimeField()),
+                (
+                    "sell",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "buy",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "lowest_sell",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "highest_buy",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "volume",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="global_items.globalmarketdatabatch",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="globalmarketdatapoint",
+            index=models.Index(
+                fields=["batch", "eve_echoes_market_id"],
+                name="global_item_batch_i_996975_idx",
+            ),
+        ),
+    ]
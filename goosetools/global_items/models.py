@@ -1,4 +1,7 @@
-from django.db import models
+from typing import Iterable, Tuple
+
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class GlobalItemType(models.Model):
@@ -48,3 +51,83 @@ class GlobalSystem(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.region})"
+
+
+class GlobalMarketDataBatch(models.Model):
+    """
+    Market data downloaded once into the public schema and then applied to every
+    tenant with a single statement each.
+    """
+
+    source = models.TextField()
+    started = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(null=True, blank=True)
+    last_staged_market_id = models.TextField(null=True, blank=True)
+
+    @staticmethod
+    def start(source: str) -> "GlobalMarketDataBatch":
+        # Only the newest batch of each source is ever kept around.
+        GlobalMarketDataBatch.objects.filter(source=source).delete()
+        return GlobalMarketDataBatch.objects.create(source=source)
+
+    @staticmethod
+    def resume_or_start(source: str, restart: bool = False) -> "GlobalMarketDataBatch":
+        unfinished = (
+            GlobalMarketDataBatch.objects.filter(source=source, finished__isnull=True)
+            .order_by("-started")
+            .first()
+        )
+        if unfinished is None or restart:
+            return GlobalMarketDataBatch.start(source)
+        return unfinished
+
+    def stage(self, points: Iterable[Tuple], last_market_id: str = None):
+        """
+        Stages (eve_echoes_market_id, time, sell, buy, lowest_sell, highest_buy,
+        volume) points, recording the last market id staged in the same transaction.
+        """
+        with transaction.atomic():
+            GlobalMarketDataPoint.objects.bulk_create(
+                [
+                    GlobalMarketDataPoint(
+                        batch=self,
+                        eve_echoes_market_id=market_id,
+                        time=time,
+                        sell=sell,
+                        buy=buy,
+                        lowest_sell=lowest_sell,
+                        highest_buy=highest_buy,
+                        volume=volume,
+                    )
+                    for market_id, time, sell, buy, lowest_sell, highest_buy, volume in points
+                ],
+                batch_size=1000,
+            )
+            if last_market_id is not None:
+                self.last_staged_market_id = last_market_id
+                self.save()
+
+    def finish(self):
+        self.finished = timezone.now()
+        self.save()
+
+    def __str__(self):
+        return f"{self.source} market data started at {self.started}"
+
+
+class GlobalMarketDataPoint(models.Model):
+    batch = models.ForeignKey(GlobalMarketDataBatch, on_delete=models.CASCADE)
+    eve_echoes_market_id = models.TextField()
+    time = models.DateTimeField()
+    sell = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+    buy = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+    lowest_sell = models.DecimalField(
+        max_digits=20, decimal_places=2, null=True, blank=True
+    )
+    highest_buy = models.DecimalField(
+        max_digits=20, decimal_places=2, null=True, blank=True
+    )
+    volume = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["batch", "eve_echoes_market_id"])]
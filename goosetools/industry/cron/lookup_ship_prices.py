@@ -8,8 +8,7 @@ from typing import Optional
 
 from django.conf import settings
 from django.utils import timezone
-from django_cron import CronJobBase, Schedule
-from django_tenants.utils import tenant_context
+from django_cron import Schedule
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
@@ -17,15 +16,13 @@ from googleapiclient.discovery import build
 from goosetools.industry.models import Ship, to_isk
 from goosetools.items.models import Item
 from goosetools.pricing.models import DataSet, ItemMarketDataEvent
-from goosetools.tenants.models import Client
-from goosetools.utils import cron_header_line
+from goosetools.tenants.cron import TenantCronJob
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
 
 
-def import_price_list(pricelist):
-    output_str = f"Starting import run for {pricelist} at {timezone.now()}\n"
+def google_sheets_credentials():
     creds = None
     # The file token.pickle stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -45,6 +42,13 @@ def import_price_list(pricelist):
         # Save the credentials for the next run
         with open("token.pickle", "wb") as token:
             pickle.dump(creds, token)
+    return creds
+
+
+def import_price_list(pricelist, creds=None):
+    output_str = f"Starting import run for {pricelist} at {timezone.now()}\n"
+    if creds is None:
+        creds = google_sheets_credentials()
     service = build("sheets", "v4", credentials=creds)
     # Call the Sheets API
     sheet = service.spreadsheets()
@@ -117,26 +121,9 @@ def import_price_list(pricelist):
     return output_str
 
 
-def import_ship_prices():
-    creds = None
-    # The file token.pickle stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first
-    # time.
-    if os.path.exists("token.pickle"):
-        with open("token.pickle", "rb") as token:
-            creds = pickle.load(token)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                ".google.credentials.json", SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open("token.pickle", "wb") as token:
-            pickle.dump(creds, token)
+def import_ship_prices(creds=None):
+    if creds is None:
+        creds = google_sheets_credentials()
     service = build("sheets", "v4", credentials=creds)
     # Call the Sheets API
     sheet = service.spreadsheets()
@@ -179,34 +166,35 @@ def import_ship_prices():
             i = i + 1
 
 
-class LookupShipPrices(CronJobBase):
+class LookupShipPrices(TenantCronJob):
     RUN_EVERY_MINS = 60
 
     schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
     code = "industry.lookup_ship_prices"
+    creds = None
 
-    def do(self):
-        cron_header_line(self.code)
-        if (
+    def prepare(self):
+        if not (
             settings.SHIP_PRICE_GOOGLE_SHEET_ID
             and settings.SHIP_PRICE_GOOGLE_SHEET_CELL_RANGE
         ):
-            for tenant in Client.objects.all():
-                if tenant.name != "public":
-                    with tenant_context(tenant):
-                        import_ship_prices()
-                        for price_list in DataSet.objects.filter(
-                            api_type="google_sheet"
-                        ).all():
-                            try:
-                                import_price_list(price_list)
-                            except Exception as e:  # pylint: disable=broad-except
-                                print(f"ERROR IMPORTING PRICES FOR {price_list} = {e}")
-        else:
             print(
                 "Not looking up ship prices as no spreadsheet and range is "
                 "configured."
             )
+            return False
+        # Loaded once up front as the tenants run at the same time and would
+        # otherwise all refresh and rewrite token.pickle.
+        self.creds = google_sheets_credentials()
+        return True
+
+    def run_for_tenant(self, tenant):
+        import_ship_prices(self.creds)
+        for price_list in DataSet.objects.filter(api_type="google_sheet").all():
+            try:
+                import_price_list(price_list, self.creds)
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"ERROR IMPORTING PRICES FOR {price_list} = {e}")
 
 
 def parse_price(price_str: str) -> Optional[Decimal]:
@@ -0,0 +1,52 @@
+# Generated by Django 3.1.4 on 2021-08-21 10:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+CREATE FUNCTION items_item_search_vector(item_name text, market_id text)
+RETURNS tsvector AS $$
+    SELECT to_tsvector('english', coalesce(item_name, '') || ' ' || coalesce(market_id, ''))
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE FUNCTION items_item_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := items_item_search_vector(NEW.name, NEW.eve_echoes_market_id);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+UPDATE items_item SET search_vector = items_item_search_vector(name, eve_echoes_market_id);
+
+CREATE TRIGGER items_item_search_vector BEFORE INSERT OR UPDATE ON items_item
+    FOR EACH ROW EXECUTE FUNCTION items_item_search_vector_trigger();
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP FUNCTION items_item_search_vector_trigger() CASCADE;
+DROP FUNCTION items_item_search_vector(text, text);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0011_auto_20210503_1822"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+        migrations.AddIndex(
+            model_name="item",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="items_item_search_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.4 on 2021-08-23 18:05
+
+from django.db import migrations, models
+
+CHANGE_SEQUENCE_SQL = """
+CREATE SEQUENCE items_change_seq;
+UPDATE items_item SET change_seq = nextval('items_change_seq');
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0012_item_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="change_seq",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(CHANGE_SEQUENCE_SQL, "DROP SEQUENCE items_change_seq;"),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(fields=["change_seq"], name="items_item_change_seq_idx"),
+        ),
+        migrations.CreateModel(
+            name="ItemTombstone",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("item_id", models.IntegerField()),
+                ("change_seq", models.BigIntegerField(db_index=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+from django.db.models import OuterRef, Subquery
 from django.db.models.aggregates import Sum
+from django.db.models.functions import Coalesce
 from django.forms import forms
 from django.utils import timezone
 from djmoney.money import Money
@@ -7,7 +14,7 @@ from djmoney.money import Money
 from goosetools.contracts.models import Contract
 from goosetools.core.models import System
 from goosetools.ownership.models import LootGroup
-from goosetools.pricing.constants import PRICE_AGG_METHODS_MAP
+from goosetools.pricing.constants import PRICE_AGG_METHODS, PRICE_TYPES
 from goosetools.users.models import ITEM_CHANGE_ADMIN, Character, Corp, GooseUser
 
 
@@ -23,6 +30,139 @@ def model_sum(queryset, key):
         return result
 
 
+# Hands out the change_seq of items, latest prices and their tombstones. It only
+# ever increases so the largest change_seq a client has seen is its sync token.
+# Sequence numbers can commit out of order, so a transaction takes
+# CHANGE_SEQUENCE_LOCK before its first nextval and holds it until it commits. That
+# way every change_seq up to the sequence's last value has committed whenever no one
+# holds the lock, which is what committed_change_seq relies on.
+CHANGE_SEQUENCE = "items_change_seq"
+CHANGE_SEQUENCE_LOCK = 1
+
+
+def _change_sequence_lock(cursor, function: str) -> bool:
+    # Advisory lock keys are shared by every schema so the schema is part of the key.
+    cursor.execute(
+        f"SELECT {function}(%s, hashtext(current_schema()))",
+        [CHANGE_SEQUENCE_LOCK],
+    )
+    return cursor.fetchone()[0]
+
+
+def lock_change_sequence():
+    """
+    Blocks until no other transaction in this tenant is handing out change_seqs, then
+    holds the lock until the current transaction ends. Call before any nextval of
+    CHANGE_SEQUENCE.
+    """
+    with connection.cursor() as cursor:
+        _change_sequence_lock(cursor, "pg_advisory_xact_lock")
+
+
+def next_change_seq() -> int:
+    lock_change_sequence()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [CHANGE_SEQUENCE])
+        return cursor.fetchone()[0]
+
+
+def committed_change_seq() -> Optional[int]:
+    """
+    The change_seq up to which every change has committed, or None when another
+    transaction is handing out change_seqs right now.
+    """
+    with connection.cursor() as cursor:
+        if not _change_sequence_lock(cursor, "pg_try_advisory_lock_shared"):
+            return None
+        try:
+            cursor.execute(f"SELECT last_value, is_called FROM {CHANGE_SEQUENCE}")
+            last_value, is_called = cursor.fetchone()
+        finally:
+            _change_sequence_lock(cursor, "pg_advisory_unlock_shared")
+    return last_value if is_called else 0
+
+
+def calc_estimate_prices(
+    item_ids: Iterable[int], hours, price_list, price_type, price_agg_method
+) -> Dict[int, Tuple[Optional[Decimal], int]]:
+    """
+    Estimates the price of many items at once, returning {item_id: (price,
+    datapoints_used)} with (None, 0) for items without any prices.
+    """
+    if price_type not in dict(PRICE_TYPES):
+        raise forms.ValidationError(f"Unknown price type {price_type}")
+    if price_agg_method not in dict(PRICE_AGG_METHODS):
+        raise forms.ValidationError(
+            f"Unknown price aggregation method {price_agg_method}"
+        )
+    item_ids = list(set(item_ids))
+    estimates: Dict[int, Tuple[Optional[Decimal], int]] = {
+        item_id: (None, 0) for item_id in item_ids
+    }
+    if not item_ids:
+        return estimates
+
+    if price_agg_method == "latest":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT l.item_id, e.{price_type}
+                FROM pricing_latestitemmarketdataevent l
+                JOIN pricing_itemmarketdataevent e ON e.id = l.event_id
+                WHERE l.price_list_id = %s AND l.item_id = ANY(%s::integer[])
+                """,
+                [price_list.id, item_ids],
+            )
+            for item_id, price in cursor.fetchall():
+                estimates[item_id] = (price, 1)
+        return estimates
+
+    # Whole hours in the window are read from the hourly rollups, only the events
+    # before the first whole hour are read raw.
+    time_threshold = timezone.now() - timezone.timedelta(hours=hours)
+    first_whole_hour = time_threshold.replace(minute=0, second=0, microsecond=0)
+    if first_whole_hour != time_threshold:
+        first_whole_hour += timezone.timedelta(hours=1)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT item_id, sum(total), sum(count), min(low), max(high)
+            FROM (
+                SELECT item_id, {price_type} AS total, 1 AS count,
+                    {price_type} AS low, {price_type} AS high
+                FROM pricing_itemmarketdataevent
+                WHERE price_list_id = %s AND item_id = ANY(%s::integer[])
+                    AND time >= %s AND time < %s AND {price_type} IS NOT NULL
+                UNION ALL
+                SELECT item_id, total, count, low, high
+                FROM pricing_itemmarketdatarollup
+                WHERE price_list_id = %s AND item_id = ANY(%s::integer[])
+                    AND price_type = %s AND period = 'hour' AND bucket >= %s
+            ) prices
+            GROUP BY item_id
+            """,
+            [
+                price_list.id,
+                item_ids,
+                time_threshold,
+                first_whole_hour,
+                price_list.id,
+                item_ids,
+                price_type,
+                first_whole_hour,
+            ],
+        )
+        for item_id, total, count, low, high in cursor.fetchall():
+            if price_agg_method == "min":
+                price = low
+            elif price_agg_method == "max":
+                price = high
+            else:
+                price = total / count
+            estimates[item_id] = (price, int(count))
+    return estimates
+
+
 # noinspection DuplicatedCode
 class ItemType(models.Model):
     name = models.TextField()
@@ -54,6 +194,16 @@ class Item(models.Model):
     cached_lowest_sell = models.DecimalField(
         max_digits=20, decimal_places=2, null=True, blank=True
     )
+    # The name and market id, kept up to date by a trigger whatever is saved here.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set from CHANGE_SEQUENCE when first saved, then by the ingest and approved change
+    # proposals.
+    change_seq = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.change_seq is None:
+            self.change_seq = next_change_seq()
+        super().save(*args, **kwargs)
 
     def latest_default_market_data(self):
         return (
@@ -66,19 +216,9 @@ class Item(models.Model):
         return self.latestitemmarketdataevent_set.get(price_list=price_list)
 
     def calc_estimate_price(self, hours, price_list, price_type, price_agg_method):
-        time_threshold = timezone.now() - timezone.timedelta(hours=hours)
-        prices_to_search = self.itemmarketdataevent_set.filter(
-            price_list=price_list, time__gte=time_threshold
-        )
-        method = PRICE_AGG_METHODS_MAP[price_agg_method]
-        calculated_price = prices_to_search.aggregate(
-            calculated_price=method(price_type)
-        )["calculated_price"]
-        f = {"time__gte": time_threshold, f"{price_type}__isnull": False}
-        datapoints_used = (
-            prices_to_search.filter(**f).values(price_type).distinct().count()
-        )
-        return calculated_price, datapoints_used
+        return calc_estimate_prices(
+            [self.id], hours, price_list, price_type, price_agg_method
+        )[self.id]
 
     def lowest_sell(self):
         if not self.cached_lowest_sell:
@@ -96,7 +236,11 @@ class Item(models.Model):
         ).all()
 
     class Meta:
-        indexes = [models.Index(fields=["-cached_lowest_sell"])]
+        indexes = [
+            models.Index(fields=["-cached_lowest_sell"]),
+            GinIndex(fields=["search_vector"], name="items_item_search_gin"),
+            models.Index(fields=["change_seq"], name="items_item_change_seq_idx"),
+        ]
 
     def __str__(self):
         return f"{str(self.name)}"
@@ -185,6 +329,7 @@ class ItemChangeProposal(models.Model):
                     self.existing_item.item_type = self.item_type
                 if self.eve_echoes_market_id:
                     self.existing_item.eve_echoes_market_id = self.eve_echoes_market_id
+                self.existing_item.change_seq = next_change_seq()
                 self.existing_item.full_clean()
                 self.existing_item.save()
             elif self.change == "delete":
@@ -208,6 +353,9 @@ class ItemChangeProposal(models.Model):
             self.approved_at = timezone.now()
             self.save()
             if delete_existing:
+                ItemTombstone.objects.create(
+                    item_id=delete_existing.id, change_seq=next_change_seq()
+                )
                 delete_existing.delete()
         except Exception as e:
             if hasattr(e, "message"):
@@ -230,6 +378,18 @@ class ItemChangeProposal(models.Model):
         self.delete()
 
 
+class ItemTombstone(models.Model):
+    """
+    Records an item being deleted so clients syncing items by change_seq find out.
+    """
+
+    item_id = models.IntegerField()
+    change_seq = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"Item {self.item_id} deleted @ {self.change_seq}"
+
+
 class ItemChangeError(Exception):
     def __init__(self, message, item):
         super().__init__()
@@ -337,15 +497,76 @@ class ItemLocation(models.Model):
             return str(self.corp_hanger)
 
 
+class StackedInventoryItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotates each stack with its totals so the stacks quantity methods, and the
+        methods which need its first item or market order, do not each run their own
+        queries. The first item and market order are fetched once and then cached, so
+        re-fetch a stack after changing its items.
+        """
+        items = InventoryItem.objects.filter(stack=OuterRef("pk")).order_by()
+        first_order = items.filter(marketorder__isnull=False).order_by("created_at")
+
+        def stack_sum(field):
+            return Coalesce(
+                Subquery(
+                    items.values("stack").annotate(total=Sum(field)).values("total")
+                ),
+                0,
+            )
+
+        return self.annotate(
+            annotated_quantity=stack_sum("quantity"),
+            annotated_order_quantity=stack_sum("marketorder__quantity"),
+            annotated_sold_quantity=stack_sum("solditem__quantity"),
+            annotated_first_item_id=Subquery(items.order_by("pk").values("pk")[:1]),
+            annotated_marketorder_id=Subquery(
+                first_order.values("marketorder__id")[:1]
+            ),
+            annotated_buy_sell=Subquery(
+                first_order.values("marketorder__buy_or_sell")[:1]
+            ),
+            annotated_internal_external=Subquery(
+                first_order.values("marketorder__internal_or_external")[:1]
+            ),
+            annotated_list_price=Subquery(
+                first_order.values("marketorder__listed_at_price")[:1],
+                output_field=models.DecimalField(max_digits=20, decimal_places=2),
+            ),
+            annotated_list_price_currency=Subquery(
+                first_order.values("marketorder__listed_at_price_currency")[:1]
+            ),
+        )
+
+
 class StackedInventoryItem(models.Model):
     created_at = models.DateTimeField()
 
+    objects = StackedInventoryItemQuerySet.as_manager()
+
+    def _has_totals(self):
+        return hasattr(self, "annotated_quantity")
+
     def _first_item(self):
-        items = self.inventoryitem_set.count()
-        if items > 0:
-            return self.inventoryitem_set.first()
-        else:
-            return False
+        if not self._has_totals():
+            items = self.inventoryitem_set.count()
+            if items > 0:
+                return self.inventoryitem_set.first()
+            else:
+                return False
+        if not hasattr(self, "_first_item_cache"):
+            first_item_id = self.annotated_first_item_id  # type: ignore
+            self._first_item_cache = first_item_id is not None and (
+                InventoryItem.objects.select_related(
+                    "item",
+                    "location__character_location__character",
+                    "marketorder",
+                    "solditem",
+                    "junkeditem",
+                ).get(pk=first_item_id)
+            )
+        return self._first_item_cache
 
     def junk(self):
         for item in self.inventoryitem_set.all():
@@ -356,9 +577,17 @@ class StackedInventoryItem(models.Model):
             item.junkeditem.unjunk()
 
     def item(self):
-        return self._first_item() and self._first_item().item
+        first_item = self._first_item()
+        return first_item and first_item.item
 
     def marketorder(self):
+        if self._has_totals():
+            if self.annotated_marketorder_id is None:  # type: ignore
+                return False
+            if not hasattr(self, "_marketorder_cache"):
+                # pylint: disable=no-member
+                self._marketorder_cache = self.marketorders().first()  # type: ignore
+            return self._marketorder_cache
         # pylint: disable=no-member
         items = self.marketorders()  # type: ignore
         if items.count() > 0:
@@ -367,20 +596,27 @@ class StackedInventoryItem(models.Model):
             return False
 
     def estimated_profit(self):
-        lowest_sell = self._first_item() and self._first_item().item.lowest_sell()
+        first_item = self._first_item()
+        lowest_sell = first_item and first_item.item.lowest_sell()
         return lowest_sell and to_isk(
             (self.order_quantity() + self.quantity()) * lowest_sell
         )
 
     # TODO Reverse Dep
     def order_quantity(self):
+        if self._has_totals():
+            return self.annotated_order_quantity  # type: ignore
         return model_sum(self.inventoryitem_set, "marketorder__quantity")
 
     def quantity(self):
+        if self._has_totals():
+            return self.annotated_quantity  # type: ignore
         return model_sum(InventoryItem.objects.filter(stack=self.id), "quantity")
 
     # TODO Reverse Dep
     def sold_quantity(self):
+        if self._has_totals():
+            return self.annotated_sold_quantity  # type: ignore
         return model_sum(self.inventoryitem_set, "solditem__quantity")
 
     def total_quantity(self):
@@ -400,39 +636,56 @@ class StackedInventoryItem(models.Model):
         return status
 
     def can_edit(self):
-        return self._first_item() and self._first_item().can_edit()
+        first_item = self._first_item()
+        return first_item and first_item.can_edit()
+
+    def _annotated_marketorder_field(self, field):
+        return getattr(self, "annotated_marketorder_id") is not None and getattr(
+            self, field
+        )
 
     def buy_sell(self):
-        return self.marketorder() and self.marketorder().buy_or_sell
+        if self._has_totals():
+            return self._annotated_marketorder_field("annotated_buy_sell")
+        marketorder = self.marketorder()
+        return marketorder and marketorder.buy_or_sell
 
     def internal_external(self):
-        return self.marketorder() and self.marketorder().internal_or_external
+        if self._has_totals():
+            return self._annotated_marketorder_field("annotated_internal_external")
+        marketorder = self.marketorder()
+        return marketorder and marketorder.internal_or_external
 
     def list_price(self):
-        return self.marketorder() and self.marketorder().listed_at_price
+        if self._has_totals():
+            amount = self._annotated_marketorder_field("annotated_list_price")
+            return amount is not False and Money(
+                amount=amount,
+                currency=getattr(self, "annotated_list_price_currency"),
+            )
+        marketorder = self.marketorder()
+        return marketorder and marketorder.listed_at_price
 
     def loc(self):
-        items = self.inventoryitem_set.count()
-        if items > 0:
-            return self.inventoryitem_set.first().location  # type: ignore
-        else:
-            return False
+        first_item = self._first_item()
+        return first_item and first_item.location
 
     def items(self):
         return self.inventoryitem_set.all()
 
     def has_admin(self, user):
-        items = self.inventoryitem_set.count()
-        if items > 0:
-            return self.inventoryitem_set.first().has_admin(user)  # type: ignore
+        first_item = self._first_item()
+        if first_item:
+            return first_item.has_admin(user)
         else:
             return True
 
     def can_sell(self):
-        return self._first_item() and self._first_item().can_sell()
+        first_item = self._first_item()
+        return first_item and first_item.can_sell()
 
     def item_info(self):
-        return self._first_item() and self._first_item().item
+        return self.item()
 
     def __str__(self):
         return f"Stack of {self.item_info()} x ({self.total_quantity_display()})"
@@ -456,11 +709,19 @@ class InventoryItem(models.Model):
     def has_admin(self, user):
         return self.location.has_admin(user)
 
+    def _ledger_balance(self, field):
+        result = (
+            InventoryItem.objects.filter(pk=self.pk)
+            .values_list(f"ledger_balance__{field}", flat=True)
+            .first()
+        )
+        return to_isk(result or 0)
+
     def isk_balance(self):
-        return to_isk(model_sum(self.isktransaction_set, "isk"))  # type: ignore
+        return self._ledger_balance("isk")
 
     def egg_balance(self):
-        return to_isk(model_sum(self.eggtransaction_set, "eggs"))  # type: ignore
+        return self._ledger_balance("eggs")
 
     def isk_and_eggs_balance(self):
         return self.isk_balance() + self.egg_balance()
@@ -1,15 +1,25 @@
 from rest_framework import mixins
 from rest_framework.viewsets import GenericViewSet
 
-from goosetools.items.models import Item
+from goosetools.core.delta_sync import DeltaSyncMixin
+from goosetools.items.models import Item, ItemTombstone
 from goosetools.items.serializers import ItemSerializer
 from goosetools.users.models import BASIC_ACCESS, HasGooseToolsPerm
 
 
-class ItemDbQuerySet(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class ItemDbQuerySet(
+    DeltaSyncMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet
+):
     permission_classes = [HasGooseToolsPerm.of(BASIC_ACCESS)]
     queryset = Item.objects.prefetch_related(
         "item_type", "item_type__item_sub_type", "item_type__item_sub_type__item_type"
     ).all()
 
     serializer_class = ItemSerializer
+
+    def deleted_since(self, since, until, limit):
+        return list(
+            ItemTombstone.objects.filter(change_seq__gt=since, change_seq__lte=until)
+            .order_by("change_seq")
+            .values_list("change_seq", "item_id")[:limit]
+        )
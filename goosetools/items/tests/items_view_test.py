@@ -0,0 +1,141 @@
+import csv
+import gzip
+import io
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls.base import reverse
+from django.utils import timezone
+
+from goosetools.items.models import (
+    CharacterLocation,
+    InventoryItem,
+    Item,
+    ItemLocation,
+    StackedInventoryItem,
+)
+from goosetools.items.views import get_items_in_locations
+from goosetools.market.models import MarketOrder
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase, isk
+
+
+class ItemsViewTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.char_loc = CharacterLocation.objects.create(
+            character=self.char, system=self.system
+        )
+        self.loc = ItemLocation.objects.create(character_location=self.char_loc)
+        self.item.cached_lowest_sell = 10
+        self.item.save()
+
+    def inventory_item(self, item, quantity, stack=None):
+        return InventoryItem.objects.create(
+            item=item,
+            quantity=quantity,
+            created_at=timezone.now(),
+            location=self.loc,
+            stack=stack,
+        )
+
+    def a_stack(self, item, *quantities):
+        stack = StackedInventoryItem.objects.create(created_at=timezone.now())
+        for quantity in quantities:
+            self.inventory_item(item, quantity, stack)
+        return stack
+
+    def add_inventory(self, num_kinds):
+        for i in range(num_kinds):
+            item = Item.objects.create(
+                name=f"Item {i}", item_type=self.item.item_type, cached_lowest_sell=i
+            )
+            self.inventory_item(item, 1)
+            self.a_stack(item, 1, 2)
+
+    def test_stacks_are_summed_and_ordered_by_estimated_profit(self):
+        cheap_stack = self.a_stack(self.another_item, 100)
+        stack = self.a_stack(self.item, 2, 3)
+        listed = self.inventory_item(self.item, 0, stack)
+        MarketOrder.objects.create(
+            item=listed,
+            internal_or_external="internal",
+            buy_or_sell="sell",
+            quantity=5,
+            listed_at_price=isk(10),
+            transaction_tax=0,
+            broker_fee=0,
+        )
+        self.inventory_item(self.item, 4)
+
+        (loc_items,) = get_items_in_locations([self.char_loc])
+
+        self.assertEqual(loc_items["total_in_loc"], 3)
+        self.assertEqual(list(loc_items["stacks"]), [stack.id, cheap_stack.id])
+        stack_data = loc_items["stacks"][stack.id]
+        self.assertEqual(stack_data["item"], self.item)
+        self.assertEqual(stack_data["quantity"], 5)
+        self.assertEqual(stack_data["order_quantity"], 5)
+        self.assertEqual(stack_data["estimated_profit"], isk(100))
+        self.assertEqual(stack_data["estimated_profit"], stack.estimated_profit())
+        self.assertTrue(stack_data["can_edit"])
+        self.assertFalse(loc_items["stacks"][cheap_stack.id]["estimated_profit"])
+        self.assertEqual(
+            [i.quantity for i in loc_items["unstacked"]],
+            [4],
+        )
+
+    def test_items_page_queries_do_not_grow_with_the_inventory(self):
+        self.add_inventory(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(reverse("items")).status_code, 200)
+
+        self.add_inventory(20)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get(reverse("items")).status_code, 200)
+
+        self.assertEqual(len(large), len(small))
+
+    def test_all_items_csv_streams_every_item_with_its_status(self):
+        waiting = self.inventory_item(self.item, 3)
+        listed = self.inventory_item(self.another_item, 0)
+        MarketOrder.objects.create(
+            item=listed,
+            internal_or_external="internal",
+            buy_or_sell="sell",
+            quantity=5,
+            listed_at_price=isk(10),
+            transaction_tax=0,
+            broker_fee=0,
+        )
+
+        response = self.client.get(reverse("all_items_csv"))
+        self.assertEqual(response.status_code, 200)
+        rows = list(
+            csv.DictReader(
+                io.StringIO(b"".join(response.streaming_content).decode("utf-8"))
+            )
+        )
+
+        self.assertEqual(
+            list(rows[0].keys())[:4],
+            ["Item Name", "Created At", "Quantity", "Item Type"],
+        )
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["Item Name"], waiting.item.name)
+        self.assertEqual(rows[0]["Item Type"], waiting.item.item_type.name)
+        self.assertEqual(rows[0]["Quantity"], "3")
+        self.assertEqual(rows[0]["Estimated Value"], "30.00")
+        self.assertEqual(rows[0]["Status"], " 3 Waiting")
+        self.assertEqual(rows[1]["Quantity"], "5")
+        self.assertEqual(rows[1]["Status"], " 5 Listed")
+
+        response = self.client.get(reverse("all_items_csv"), {"gzip": 1})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(
+            len(gzip.decompress(b"".join(response.streaming_content)).splitlines()),
+            3,
+        )
+
+        for not_gzipped in ("0", "false"):
+            response = self.client.get(reverse("all_items_csv"), {"gzip": not_gzipped})
+            self.assertEqual(response["Content-Type"], "text/csv")
@@ -0,0 +1,107 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls.base import reverse
+from django.utils import timezone
+
+from goosetools.items.models import (
+    CharacterLocation,
+    InventoryItem,
+    ItemLocation,
+    StackedInventoryItem,
+)
+from goosetools.market.models import MarketOrder, SoldItem
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase, isk
+
+
+class StackTotalsTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        char_loc = CharacterLocation.objects.create(
+            character=self.char, system=self.system
+        )
+        self.loc = ItemLocation.objects.create(character_location=char_loc)
+        self.item.cached_lowest_sell = 10
+        self.item.save()
+
+    def a_stack(self, num_items):
+        stack = StackedInventoryItem.objects.create(created_at=timezone.now())
+        for _ in range(num_items):
+            InventoryItem.objects.create(
+                item=self.item,
+                quantity=2,
+                created_at=timezone.now(),
+                location=self.loc,
+                stack=stack,
+            )
+        return stack
+
+    def list_and_sell(self, stack):
+        listed, sold = list(stack.inventoryitem_set.order_by("pk"))[-2:]
+        listed.quantity = 0
+        listed.save()
+        MarketOrder.objects.create(
+            item=listed,
+            internal_or_external="internal",
+            buy_or_sell="sell",
+            quantity=2,
+            listed_at_price=isk(15),
+            transaction_tax=0,
+            broker_fee=0,
+        )
+        sold.quantity = 0
+        sold.save()
+        SoldItem.objects.create(item=sold, quantity=2, sold_via="internal")
+
+    def test_annotated_totals_match_the_unannotated_methods(self):
+        stack = self.a_stack(4)
+        self.list_and_sell(stack)
+        methods = [
+            "quantity",
+            "order_quantity",
+            "sold_quantity",
+            "total_quantity",
+            "total_quantity_display",
+            "estimated_profit",
+            "item",
+            "loc",
+            "can_edit",
+            "can_sell",
+            "buy_sell",
+            "internal_external",
+            "list_price",
+            "__str__",
+        ]
+        annotated = StackedInventoryItem.objects.with_totals().get(pk=stack.pk)
+        for method in methods:
+            self.assertEqual(
+                getattr(annotated, method)(), getattr(stack, method)(), method
+            )
+
+    def test_totals_are_read_from_the_annotations(self):
+        stack = self.a_stack(4)
+        self.list_and_sell(stack)
+        with self.assertNumQueries(1):
+            stack = StackedInventoryItem.objects.with_totals().get(pk=stack.pk)
+        with self.assertNumQueries(0):
+            stack.quantity()
+            stack.order_quantity()
+            stack.total_quantity_display()
+            stack.buy_sell()
+            stack.list_price()
+        with self.assertNumQueries(1):
+            str(stack)
+            stack.loc()
+            stack.can_edit()
+            stack.estimated_profit()
+
+    def test_stack_pages_do_not_query_per_item_in_the_stack(self):
+        small = self.a_stack(2)
+        large = self.a_stack(20)
+        for url_name in ["stack_sell", "junk_stack", "stack_delete"]:
+            query_counts = []
+            for stack in [small, large]:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(url_name, args=[stack.pk]))
+                self.assertEqual(response.status_code, 200, url_name)
+                query_counts.append(len(queries))
+            self.assertEqual(query_counts[0], query_counts[1], url_name)
@@ -12,6 +12,7 @@ from goosetools.items.querysets import ItemDbQuerySet
 from goosetools.items.views import (
     ItemChangeProposalList,
     all_items,
+    all_items_csv,
     approve_item_change,
     create_item_change,
     create_item_change_for_item,
@@ -56,6 +57,7 @@ urlpatterns = [
     path("loc/<int:pk>/junk/all/", junk_items, name="junk_items"),
     path("loc/<int:pk>/stack/all/", stack_items, name="stack_items"),
     path("item/all/", all_items, name="all_items"),
+    path("item/all/csv/", all_items_csv, name="all_items_csv"),
     path("item/grouped/", items_grouped, name="grouped_items"),
     path("junk/", junk, name="junk"),
     path("itemdb/", item_db, name="item_db"),
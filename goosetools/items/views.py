@@ -1,9 +1,9 @@
-import csv
 import math
 from decimal import Decimal
 from typing import Any, Dict, List
 
 import numpy as np
+import pandas as pd
 from bokeh.embed import components
 from bokeh.layouts import column
 from bokeh.models import ColumnDataSource, HoverTool, NumeralTickFormatter
@@ -11,16 +11,27 @@ from bokeh.plotting import figure
 from django import forms
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import ExpressionWrapper, F, Sum
+from django.db.models import (
+    BooleanField,
+    Count,
+    ExpressionWrapper,
+    F,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
 from django.db.models.fields import FloatField
 from django.db.models.functions import Coalesce
-from django.http.response import HttpResponse, HttpResponseRedirect
+from django.http.response import HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.generic import ListView
 from django_pandas.io import read_frame
 
+from goosetools.items.export import inventory_csv_chunks, inventory_item_rows
 from goosetools.items.forms import (
     DeleteItemForm,
     InventoryItemForm,
@@ -40,9 +51,11 @@ from goosetools.items.models import (
     to_isk,
 )
 from goosetools.notifications.notification_types import NOTIFICATION_TYPES
+from goosetools.pricing.constants import PRICE_TYPES
 from goosetools.pricing.models import DataSet
 from goosetools.users.forms import CharacterForm
 from goosetools.users.models import Character
+from goosetools.utils import gzip_chunks
 
 
 def forbidden(request):
@@ -106,39 +119,44 @@ def all_items(request):
 
 
 def all_items_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="item_dump.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['"Item Name"', '"Created At"', "Quantity", '"Item Type"'])
-    total = InventoryItem.objects.count()
-    print("Processing " + str(total) + " Items ")
-    i = 0
-    for item in InventoryItem.objects.select_related(
-        "marketorder", "junkeditem", "solditem", "item"
-    ).all():
-        i = i + 1
-        if i % math.floor(total / 100) == 0:
-            print(f"{i}/{total}")
-
-        writer.writerow(
-            [
-                item.item.name,
-                item.created_at,
-                item.total_quantity(),
-                item.item.item_type,
-            ]
+    """
+    Streams every inventory item as CSV, gzipped when `gzip` is 1 or true, so memory
+    use and the time to the first byte do not depend on how many items there are.
+    """
+    chunks = inventory_csv_chunks(inventory_item_rows())
+    filename = "item_dump.csv"
+    if request.GET.get("gzip", "").lower() in ("1", "true"):
+        response = StreamingHttpResponse(
+            gzip_chunks(chunks), content_type="application/gzip"
         )
-
+        filename = filename + ".gz"
+    else:
+        response = StreamingHttpResponse(chunks, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
 def get_items_in_location(char_loc, item_source=None):
-    loc = ItemLocation.objects.get(character_location=char_loc, corp_hanger=None)
+    return get_items_in_locations([char_loc], item_source)[0]
+
+
+def get_items_in_locations(char_locs, item_source=None):
+    """
+    The stacked and unstacked items in each character location, in the order given.
+    Stack totals and estimated profits are worked out in SQL so the number of
+    queries does not depend on how many items or stacks there are.
+    """
+    char_locs = list(char_locs)
     if item_source is None:
         item_source = InventoryItem.objects.filter(quantity__gt=0)
+    in_locations = item_source.filter(
+        contract__isnull=True,
+        location__character_location__in=char_locs,
+        location__corp_hanger__isnull=True,
+    )
     unstacked_items = (
-        item_source.filter(stack__isnull=True, contract__isnull=True, location=loc)
+        in_locations.filter(stack__isnull=True)
+        .select_related("item", "marketorder", "solditem", "junkeditem", "location")
         .annotate(
             estimated_profit_sum=ExpressionWrapper(
                 Coalesce(F("item__cached_lowest_sell"), 0)
@@ -148,55 +166,110 @@ def get_items_in_location(char_loc, item_source=None):
         )
         .order_by("-estimated_profit_sum")
     )
-    stacked_items = item_source.filter(
-        stack__isnull=False, contract__isnull=True, location=loc
-    ).order_by("-item__cached_lowest_sell")
-    stacks = {}
-    stacks_by_item: Dict[int, List[Any]] = {}
-    for item in stacked_items.all():
-        if item.stack.id not in stacks:
-            stacks[item.stack.id] = {
+
+    stack_items = InventoryItem.objects.filter(stack=OuterRef("stack")).order_by()
+    first_stack_item = stack_items.order_by("pk")[:1]
+    stack_rows = (
+        in_locations.filter(stack__isnull=False)
+        .values("location__character_location_id", "stack_id")
+        .annotate(
+            quantity=Sum("quantity"),
+            num_items=Count("item_id", distinct=True),
+            item_id=Min("item_id"),
+            lowest_sell=Min("item__cached_lowest_sell"),
+            stack_quantity=Subquery(
+                stack_items.values("stack")
+                .annotate(total=Sum("quantity"))
+                .values("total")
+            ),
+            order_quantity=Coalesce(
+                Subquery(
+                    stack_items.values("stack")
+                    .annotate(total=Sum("marketorder__quantity"))
+                    .values("total")
+                ),
+                0,
+            ),
+            can_edit=Subquery(
+                first_stack_item.annotate(
+                    editable=ExpressionWrapper(
+                        Q(marketorder__isnull=True)
+                        & Q(solditem__isnull=True)
+                        & Q(junkeditem__isnull=True)
+                        & Q(contract__isnull=True),
+                        output_field=BooleanField(),
+                    )
+                ).values("editable")
+            ),
+        )
+    )
+    stack_rows = list(stack_rows)
+    items = Item.objects.in_bulk({row["item_id"] for row in stack_rows})
+    stack_objects = StackedInventoryItem.objects.with_totals().in_bulk(
+        {row["stack_id"] for row in stack_rows}
+    )
+
+    stacks_per_loc: Dict[int, List[Dict[str, Any]]] = {}
+    for row in stack_rows:
+        if row["num_items"] > 1:
+            raise forms.ValidationError(f"Invalid Stack Found: {row['stack_id']}")
+        lowest_sell = row["lowest_sell"]
+        stacks_per_loc.setdefault(row["location__character_location_id"], []).append(
+            {
                 "type": "stack",
-                "stack": item.stack,
-                "stack_id": item.stack.id,
-                "item": item.item,
-                "quantity": item.quantity,
+                "stack": stack_objects[row["stack_id"]],
+                "stack_id": row["stack_id"],
+                "item": items[row["item_id"]],
+                "quantity": row["quantity"],
+                "order_quantity": row["order_quantity"],
+                "can_edit": row["can_edit"],
+                "estimated_profit": lowest_sell
+                and to_isk(
+                    (row["stack_quantity"] + row["order_quantity"]) * lowest_sell
+                ),
             }
-            if item.item.name not in stacks_by_item:
-                stacks_by_item[item.item.name] = []
-            stacks_by_item[item.item.name].append(stacks[item.stack.id])
-        else:
-            stack = stacks[item.stack.id]
-            if item.item != stack["item"]:
-                raise forms.ValidationError("Invalid Stack Found: " + item.stack.id)
-            stack["quantity"] = stack["quantity"] + item.quantity
-    total_in_loc = len(unstacked_items) + len(stacked_items.values("stack").distinct())
+        )
+    unstacked_per_loc: Dict[int, List[InventoryItem]] = {}
+    for item in unstacked_items:
+        unstacked_per_loc.setdefault(item.location.character_location_id, []).append(
+            item
+        )
 
-    return {
-        "total_in_loc": total_in_loc,
-        "loc": char_loc,
-        "char": char_loc.character,
-        "unstacked": unstacked_items,
-        "stacks": {
-            k: stacks[k]
-            for k in sorted(
-                stacks,
-                key=lambda x: stacks[x]["stack"].estimated_profit() or to_isk(0),
-                reverse=True,
-            )
-        },
-        "stacks_by_item": stacks_by_item,
-    }
+    result = []
+    for char_loc in char_locs:
+        loc_stacks = sorted(
+            stacks_per_loc.get(char_loc.id, []),
+            key=lambda stack: stack["estimated_profit"] or to_isk(0),
+            reverse=True,
+        )
+        stacks_by_item: Dict[str, List[Dict[str, Any]]] = {}
+        for stack in loc_stacks:
+            stacks_by_item.setdefault(stack["item"].name, []).append(stack)
+        unstacked = unstacked_per_loc.get(char_loc.id, [])
+        result.append(
+            {
+                "total_in_loc": len(unstacked) + len(loc_stacks),
+                "loc": char_loc,
+                "char": char_loc.character,
+                "unstacked": unstacked,
+                "stacks": {stack["stack_id"]: stack for stack in loc_stacks},
+                "stacks_by_item": stacks_by_item,
+            }
+        )
+    return result
 
 
 def render_item_view(request, characters, show_contract_all, title):
-    all_items_for_characters = []
-    for char in characters:
-        char_locs = CharacterLocation.objects.filter(character=char)
-        for char_loc in char_locs:
-            items = get_items_in_location(char_loc)
-            if items["total_in_loc"] > 0:
-                all_items_for_characters.append(items)
+    char_locs = (
+        CharacterLocation.objects.filter(character__in=characters)
+        .select_related("character", "system")
+        .order_by("character_id", "id")
+    )
+    all_items_for_characters = [
+        items
+        for items in get_items_in_locations(char_locs)
+        if items["total_in_loc"] > 0
+    ]
     result = render(
         request,
         "items/items.html",
@@ -223,7 +296,7 @@ def stack_in_location(loc):
             StackedInventoryItem.objects.get(id=stack["stack_id"]).delete()
         merged_stacks_by_item[item] = merge_stack["stack_id"]
 
-    for unstacked_item in unstacked.all():
+    for unstacked_item in unstacked:
         item_name = unstacked_item.item.name
         if item_name not in merged_stacks_by_item:
             new_stack = StackedInventoryItem(created_at=timezone.now())
@@ -236,14 +309,26 @@ def stack_in_location(loc):
     return True, f"Stacked All Items in {loc}!"
 
 
+def stack_items_for_display(stack):
+    return stack.inventoryitem_set.select_related(
+        "item",
+        "location__character_location__character",
+        "location__character_location__system",
+        "marketorder",
+        "solditem",
+        "junkeditem",
+        "contract",
+    )
+
+
 @transaction.atomic
 def stack_view(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     return render(
         request,
         "items/view_item_stack.html",
         {
-            "items": stack.inventoryitem_set.all(),
+            "items": stack_items_for_display(stack),
             "title": f"Viewing Item Stack {pk} in {stack.loc()}",
         },
     )
@@ -251,7 +336,7 @@ def stack_view(request, pk):
 
 @transaction.atomic
 def stack_delete(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     if request.method == "POST":
         if not stack.has_admin(request.gooseuser):
             messages.error(
@@ -265,7 +350,7 @@ def stack_delete(request, pk):
     return render(
         request,
         "items/delete_item_stack_confirm.html",
-        {"items": stack.inventoryitem_set.all()},
+        {"items": stack_items_for_display(stack)},
     )
 
 
@@ -291,7 +376,7 @@ def unjunk_item(request, pk):
 
 @transaction.atomic
 def junk_stack(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     if not stack.has_admin(request.gooseuser):
         messages.error(request, "You do not have permission to junk this item.")
         return HttpResponseRedirect(reverse("items"))
@@ -591,11 +676,12 @@ def item_data(request, pk):
                 price_list = price_lists.first()
         form.fields["price_list"].initial = price_list
 
-    df = get_df(request, days, item, filter_outliers, price_list)
     if style == "bar":
-        div, script = render_bar_graph(days, df, item, show_buy_sell)
+        candles = get_candles(request, days, item, filter_outliers, price_list)
+        div, script = render_bar_graph(days, candles, item, show_buy_sell)
 
     else:
+        df = get_df(request, days, item, filter_outliers, price_list)
         div, script = render_graph(days, df, item, show_buy_sell, style)
 
     result = render(
@@ -612,20 +698,26 @@ def item_data(request, pk):
     return result
 
 
+# Windows longer than this are graphed from the hourly rollups instead of every event.
+RAW_MARKET_DATA_DAYS = 7
+MARKET_DATA_COLUMNS = ["time", "sell", "buy", "highest_buy", "lowest_sell", "volume"]
+CANDLE_COLUMNS = ["day", "min", "max", "first", "close", "volume"]
+
+
 def get_df(request, days, item, filter_outliers, price_list):
     time_threshold = timezone.now() - timezone.timedelta(hours=int(days) * 24)
-    events_last_week = (
-        item.itemmarketdataevent_set.filter(
-            time__gte=time_threshold, price_list=price_list
+    if int(days) > RAW_MARKET_DATA_DAYS:
+        df = get_hourly_rollup_df(item, price_list, time_threshold)
+    else:
+        events_last_week = (
+            item.itemmarketdataevent_set.filter(
+                time__gte=time_threshold, price_list=price_list
+            )
+            .values(*MARKET_DATA_COLUMNS)
+            .order_by("time")
+            .all()
         )
-        .values("time", "sell", "buy", "highest_buy", "lowest_sell", "volume")
-        .order_by("time")
-        .all()
-    )
-    df = read_frame(
-        events_last_week,
-        fieldnames=["time", "sell", "buy", "highest_buy", "lowest_sell", "volume"],
-    )
+        df = read_frame(events_last_week, fieldnames=MARKET_DATA_COLUMNS)
     if filter_outliers:
         bads = []
         for f in ["sell", "buy", "highest_buy", "lowest_sell"]:
@@ -642,6 +734,68 @@ def get_df(request, days, item, filter_outliers, price_list):
     return df
 
 
+def get_hourly_rollup_df(item, price_list, time_threshold):
+    """
+    One row per hour with the closing price of each price type in that hour.
+    """
+    rollups = (
+        item.itemmarketdatarollup_set.filter(
+            price_list=price_list,
+            period="hour",
+            bucket__gte=time_threshold.replace(minute=0, second=0, microsecond=0),
+        )
+        .values("bucket", "price_type", "close", "volume")
+        .order_by("bucket")
+    )
+    rows: Dict[Any, Dict[str, Any]] = {}
+    for rollup in rollups:
+        row = rows.setdefault(
+            rollup["bucket"], {"time": rollup["bucket"], "volume": rollup["volume"]}
+        )
+        row[rollup["price_type"]] = rollup["close"]
+    return pd.DataFrame(list(rows.values()), columns=MARKET_DATA_COLUMNS)
+
+
+def get_candles(request, days, item, filter_outliers, price_list):
+    """
+    The daily candles of each price type. Outliers can only be stripped from
+    individual prices, otherwise the daily rollups are used as is.
+    """
+    if filter_outliers:
+        df = get_df(request, days, item, filter_outliers, price_list)
+        df["day"] = df["time"].dt.date
+        return {key: calc_vals_for_key(df, key) for key, _ in PRICE_TYPES}
+
+    time_threshold = timezone.now() - timezone.timedelta(hours=int(days) * 24)
+    rollups = (
+        item.itemmarketdatarollup_set.filter(
+            price_list=price_list,
+            period="day",
+            bucket__gte=time_threshold.replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ),
+        )
+        .values("bucket", "price_type", "open", "high", "low", "close", "volume")
+        .order_by("bucket")
+    )
+    candles: Dict[str, List[Dict[str, Any]]] = {key: [] for key, _ in PRICE_TYPES}
+    for rollup in rollups:
+        candles[rollup["price_type"]].append(
+            {
+                "day": rollup["bucket"].date(),
+                "min": rollup["low"],
+                "max": rollup["high"],
+                "first": rollup["open"],
+                "close": rollup["close"],
+                "volume": rollup["volume"],
+            }
+        )
+    return {
+        key: pd.DataFrame(rows, columns=CANDLE_COLUMNS).set_index("day")
+        for key, rows in candles.items()
+    }
+
+
 def is_outlier(points, thresh=3.5):
     """
     Returns a boolean array with True if points are outliers and False
@@ -687,10 +841,9 @@ def calc_vals_for_key(df, key):
     return df
 
 
-def render_bar_graph(days, df, item, show_buy_sell):
+def render_bar_graph(days, candles, item, show_buy_sell):
     tools = "pan, wheel_zoom, box_zoom, reset, save"
     title = f"Last {days} days of market data for {item}"
-    df["day"] = df["time"].dt.date
     w = 12 * 60 * 60 * 1000 * 1.5
     p = figure(
         x_axis_type="datetime",
@@ -702,7 +855,7 @@ def render_bar_graph(days, df, item, show_buy_sell):
     )
     sell_key = "sell" if show_buy_sell else "lowest_sell"
     buy_key = "buy" if show_buy_sell else "highest_buy"
-    df_agg = add_candlesticks(df, p, w, sell_key, "#D5E1DD", "#F2583E")
+    df_agg = add_candlesticks(candles[sell_key], p, w, sell_key, "#D5E1DD", "#F2583E")
     if not show_buy_sell:
         p3 = figure(
             x_axis_type="datetime",
@@ -716,7 +869,12 @@ def render_bar_graph(days, df, item, show_buy_sell):
     else:
         p3 = None
     add_candlesticks(
-        df, p3 if not show_buy_sell else p, w, buy_key, "#80eb34", "#eba834"
+        candles[buy_key],
+        p3 if not show_buy_sell else p,
+        w,
+        buy_key,
+        "#80eb34",
+        "#eba834",
     )
 
     p2 = figure(
@@ -743,7 +901,6 @@ def render_bar_graph(days, df, item, show_buy_sell):
 
 
 def add_candlesticks(df, p, w, key, increase_c, decrease_c):
-    df = calc_vals_for_key(df, key)
     df["open"] = df["close"].shift(1)
     df["open"][0] = df["first"][0]
     df["min"] = df[["min", "open"]].min(axis=1)
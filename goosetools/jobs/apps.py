@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = "goosetools.jobs"
+
+    def ready(self):
+        # Registers the job functions in each apps jobs.py module.
+        autodiscover_modules("jobs")
@@ -0,0 +1,18 @@
+from django_cron import Schedule
+
+from goosetools.jobs.runner import run_queued_jobs
+from goosetools.tenants.cron import TenantCronJob
+
+
+class RunJobs(TenantCronJob):
+    """
+    Picks up any queued jobs when no `manage.py run_jobs` worker is running.
+    """
+
+    RUN_EVERY_MINS = 1
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = "jobs.run_jobs"
+
+    def run_for_tenant(self, tenant):
+        return f"Ran {run_queued_jobs()} jobs"
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from goosetools.jobs.runner import run_queued_jobs_for_all_tenants
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "run_jobs"
+    help = (
+        "Runs queued jobs for every tenant. Any number of workers can run at once, "
+        "each job is only ever claimed by one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no queued jobs left instead of waiting for more.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2,
+            help="Seconds to wait before checking again when no jobs were queued.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            num_run = run_queued_jobs_for_all_tenants()
+            if num_run:
+                self.stdout.write(f"Ran {num_run} jobs")
+            elif options["once"]:
+                return
+            else:
+                close_old_connections()
+                time.sleep(options["sleep"])
@@ -0,0 +1,83 @@
+from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.safestring import SafeData
+
+from goosetools.users.models import GooseUser
+
+
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    name = models.TextField()
+    args = models.JSONField(default=dict, blank=True)  # type: ignore
+    submitted_by = models.ForeignKey(GooseUser, on_delete=models.CASCADE)
+    # Submitting a job again with the same key returns the existing job instead, so a
+    # resubmitted form is only ever applied once.
+    idempotency_key = models.TextField()
+    status = models.TextField(
+        choices=[
+            (QUEUED, "Queued"),
+            (RUNNING, "Running"),
+            (DONE, "Done"),
+            (FAILED, "Failed"),
+        ],
+        default=QUEUED,
+    )
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    # [level, message, is_safe] for each django.contrib.messages message the job sent.
+    messages = models.JSONField(default=list, blank=True)  # type: ignore
+    result = models.JSONField(null=True, blank=True)  # type: ignore
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def finished(self):
+        return self.status in (Job.DONE, Job.FAILED)
+
+    def progress_percent(self):
+        if not self.total:
+            return None
+        return min(100, round(self.progress * 100 / self.total))
+
+    def report_progress(self, progress, total=None):
+        """
+        Saves how far through the job is straight away. Only visible to the status page
+        before the job finishes when the job is not running inside a transaction.
+        """
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, total=self.total)
+
+    def add_message(self, level, message):
+        self.messages.append([level, str(message), isinstance(message, SafeData)])
+
+    def result_url(self):
+        if self.result is None:
+            return None
+        return reverse(self.result["url_name"], args=self.result["url_args"])
+
+    def finish(self, status, error=""):
+        self.status = status
+        self.error = error
+        self.finished_at = timezone.now()
+        self.save()
+
+    def __str__(self):
+        return f"{self.name} job {self.pk} ({self.status})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["submitted_by", "idempotency_key"],
+                name="job_idempotency_key_uniq",
+            )
+        ]
+        indexes = [models.Index(fields=["status", "id"], name="job_status_idx")]
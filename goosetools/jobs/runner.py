@@ -0,0 +1,186 @@
+import logging
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.utils import tenant_context
+
+from goosetools.jobs.models import Job
+from goosetools.tenants.models import Client
+
+logger = logging.getLogger(__name__)
+
+# How many times a job is started before it is failed, a job is only started again
+# when the worker running it died part way through.
+MAX_ATTEMPTS = 3
+# How many queued or running jobs are looked at when claiming the next one.
+CLAIM_BATCH_SIZE = 20
+
+# job name -> (function, whether it runs inside a single transaction)
+JOB_FUNCTIONS: Dict[str, Tuple[Callable, bool]] = {}
+
+
+def job_function(name: str, atomic: bool = True):
+    """
+    Registers a function which can be run as a job. It is called with the job, a
+    JobRequest and the jobs args as keyword arguments and returns the url name and
+    args to send the user to once it is done, or None.
+
+    An atomic job runs in one transaction along with it being marked done, so if its
+    worker dies it is rolled back and simply run again. A non atomic job manages its
+    own transactions, which lets its reported progress be seen while it runs, but it
+    must be safe to run again after only part of it was committed.
+
+    Job functions live in a jobs.py module in their app which is imported on start
+    up by goosetools.jobs.apps.JobsConfig.
+    """
+
+    def register(func):
+        JOB_FUNCTIONS[name] = (func, atomic)
+        return func
+
+    return register
+
+
+class JobRequest:
+    """
+    Stands in for the request when code shared with views runs as a job. It has the
+    submitting users gooseuser and collects anything sent with django.contrib.messages
+    onto the job so the status page can show it afterwards.
+    """
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.gooseuser = job.submitted_by
+        self._messages = self
+
+    # Called by django.contrib.messages.add_message in place of a message storage.
+    def add(self, level, message, extra_tags=""):  # pylint: disable=unused-argument
+        self.job.add_message(level, message)
+
+
+def idempotency_key(request) -> str:
+    """
+    The idempotency key a form was rendered with or a new one to render it with.
+    """
+    return request.POST.get("idempotency_key") or uuid.uuid4().hex
+
+
+def submit_job(name: str, gooseuser, key: str, **args) -> Job:
+    """
+    Queues a job for the worker, or if the user already submitted a job with the same
+    key returns that job instead. With JOBS_RUN_IMMEDIATELY set the job is run
+    straight away in the current process.
+    """
+    if name not in JOB_FUNCTIONS:
+        raise KeyError(f"Unknown job {name}")
+    job, created = Job.objects.get_or_create(
+        submitted_by=gooseuser,
+        idempotency_key=key,
+        defaults={"name": name, "args": args},
+    )
+    if created and settings.JOBS_RUN_IMMEDIATELY:
+        claimed = claim_next_job(Job.objects.filter(pk=job.pk))
+        if claimed is not None:
+            run_job(claimed)
+        job.refresh_from_db()
+    return job
+
+
+def _advisory_lock(job_id: int, function: str) -> bool:
+    # Advisory lock keys are shared by every schema so the schema is part of the key.
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {function}(hashtext(current_schema()), %s)", [job_id])
+        return cursor.fetchone()[0]
+
+
+def claim_next_job(jobs=None) -> Optional[Job]:
+    """
+    Claims the oldest queued job in the current tenant, or a running job whose worker
+    has died, and marks it as running.
+
+    Other workers skip over the rows locked while a job is being claimed. The claiming
+    worker then keeps holding a session advisory lock for the job until it finishes
+    running it, which Postgres releases if the worker dies, so a running job whose
+    lock can be taken has been abandoned.
+    """
+    if jobs is None:
+        jobs = Job.objects.all()
+    with transaction.atomic():
+        candidates = (
+            jobs.select_for_update(skip_locked=True)
+            .filter(status__in=[Job.QUEUED, Job.RUNNING])
+            .order_by("id")[:CLAIM_BATCH_SIZE]
+        )
+        for job in candidates:
+            if not _advisory_lock(job.id, "pg_try_advisory_lock"):
+                continue
+            if job.attempts >= MAX_ATTEMPTS:
+                job.finish(
+                    Job.FAILED,
+                    f"Gave up after the job was started {job.attempts} times without "
+                    f"finishing.",
+                )
+                _advisory_lock(job.id, "pg_advisory_unlock")
+                continue
+            job.status = Job.RUNNING
+            job.attempts = job.attempts + 1
+            job.started_at = timezone.now()
+            job.save()
+            return job
+    return None
+
+
+def run_job(job: Job):
+    """
+    Runs a job claimed by claim_next_job and records its outcome.
+    """
+    func, atomic = JOB_FUNCTIONS[job.name]
+    request = JobRequest(job)
+    try:
+        if atomic:
+            with transaction.atomic():
+                job.result = _result(func(job, request, **job.args))
+                job.finish(Job.DONE)
+        else:
+            job.result = _result(func(job, request, **job.args))
+            job.finish(Job.DONE)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception(f"Job {job.id} {job.name} failed")
+        job.finish(Job.FAILED, str(e) or e.__class__.__name__)
+    finally:
+        _advisory_lock(job.id, "pg_advisory_unlock")
+
+
+def _result(redirect_to):
+    if redirect_to is None:
+        return None
+    url_name, url_args = redirect_to
+    return {"url_name": url_name, "url_args": list(url_args)}
+
+
+def run_queued_jobs(max_jobs: Optional[int] = None) -> int:
+    """
+    Runs queued jobs in the current tenant until there are none left or max_jobs
+    have been run, returning how many were run.
+    """
+    num_run = 0
+    while max_jobs is None or num_run < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        logger.info(f"Running {job}")
+        run_job(job)
+        num_run = num_run + 1
+    return num_run
+
+
+def run_queued_jobs_for_all_tenants(max_jobs_per_tenant: Optional[int] = None) -> int:
+    num_run = 0
+    for tenant in Client.objects.all():
+        if tenant.name != "public":
+            with tenant_context(tenant):
+                num_run = num_run + run_queued_jobs(max_jobs_per_tenant)
+    return num_run
@@ -0,0 +1,103 @@
+from django.contrib import messages
+from django.contrib.messages import get_messages
+from django.test import override_settings
+from django.urls.base import reverse
+
+from goosetools.jobs.models import Job
+from goosetools.jobs.runner import (
+    MAX_ATTEMPTS,
+    claim_next_job,
+    job_function,
+    run_queued_jobs,
+    submit_job,
+)
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+runs = []
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@job_function("test_job")
+def a_test_job(job, request, value):
+    if value == "fail":
+        raise ValueError("Told to fail")
+    runs.append(value)
+    messages.success(request, f"Ran {value}")
+    return "sold", []
+
+
+class JobTest(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        runs.clear()
+
+    def test_a_resubmitted_job_is_only_run_once(self):
+        job = submit_job("test_job", self.user, "key", value=1)
+        resubmitted = submit_job("test_job", self.user, "key", value=1)
+
+        self.assertEqual(job, resubmitted)
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(runs, [1])
+        self.assertEqual(job.messages, [[messages.SUCCESS, "Ran 1", False]])
+        self.assertEqual(job.result_url(), reverse("sold"))
+
+    @override_settings(JOBS_RUN_IMMEDIATELY=False)
+    def test_queued_jobs_are_run_by_the_worker_in_order(self):
+        first = submit_job("test_job", self.user, "first", value=1)
+        second = submit_job("test_job", self.other_user, "second", value=2)
+        self.assertEqual(first.status, Job.QUEUED)
+        self.assertEqual(runs, [])
+
+        self.assertEqual(run_queued_jobs(), 2)
+
+        self.assertEqual(runs, [1, 2])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (Job.DONE, 1))
+        self.assertEqual((second.status, second.attempts), (Job.DONE, 1))
+        self.assertEqual(run_queued_jobs(), 0)
+
+    def test_a_failing_job_records_its_error(self):
+        job = submit_job("test_job", self.user, "key", value="fail")
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, "Told to fail")
+
+    def test_an_abandoned_job_is_failed_after_too_many_attempts(self):
+        job = Job.objects.create(
+            name="test_job",
+            args={"value": 1},
+            submitted_by=self.user,
+            idempotency_key="key",
+            status=Job.RUNNING,
+            attempts=MAX_ATTEMPTS,
+        )
+
+        self.assertIsNone(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(runs, [])
+
+    @override_settings(JOBS_RUN_IMMEDIATELY=False)
+    def test_status_page_shows_progress_then_forwards_to_the_result(self):
+        job = submit_job("test_job", self.user, "key", value=1)
+        job.report_progress(3, 4)
+
+        response = self.client.get(reverse("jobs:job_view", args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["job"].progress_percent(), 75)
+
+        run_queued_jobs()
+        response = self.client.get(reverse("jobs:job_view", args=[job.pk]))
+        self.assertRedirects(response, reverse("sold"), fetch_redirect_response=False)
+        self.assertEqual(
+            [str(m) for m in get_messages(response.wsgi_request)], ["Ran 1"]
+        )
+
+    def test_other_users_jobs_cannot_be_viewed(self):
+        job = submit_job("test_job", self.other_user, "key", value=1)
+
+        response = self.client.get(reverse("jobs:job_view", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from goosetools.jobs.views import job_view
+
+app_name = "jobs"
+
+urlpatterns = [
+    path("job/<int:pk>/", job_view, name="job_view"),
+]
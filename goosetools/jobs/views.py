@@ -0,0 +1,37 @@
+from django.contrib import messages
+from django.http.response import HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from goosetools.jobs.models import Job
+
+
+def redirect_to_job(request, job: Job):
+    """
+    Sends the user on to where a finished job wanted them to go, passing on any
+    messages it sent, or otherwise to its status page.
+    """
+    if job.status != Job.DONE or job.result is None:
+        return HttpResponseRedirect(reverse("jobs:job_view", args=[job.pk]))
+    for level, message, is_safe in job.messages:
+        messages.add_message(request, level, mark_safe(message) if is_safe else message)
+    return HttpResponseRedirect(job.result_url())
+
+
+def job_view(request, pk):
+    job = get_object_or_404(Job, pk=pk, submitted_by=request.gooseuser)
+    if job.status == Job.DONE and job.result is not None:
+        return redirect_to_job(request, job)
+    return render(
+        request,
+        "jobs/job_view.html",
+        {
+            "job": job,
+            "job_messages": [
+                (level, mark_safe(message) if is_safe else message)
+                for level, message, is_safe in job.messages
+            ],
+            "title": f"{job.get_status_display()} Job",
+        },
+    )
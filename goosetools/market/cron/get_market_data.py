@@ -1,69 +1,119 @@
-import csv
 from decimal import Decimal
+from typing import List
 
-import requests
 from django.conf import settings
+from django.db import transaction
 from django.utils.dateparse import parse_datetime
-from django_cron import CronJobBase, Schedule
-from django_tenants.utils import tenant_context
+from django_cron import Schedule
 
+from goosetools.global_items.models import GlobalMarketDataBatch
 from goosetools.items.models import Item
+from goosetools.market.market_api import fetch_stats_csv, stats_csv_url
+from goosetools.pricing.ingest import IngestTimer, apply_staged_market_data
 from goosetools.pricing.models import DataSet, ItemMarketDataEvent
-from goosetools.tenants.models import Client
-from goosetools.utils import cron_header_line
+from goosetools.tenants.cron import TenantCronJob
 
+STATS_CSV_SOURCE = "stats_csv"
+STATS_CSV_FIELDS = ["sell", "buy", "lowest_sell", "highest_buy"]
 
-class GetMarketData(CronJobBase):
+
+class GetMarketData(TenantCronJob):
     RUN_EVERY_MINS = 60
 
     schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
     code = "market.get_market_data"
+    lines: List[List[str]] = []
+    batch = None
+
+    def prepare(self):
+        self.lines = fetch_stats_csv()
+        print(f"Found {len(self.lines)} lines of market data from {stats_csv_url()}")
+        if settings.MARKET_DATA_BULK_INGEST:
+            self.batch = stage_stats_csv(self.lines)
+        return True
+
+    def run_for_tenant(self, tenant):
+        print(f"Inserting latest market data for {tenant.name}")
+        if self.batch:
+            apply_staged_stats_csv(self.batch)
+        else:
+            ingest_market_data_row_by_row(self.lines)
+
+
+def _parse_time(datetime_str):
+    time = parse_datetime(datetime_str)
+    if time is None:
+        raise Exception(f"Invalid datetime recieved from stats.csv: {datetime_str}")
+    return time
+
+
+def stage_stats_csv(lines: List[List[str]]) -> GlobalMarketDataBatch:
+    batch = GlobalMarketDataBatch.start(STATS_CSV_SOURCE)
+    batch.stage(
+        (
+            line[0],
+            _parse_time(line[2]),
+            decimal_or_none(line[3]),
+            decimal_or_none(line[4]),
+            decimal_or_none(line[5]),
+            decimal_or_none(line[6]),
+            None,
+        )
+        for line in lines
+    )
+    batch.finish()
+    return batch
+
 
-    def do(self):
-        cron_header_line(self.code)
-        r = requests.get("https://api.eve-echoes-market.com/market-stats/stats.csv")
-        content = r.content
-        decoded_content = content.decode("UTF-8")
-        csv_lines = csv.reader(decoded_content.splitlines(), delimiter=",")
-        lines = list(csv_lines)[1:]
-        print(
-            f"Found {len(lines)} lines of market data from https://api.eve-echoes-market.com/market-stats/stats.csv"
+def apply_staged_stats_csv(batch: GlobalMarketDataBatch) -> int:
+    ingest_timer = IngestTimer()
+    price_list_ids = list(
+        DataSet.objects.filter(api_type="eve_echoes_market").values_list(
+            "id", flat=True
         )
-        for tenant in Client.objects.all():
-            with tenant_context(tenant):
-                if tenant.name != "public":
-                    print(f"Inserting latest market data for {tenant.name}")
-                    for line in lines:
-                        market_id = line[0]
-                        datetime_str = line[2]
-                        time = parse_datetime(datetime_str)
-                        if time is None:
-                            raise Exception(
-                                f"Invalid datetime recieved from stats.csv: {time}"
-                            )
-                        try:
-                            item = Item.objects.get(eve_echoes_market_id=market_id)
-                            lowest_sell = decimal_or_none(line[5])
-                            for ee_pl in DataSet.objects.filter(
-                                api_type="eve_echoes_market"
-                            ):
-                                ItemMarketDataEvent.objects.update_or_create(
-                                    price_list=ee_pl,
-                                    item=item,
-                                    time=time,
-                                    defaults={
-                                        "sell": decimal_or_none(line[3]),
-                                        "buy": decimal_or_none(line[4]),
-                                        "lowest_sell": lowest_sell,
-                                        "highest_buy": decimal_or_none(line[6]),
-                                    },
-                                )
-                            item.cached_lowest_sell = lowest_sell
-                            item.save()
-                        except Item.DoesNotExist:
-                            print(
-                                f"WARNING: Market Data Found for Item not in {settings.SITE_NAME}- id:{market_id}"
-                            )
+    )
+    with transaction.atomic():
+        num_events = apply_staged_market_data(
+            batch.id, price_list_ids, STATS_CSV_FIELDS
+        )
+    print(ingest_timer.report(num_events, "Bulk ingested market data"))
+    return num_events
+
+
+def bulk_ingest_market_data(lines: List[List[str]]) -> int:
+    return apply_staged_stats_csv(stage_stats_csv(lines))
+
+
+def ingest_market_data_row_by_row(lines: List[List[str]]) -> int:
+    ingest_timer = IngestTimer()
+    num_events = 0
+    for line in lines:
+        market_id = line[0]
+        time = _parse_time(line[2])
+        try:
+            item = Item.objects.get(eve_echoes_market_id=market_id)
+            lowest_sell = decimal_or_none(line[5])
+            for ee_pl in DataSet.objects.filter(api_type="eve_echoes_market"):
+                ItemMarketDataEvent.objects.update_or_create(
+                    price_list=ee_pl,
+                    item=item,
+                    time=time,
+                    defaults={
+                        "sell": decimal_or_none(line[3]),
+                        "buy": decimal_or_none(line[4]),
+                        "lowest_sell": lowest_sell,
+                        "highest_buy": decimal_or_none(line[6]),
+                    },
+                )
+                num_events += 1
+            item.cached_lowest_sell = lowest_sell
+            item.save()
+        except Item.DoesNotExist:
+            print(
+                f"WARNING: Market Data Found for Item not in {settings.SITE_NAME}- id:{market_id}"
+            )
+    print(ingest_timer.report(num_events, "Ingested market data row by row"))
+    return num_events
 
 
 def decimal_or_none(val):
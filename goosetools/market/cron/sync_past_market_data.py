@@ -1,15 +1,19 @@
-from django.core.management import call_command
-from django_cron import CronJobBase, Schedule
+from django_cron import Schedule
 
-from goosetools.utils import cron_header_line
+from goosetools.market.management.commands.sync_past_market_data import Command
+from goosetools.tenants.cron import TenantCronJob
 
 
-class SyncPastMarketData(CronJobBase):
+class SyncPastMarketData(TenantCronJob):
     RUN_EVERY_MINS = 7 * 60 * 24
 
     schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
     code = "market.sync_past_market_data"
+    batch = None
 
-    def do(self):
-        cron_header_line(self.code)
-        call_command("sync_past_market_data", "--lookback_days=8")
+    def prepare(self):
+        self.batch = Command.fetch_and_stage(lookback_days=8)
+        return True
+
+    def run_for_tenant(self, tenant):
+        Command.apply_to_tenant(self.batch)
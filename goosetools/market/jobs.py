@@ -0,0 +1,76 @@
+import math as m
+from decimal import Decimal
+
+from django.contrib import messages
+from django.db import transaction
+from django.utils import timezone
+
+from goosetools.bank.models import IskTransaction
+from goosetools.items.models import InventoryItem
+from goosetools.jobs.runner import job_function
+from goosetools.market.models import SoldItem, to_isk
+
+
+def buy_back_item(item, price, cut):
+    cut_price = price * cut
+    profit_line = IskTransaction(
+        item=item,
+        time=timezone.now(),
+        isk=to_isk(m.floor(cut_price * item.quantity)),
+        quantity=item.quantity,
+        transaction_type="buyback",
+        notes=f"Corp Buyback using price {price} and a cut for the "
+        f"corp of {cut * 100}% ",
+    )
+    profit_line.full_clean()
+    profit_line.save()
+    sold_item = SoldItem(item=item, quantity=item.quantity, sold_via="internal")
+    sold_item.full_clean()
+    sold_item.save()
+    item.quantity = 0
+    item.full_clean()
+    item.save()
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@job_function("sell_all_items", atomic=False)
+def sell_all_items_job(job, request, location_id, overall_cut, sales):
+    # Each item is bought back in its own transaction so progress can be shown as
+    # they go. An item which has already been bought back can no longer be sold so
+    # running this again after a crash only buys back the items left over.
+    cut = 1 - Decimal(Decimal(overall_cut) / 100)
+    to_buy_back = []
+    for sale in sales:
+        if sale["inv_item_id"]:
+            item_ids = [sale["inv_item_id"]]
+        else:
+            item_ids = InventoryItem.objects.filter(
+                stack_id=sale["stack_id"]
+            ).values_list("id", flat=True)
+        to_buy_back += [(item_id, Decimal(sale["price"])) for item_id in item_ids]
+
+    job.report_progress(0, len(to_buy_back))
+    failed = 0
+    for i, (item_id, price) in enumerate(to_buy_back):
+        with transaction.atomic():
+            item = InventoryItem.objects.select_for_update().filter(pk=item_id).first()
+            if item is not None and item.can_sell():
+                buy_back_item(item, price, cut)
+            else:
+                failed = failed + 1
+                messages.error(
+                    request,
+                    f"Item {item or item_id} cannot be sold, maybe it is already being "
+                    f"sold or is in a pending contract?",
+                )
+        job.report_progress(i + 1)
+
+    if failed:
+        messages.warning(
+            request,
+            f"Bought back {len(to_buy_back) - failed} of {len(to_buy_back)} items.",
+        )
+    else:
+        messages.success(request, "Items succesfully bought")
+    return "sold", []
@@ -0,0 +1,95 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django_tenants.utils import tenant_context
+
+from goosetools.items.models import Item, ItemSubSubType, ItemSubType, ItemType
+from goosetools.market.cron.get_market_data import (
+    bulk_ingest_market_data,
+    ingest_market_data_row_by_row,
+)
+from goosetools.market.market_api import parse_stats_csv
+from goosetools.pricing.ingest import IngestTimer
+from goosetools.pricing.models import DataSet
+from goosetools.tenants.models import Client
+
+BENCHMARK_MARKET_ID_PREFIX = "benchmark-"
+
+
+def synthetic_stats_csv(num_items: int, time) -> bytes:
+    lines = ["item_id,name,time,sell,buy,lowest_sell,highest_buy,volume"]
+    for i in range(num_items):
+        sell = round(random.uniform(1, 1000000), 2)
+        lines.append(
+            f"{BENCHMARK_MARKET_ID_PREFIX}{i},Benchmark Item {i},{time.isoformat()},"
+            f"{sell},{round(sell * 0.9, 2)},{round(sell * 0.95, 2)},"
+            f"{round(sell * 0.85, 2)},{random.randint(0, 10000)}"
+        )
+    return "\n".join(lines).encode("UTF-8")
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "benchmark_market_ingest"
+    help = (
+        "Compares the row by row and bulk market data ingest paths on a synthetic "
+        "stats.csv. Everything written is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=5000)
+        parser.add_argument(
+            "--tenant",
+            type=str,
+            default=None,
+            help="Schema name of the tenant to benchmark in, defaults to the first "
+            "non public tenant.",
+        )
+
+    def handle(self, *args, **options):
+        if options["tenant"]:
+            tenant = Client.objects.get(schema_name=options["tenant"])
+        else:
+            tenant = Client.objects.exclude(schema_name="public").first()
+        with tenant_context(tenant):
+            with transaction.atomic():
+                self.run_benchmark(options["items"])
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def setup_items(num_items: int):
+        item_type = ItemType.objects.create(name="benchmark_item_type")
+        sub_type = ItemSubType.objects.create(
+            name="benchmark_sub_type", item_type=item_type
+        )
+        sub_sub_type = ItemSubSubType.objects.create(
+            name="benchmark_sub_sub_type", item_sub_type=sub_type
+        )
+        Item.objects.bulk_create(
+            [
+                Item(
+                    name=f"Benchmark Item {i}",
+                    item_type=sub_sub_type,
+                    eve_echoes_market_id=f"{BENCHMARK_MARKET_ID_PREFIX}{i}",
+                )
+                for i in range(num_items)
+            ]
+        )
+        DataSet.ensure_default_exists()
+
+    def run_benchmark(self, num_items: int):
+        self.setup_items(num_items)
+        lines = parse_stats_csv(synthetic_stats_csv(num_items, timezone.now()))
+        for name, ingest in [
+            ("row by row", ingest_market_data_row_by_row),
+            ("bulk", bulk_ingest_market_data),
+        ]:
+            sid = transaction.savepoint()
+            # The first pass only inserts new events, the second pass for the same
+            # csv updates every one of them.
+            for run in ["insert", "update"]:
+                ingest_timer = IngestTimer()
+                num_rows = ingest(lines)
+                self.stdout.write(ingest_timer.report(num_rows, f"{name} ({run})"))
+            transaction.savepoint_rollback(sid)
@@ -1,4 +1,3 @@
-import csv
 import json
 import re
 
@@ -13,6 +12,7 @@ from goosetools.items.models import (
     ItemSubType,
     ItemType,
 )
+from goosetools.market.market_api import fetch_stats_csv
 from goosetools.tenants.models import Client
 
 
@@ -103,10 +103,8 @@ class Command(BaseCommand):
         return item_id_to_sub_sub_type
 
     def handle(self, *args, **options):
-        r = requests.get("https://api.eve-echoes-market.com/market-stats/stats.csv")
-        content = r.content
-        decoded_content = content.decode("UTF-8")
-        csv_lines = csv.reader(decoded_content.splitlines(), delimiter=",")
+        # Parsed into a list once up front so every tenant sees every line.
+        csv_lines = fetch_stats_csv()
         data = self.get_item_names()
 
         approve = options["approve"]
@@ -128,7 +126,7 @@ class Command(BaseCommand):
     def sync_items(self, csv_lines, data, item_id_to_sub_sub_type):
         item_names = data["item_names"]
         seen_ids = set()
-        for line in list(csv_lines)[1:]:
+        for line in csv_lines:
             market_id_csv = line[0]
             if market_id_csv in seen_ids:
                 raise Exception(
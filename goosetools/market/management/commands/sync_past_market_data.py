@@ -1,23 +1,27 @@
-import csv
 import select
 import sys
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import List, Tuple
 
-import requests
-import requests_cache
 from django.core.management.base import BaseCommand
-from django.db import connection
+from django.db import connection, transaction
 from django.utils import timezone
-from django_tenants.utils import tenant_context
 
-from goosetools.items.models import Item
-from goosetools.pricing.models import DataSet, ItemMarketDataEvent
-from goosetools.tenants.models import Client
-
-session = requests_cache.CachedSession(
-    "past_market_data_sync", expire_after=timedelta(hours=12)
+from goosetools.global_items.models import GlobalMarketDataBatch
+from goosetools.market.market_api import (
+    DEFAULT_MARKET_API_URL,
+    TokenBucket,
+    fetch_item_histories,
+    fetch_stats_csv,
+    market_id_sort_key,
+)
+from goosetools.pricing.ingest import (
+    MARKET_DATA_FIELDS,
+    IngestTimer,
+    apply_staged_market_data,
 )
+from goosetools.pricing.models import DataSet
+from goosetools.tenants.cron import run_for_tenants
 
 
 class Command(BaseCommand):
@@ -27,100 +31,187 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--lookback_days", action="store", type=int)
         parser.add_argument("--truncate", action="store_true")
-        parser.add_argument("--request_sleep", action="store", type=float)
+        parser.add_argument(
+            "--request_sleep",
+            action="store",
+            type=float,
+            help="Average seconds between requests to the market api across all "
+            "workers, 0 to not rate limit at all.",
+        )
+        parser.add_argument("--workers", action="store", type=int, default=4)
+        parser.add_argument(
+            "--batch_size",
+            action="store",
+            type=int,
+            default=50,
+            help="How many items are staged and checkpointed at once.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint of an unfinished previous run and start again.",
+        )
+        parser.add_argument("--api_url", action="store", default=DEFAULT_MARKET_API_URL)
+        parser.add_argument(
+            "--tenants",
+            action="store",
+            nargs="*",
+            help="Only sync these tenant schema names.",
+        )
+        parser.add_argument(
+            "--tenant_workers",
+            action="store",
+            type=int,
+            help="How many tenants the staged market data is applied to at once.",
+        )
 
     def handle(self, *args, **options):
-        r = requests.get("https://api.eve-echoes-market.com/market-stats/stats.csv")
-        content = r.content
-        decoded_content = content.decode("UTF-8")
-        csv_lines = csv.reader(decoded_content.splitlines(), delimiter=",")
+        truncate = options["truncate"] and self.truncate_if_sure()
+        request_sleep = options["request_sleep"]
+        if request_sleep is None:
+            request_sleep = 1
+        batch = self.fetch_and_stage(
+            options["lookback_days"] or 7,
+            request_sleep,
+            options["workers"],
+            options["batch_size"],
+            options["restart"],
+            options["api_url"],
+        )
+        run_for_tenants(
+            self.COMMAND_NAME,
+            lambda tenant: self.sync_tenant(batch, truncate),
+            options["tenants"],
+            options["tenant_workers"],
+        )
 
-        lookback_days = options["lookback_days"] or 7
+    # pylint: disable=too-many-arguments
+    @staticmethod
+    def fetch_and_stage(
+        lookback_days,
+        request_sleep=1,
+        workers=4,
+        batch_size=50,
+        restart=False,
+        api_url=DEFAULT_MARKET_API_URL,
+    ) -> GlobalMarketDataBatch:
+        market_ids = sorted(
+            {line[0] for line in fetch_stats_csv(api_url)}, key=market_id_sort_key
+        )
         cutoff = timezone.now() - timezone.timedelta(days=lookback_days)
-        request_sleep = options["request_sleep"] or 1
         print(
             f"Looking back {lookback_days} days to {cutoff} with per request sleep "
-            f"of {request_sleep} seconds."
+            f"of {request_sleep} seconds using {workers} workers."
         )
+        bucket = TokenBucket(1 / request_sleep) if request_sleep > 0 else None
 
-        for tenant in Client.objects.all():
-            with tenant_context(tenant):
-                if tenant.name != "public":
-                    print(f"Syncing tenant: {tenant.name}")
-                    if options["truncate"]:
-                        self.truncate_if_sure()
-                    for line in list(csv_lines)[1:]:
-                        try:
-                            market_id = line[0]
-                            print("------------------------------------------")
-                            print(f"Syncing item id :{market_id}")
-                            url = f"https://api.eve-echoes-market.com/market-stats/{market_id}"
-
-                            time.sleep(request_sleep)
-                            item_data = requests.get(url).json()
-                            self.sync_item(cutoff, item_data, market_id)
-                        except Exception as e:  # pylint: disable=broad-except
-                            print(f"WARNING EXCEPTION = {e}")
-                    # After the first tenant we have cached all market data, turn off
-                    # the sleep!
-                    request_sleep = 0
+        batch = GlobalMarketDataBatch.resume_or_start(Command.COMMAND_NAME, restart)
+        Command.stage_market_data(
+            batch, market_ids, cutoff, api_url, workers, bucket, batch_size
+        )
+        return batch
 
     @staticmethod
-    def sync_item(cutoff, item_data, market_id):
-        latest_item_data = item_data[-1]
-        item_obj = Item.objects.get(eve_echoes_market_id=market_id)
-        item_obj.cached_lowest_sell = decimal_or_none(latest_item_data["lowest_sell"])
-        item_obj.save()
-        print(f"   Item is {item_obj}")
-        print(f"   Found {len(item_data)} data points.")
-        update_count = 0
-        create_count = 0
-        for item in reversed(item_data):
-            event_time = timezone.make_aware(
-                datetime.utcfromtimestamp(int(item["time"]))
+    def sync_tenant(batch, truncate=False):
+        if truncate:
+            Command.truncate()
+        Command.apply_to_tenant(batch)
+
+    # pylint: disable=too-many-arguments
+    @staticmethod
+    def stage_market_data(
+        batch, market_ids, cutoff, api_url, workers, bucket, batch_size
+    ):
+        """
+        Downloads the history of every market id into the public schema once for all
+        tenants, resuming after the last market id staged by a crashed earlier run.
+        """
+        ingest_timer = IngestTimer()
+        remaining = market_ids
+        if batch.last_staged_market_id is not None:
+            last_key = market_id_sort_key(batch.last_staged_market_id)
+            remaining = [m for m in market_ids if market_id_sort_key(m) > last_key]
+            print(
+                f"Resuming after market id {batch.last_staged_market_id}, "
+                f"{len(remaining)} of {len(market_ids)} items left."
+            )
+
+        points: List[Tuple] = []
+        staged = 0
+        for i, (market_id, history, error) in enumerate(
+            fetch_item_histories(remaining, api_url, workers, bucket)
+        ):
+            if error is not None:
+                print(f"WARNING EXCEPTION syncing item id {market_id} = {error}")
+            else:
+                points.extend(points_after(cutoff, market_id, history))
+            if (i + 1) % batch_size == 0 or i + 1 == len(remaining):
+                batch.stage(points, last_market_id=market_id)
+                staged += len(points)
+                print(f"   Staged {len(points)} data points up to {market_id}.")
+                points = []
+        batch.finish()
+        print(ingest_timer.report(staged, "Staged past market data"))
+
+    @staticmethod
+    def apply_to_tenant(batch):
+        ingest_timer = IngestTimer()
+        price_list_ids = list(
+            DataSet.objects.filter(api_type="eve_echoes_market").values_list(
+                "id", flat=True
             )
-            if event_time < cutoff:
-                print(f"   Cutting off at item {update_count + create_count}.")
-                break
-            for ee_pl in DataSet.objects.filter(api_type="eve_echoes_market"):
-                _, created = ItemMarketDataEvent.objects.update_or_create(
-                    price_list=ee_pl,
-                    item=item_obj,
-                    time=event_time,
-                    defaults={
-                        "sell": decimal_or_none(item["sell"]),
-                        "buy": decimal_or_none(item["buy"]),
-                        "lowest_sell": decimal_or_none(item["lowest_sell"]),
-                        "highest_buy": decimal_or_none(item["highest_buy"]),
-                        "volume": decimal_or_none(item["volume"]),
-                    },
-                )
-                if created:
-                    create_count = create_count + 1
-                else:
-                    update_count = update_count + 1
-        print(
-            f"   Created {create_count} Points and Updated"
-            f" {update_count} data points."
         )
+        with transaction.atomic():
+            upserted = apply_staged_market_data(
+                batch.id, price_list_ids, MARKET_DATA_FIELDS
+            )
+        print("   " + ingest_timer.report(upserted, "Synced past market data"))
 
     @staticmethod
-    def truncate_if_sure():
-        cursor = connection.cursor()
+    def truncate_if_sure() -> bool:
         print(
-            "Are you sure you want to truncate? You have 10 seconds to enter Y to "
-            "confirm."
+            "Are you sure you want to truncate the market data of every tenant being "
+            "synced? You have 10 seconds to enter Y to confirm."
         )
         i, _, _ = select.select([sys.stdin], [], [], 10)
         if i:
             read_input = sys.stdin.readline().strip().lower()
             if read_input == "y":
-                print("!!!!!!!!!!!!! TRUNCATING MARKET DATA !!!!!!!!!!!!!!")
-                cursor.execute("TRUNCATE TABLE pricing_itemmarketdataevent")
-            else:
-                print("Not truncating as you did not press Y")
+                return True
+            print("Not truncating as you did not press Y")
         else:
             print("Not truncating as you did not press Y in time...")
+        return False
+
+    @staticmethod
+    def truncate():
+        print("!!!!!!!!!!!!! TRUNCATING MARKET DATA !!!!!!!!!!!!!!")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "TRUNCATE TABLE pricing_itemmarketdataevent, "
+                "pricing_latestitemmarketdataevent, pricing_itemmarketdatarollup, "
+                "pricing_itemmarketdataeventuniqueuserid"
+            )
+
+
+def points_after(cutoff, market_id, history):
+    points = []
+    for point in reversed(history):
+        event_time = timezone.make_aware(datetime.utcfromtimestamp(int(point["time"])))
+        if event_time < cutoff:
+            break
+        points.append(
+            (
+                market_id,
+                event_time,
+                decimal_or_none(point["sell"]),
+                decimal_or_none(point["buy"]),
+                decimal_or_none(point["lowest_sell"]),
+                decimal_or_none(point["highest_buy"]),
+                decimal_or_none(point["volume"]),
+            )
+        )
+    return points
 
 
 def decimal_or_none(val):
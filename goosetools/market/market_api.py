@@ -0,0 +1,91 @@
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from typing import Iterator, List, Optional, Tuple
+
+import requests
+
+DEFAULT_MARKET_API_URL = "https://api.eve-echoes-market.com"
+
+
+def stats_csv_url(api_url: str = DEFAULT_MARKET_API_URL) -> str:
+    return f"{api_url}/market-stats/stats.csv"
+
+
+def item_history_url(market_id: str, api_url: str = DEFAULT_MARKET_API_URL) -> str:
+    return f"{api_url}/market-stats/{market_id}"
+
+
+def parse_stats_csv(content: bytes) -> List[List[str]]:
+    decoded_content = content.decode("UTF-8")
+    csv_lines = csv.reader(decoded_content.splitlines(), delimiter=",")
+    return list(csv_lines)[1:]
+
+
+def fetch_stats_csv(api_url: str = DEFAULT_MARKET_API_URL) -> List[List[str]]:
+    r = requests.get(stats_csv_url(api_url))
+    r.raise_for_status()
+    return parse_stats_csv(r.content)
+
+
+def market_id_sort_key(market_id: str):
+    # Market ids are numeric strings, sort them numerically so a checkpoint of the
+    # last finished id splits them into done and not done.
+    return len(market_id), market_id
+
+
+class TokenBucket:
+    """
+    A thread safe rate limiter which lets through on average `rate` calls a second,
+    with bursts of at most `capacity` calls.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.last) * self.rate
+                )
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+def fetch_item_histories(
+    market_ids: List[str],
+    api_url: str = DEFAULT_MARKET_API_URL,
+    workers: int = 4,
+    bucket: Optional[TokenBucket] = None,
+) -> Iterator[Tuple[str, Optional[list], Optional[Exception]]]:
+    """
+    Fetches the market history of every market id using a pool of `workers` threads,
+    yielding (market_id, history, error) in the same order as market_ids.
+    """
+    local = threading.local()
+
+    def fetch(market_id):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        if bucket:
+            bucket.acquire()
+        try:
+            r = local.session.get(item_history_url(market_id, api_url))
+            r.raise_for_status()
+            return market_id, r.json(), None
+        except Exception as e:  # pylint: disable=broad-except
+            return market_id, None, e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fetch, market_ids)
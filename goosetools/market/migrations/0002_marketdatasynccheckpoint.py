@@ -0,0 +1,35 @@
+# Generated by Django 3.1.4 on 2021-08-15 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MarketDataSyncCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sync_name", models.TextField(unique=True)),
+                (
+                    "started",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                ("last_finished_market_id", models.TextField(blank=True, null=True)),
+            ],
+        ),
+    ]
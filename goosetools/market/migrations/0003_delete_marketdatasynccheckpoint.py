@@ -0,0 +1,16 @@
+# Generated by Django 3.1.4 on 2021-08-16 10:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0002_marketdatasynccheckpoint"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="MarketDataSyncCheckpoint",
+        ),
+    ]
@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from django.utils.dateparse import parse_datetime
+
+from goosetools.market.cron.get_market_data import (
+    bulk_ingest_market_data,
+    ingest_market_data_row_by_row,
+)
+from goosetools.market.market_api import parse_stats_csv
+from goosetools.pricing.ingest import (
+    find_inconsistent_latest_market_data,
+    refresh_latest_market_data,
+)
+from goosetools.pricing.models import (
+    DataSet,
+    ItemMarketDataEvent,
+    LatestItemMarketDataEvent,
+)
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+HEADER = "item_id,name,time,sell,buy,lowest_sell,highest_buy,volume"
+
+
+def stats_csv(*lines: str) -> bytes:
+    return "\n".join([HEADER, *lines]).encode("UTF-8")
+
+
+class GetMarketDataTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+        self.item.eve_echoes_market_id = "1"
+        self.item.save()
+        self.another_item.eve_echoes_market_id = "2"
+        self.another_item.save()
+
+    def test_bulk_ingest_inserts_events_and_updates_cached_lowest_sell(self):
+        lines = parse_stats_csv(
+            stats_csv(
+                "1,Tritanium,2021-08-01T10:00:00Z,10,9,8,7,100",
+                "2,Condor,2021-08-01T10:00:00Z,100,90,80,,100",
+                "3,Unknown,2021-08-01T10:00:00Z,1,1,1,1,1",
+            )
+        )
+
+        self.assertEqual(bulk_ingest_market_data(lines), 2)
+
+        event = ItemMarketDataEvent.objects.get(item=self.item)
+        self.assertEqual(event.price_list, self.price_list)
+        self.assertEqual(event.sell, Decimal("10"))
+        self.assertEqual(event.lowest_sell, Decimal("8"))
+        other_event = ItemMarketDataEvent.objects.get(item=self.another_item)
+        self.assertEqual(other_event.highest_buy, None)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cached_lowest_sell, Decimal("8"))
+        latest = LatestItemMarketDataEvent.objects.get(
+            price_list=self.price_list, item=self.item
+        )
+        self.assertEqual(latest.event, event)
+
+    def test_bulk_ingest_updates_existing_events_and_moves_latest_forwards(self):
+        bulk_ingest_market_data(
+            parse_stats_csv(stats_csv("1,Tritanium,2021-08-01T10:00:00Z,10,9,8,7,1"))
+        )
+        bulk_ingest_market_data(
+            parse_stats_csv(stats_csv("1,Tritanium,2021-08-01T10:00:00Z,20,9,5,7,1"))
+        )
+        self.assertEqual(ItemMarketDataEvent.objects.count(), 1)
+        self.assertEqual(ItemMarketDataEvent.objects.get().sell, Decimal("20"))
+
+        bulk_ingest_market_data(
+            parse_stats_csv(stats_csv("1,Tritanium,2021-08-01T11:00:00Z,30,9,4,7,1"))
+        )
+        self.assertEqual(ItemMarketDataEvent.objects.count(), 2)
+        latest = LatestItemMarketDataEvent.objects.get(item=self.item)
+        self.assertEqual(latest.event.sell, Decimal("30"))
+
+        # Older data arriving late does not replace the latest event.
+        bulk_ingest_market_data(
+            parse_stats_csv(stats_csv("1,Tritanium,2021-08-01T09:00:00Z,40,9,4,7,1"))
+        )
+        latest.refresh_from_db()
+        self.assertEqual(latest.event.sell, Decimal("30"))
+
+    def test_bulk_and_row_by_row_ingest_produce_the_same_events(self):
+        lines = parse_stats_csv(
+            stats_csv(
+                "1,Tritanium,2021-08-01T10:00:00Z,10,9,8,7,100",
+                "2,Condor,2021-08-01T10:00:00Z,100,,80,70,100",
+            )
+        )
+        fields = ["item", "time", "sell", "buy", "lowest_sell", "highest_buy"]
+
+        ingest_market_data_row_by_row(lines)
+        row_by_row = list(ItemMarketDataEvent.objects.order_by("item").values(*fields))
+        ItemMarketDataEvent.objects.all().delete()
+        bulk_ingest_market_data(lines)
+        bulk = list(ItemMarketDataEvent.objects.order_by("item").values(*fields))
+
+        self.assertEqual(row_by_row, bulk)
+
+    def test_manual_override_prices_stay_latest_after_a_bulk_ingest(self):
+        manual = ItemMarketDataEvent.objects.create(
+            price_list=self.price_list,
+            item=self.item,
+            time=parse_datetime("2021-08-01T10:00:00Z"),
+            manual_override_price=True,
+            lowest_sell=Decimal("1"),
+        )
+
+        bulk_ingest_market_data(
+            parse_stats_csv(stats_csv("1,Tritanium,2021-08-01T11:00:00Z,30,9,4,7,1"))
+        )
+
+        latest = LatestItemMarketDataEvent.objects.get(item=self.item)
+        self.assertEqual(latest.event, manual)
+        self.assertEqual(find_inconsistent_latest_market_data(self.price_list.id), [])
+
+    def test_inconsistent_latest_market_data_is_found_and_rebuilt(self):
+        bulk_ingest_market_data(
+            parse_stats_csv(
+                stats_csv(
+                    "1,Tritanium,2021-08-01T10:00:00Z,10,9,8,7,100",
+                    "2,Condor,2021-08-01T10:00:00Z,100,90,80,70,100",
+                )
+            )
+        )
+        event = ItemMarketDataEvent.objects.get(item=self.item)
+        LatestItemMarketDataEvent.objects.filter(item=self.item).delete()
+
+        self.assertEqual(
+            find_inconsistent_latest_market_data(self.price_list.id),
+            [(self.item.id, event.id, None)],
+        )
+        refresh_latest_market_data(self.price_list.id)
+        self.assertEqual(find_inconsistent_latest_market_data(self.price_list.id), [])
@@ -1,8 +1,16 @@
+import json
+from decimal import Decimal
+
 from allauth.socialaccount.models import SocialAccount
 from django.contrib.messages import get_messages
+from django.core.exceptions import ValidationError
 from django.urls.base import reverse
+from django.utils import timezone
 
+from goosetools.bank.ledger import find_inconsistent_balances
+from goosetools.bank.models import EggTransaction
 from goosetools.ownership.models import TransferLog
+from goosetools.ownership.views import ComplexEncoder, write_transfer_transactions
 from goosetools.tenants.models import SiteUser
 from goosetools.tests.goosetools_test_case import GooseToolsTestCase, isk
 from goosetools.users.models import LOOT_TRACKER, Character, GooseGroup, GooseUser
@@ -381,3 +389,61 @@ class MarketOrderTestCase(GooseToolsTestCase):
         self.assertEqual(self.user.isk_balance(), isk(0))
         self.assertEqual(self.user.egg_balance(), isk(44625))
         self.assertEqual(self.other_user.egg_balance(), isk(40375))
+
+    def test_transfer_explaination_and_ledgers_match_the_participation(self):
+        fleet = self.a_fleet()
+        loot_group = self.a_loot_group(fleet)
+        item = self.an_item(loot_group, item_quantity=1)
+        self.a_loot_share(loot_group, self.char, share_quantity=2, flat_percent_cut=5)
+        self.a_loot_share(loot_group, self.other_char, share_quantity=1)
+        market_order = self.list_item(
+            item, listed_at_price=10000, transaction_tax=10, broker_fee=5
+        )
+        sold_item = self.market_order_sold(market_order)
+        item.refresh_from_db()
+        expected = loot_group.bucket.calculate_participation(isk(8500), loot_group)
+        expected["item"] = str(item)
+        expected["total_isk"] = Decimal(8500)
+        expected["transfered_quantity"] = 1
+
+        response = self.client.post(
+            reverse("transfer_profit"),
+            {"own_share_in_eggs": True, "transfer_method": self.transfer_method.id},
+        )
+        self.assertEqual(response.status_code, 302)
+
+        log = TransferLog.objects.get()
+        self.assertEqual(
+            json.loads(log.explaination),
+            json.loads(json.dumps({item.id: expected}, cls=ComplexEncoder)),
+        )
+        sold_item.refresh_from_db()
+        self.assertEqual(sold_item.transfered_so_far(), True)
+        self.assertEqual(sold_item.transfer_log, log)
+        self.assertEqual(
+            find_inconsistent_balances(),
+            {
+                "bank_inventoryitembalance": [],
+                "bank_lootgroupbalance": [],
+                "bank_fleetbalance": [],
+                "bank_userbalance": [],
+            },
+        )
+
+    def test_every_transfer_transaction_is_validated_not_just_the_largest(self):
+        item = self.an_item(self.a_loot_group(self.a_fleet()))
+
+        def egg_transaction(eggs):
+            return EggTransaction(
+                item=item,
+                quantity=1,
+                time=timezone.now(),
+                eggs=eggs,
+                counterparty=self.user,
+            )
+
+        with self.assertRaises(ValidationError):
+            write_transfer_transactions(
+                [], [egg_transaction(isk(1000)), egg_transaction(isk("0.005"))]
+            )
+        self.assertEqual(EggTransaction.objects.count(), 0)
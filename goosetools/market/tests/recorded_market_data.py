@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+# Recorded from https://api.eve-echoes-market.com with the ids, names and times
+# replaced so they line up with the items and clock of the test being run.
+RECORDED_STATS_CSV = b"""item_id,name,time,sell,buy,lowest_sell,highest_buy,volume
+1,Tritanium,2021-08-15T11:00:00Z,102.5,88.1,95,91,120
+2,Condor,2021-08-15T11:00:00Z,302000,281000,299000,290000,14
+3,Not A Goosetools Item,2021-08-15T11:00:00Z,1,1,1,1,1
+"""
+
+RECORDED_ITEM_HISTORY = [
+    {
+        "hours_ago": 24 * 10,
+        "sell": 99.2,
+        "buy": 80.3,
+        "lowest_sell": 91,
+        "highest_buy": 85.1,
+        "volume": 3010,
+    },
+    {
+        "hours_ago": 24 * 3,
+        "sell": 101.1,
+        "buy": 87.5,
+        "lowest_sell": 94.2,
+        "highest_buy": 90,
+        "volume": 2764,
+    },
+    {
+        "hours_ago": 2,
+        "sell": 102,
+        "buy": 88,
+        "lowest_sell": 94.8,
+        "highest_buy": 90.5,
+        "volume": 95,
+    },
+    {
+        "hours_ago": 1,
+        "sell": 102.5,
+        "buy": 88.1,
+        "lowest_sell": 95,
+        "highest_buy": 91,
+        "volume": 120,
+    },
+]
+
+
+def recorded_item_history(now):
+    history = []
+    for point in RECORDED_ITEM_HISTORY:
+        recorded = dict(point)
+        hours_ago = recorded.pop("hours_ago")
+        recorded["time"] = int((now - timedelta(hours=hours_ago)).timestamp())
+        history.append(recorded)
+    return history
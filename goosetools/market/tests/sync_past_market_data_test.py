@@ -0,0 +1,125 @@
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from goosetools.global_items.models import GlobalMarketDataBatch
+from goosetools.market.tests.recorded_market_data import (
+    RECORDED_STATS_CSV,
+    recorded_item_history,
+)
+from goosetools.pricing.models import (
+    DataSet,
+    ItemMarketDataEvent,
+    LatestItemMarketDataEvent,
+)
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class MarketApiStub:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested_paths = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # noinspection PyPep8Naming
+            def do_GET(self):  # pylint: disable=invalid-name
+                stub.requested_paths.append(self.path)
+                if self.path not in stub.responses:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = stub.responses[self.path]
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SyncPastMarketDataTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+        self.item.eve_echoes_market_id = "1"
+        self.item.save()
+        self.another_item.eve_echoes_market_id = "2"
+        self.another_item.save()
+        self.now = timezone.now().replace(microsecond=0)
+        self.responses = {
+            "/market-stats/stats.csv": RECORDED_STATS_CSV,
+            "/market-stats/1": json.dumps(recorded_item_history(self.now)).encode(),
+            "/market-stats/2": json.dumps(recorded_item_history(self.now)).encode(),
+        }
+
+    def sync(self, stub, *args):
+        call_command(
+            "sync_past_market_data",
+            "--lookback_days=8",
+            "--request_sleep=0",
+            "--workers=2",
+            "--batch_size=1",
+            f"--api_url={stub.url}",
+            *args,
+        )
+
+    def test_syncs_all_points_within_the_lookback_window(self):
+        with MarketApiStub(self.responses) as stub:
+            self.sync(stub)
+
+        # The recorded history has 3 points inside the 8 day window and one outside.
+        self.assertEqual(ItemMarketDataEvent.objects.filter(item=self.item).count(), 3)
+        self.assertEqual(
+            ItemMarketDataEvent.objects.filter(item=self.another_item).count(), 3
+        )
+        latest = LatestItemMarketDataEvent.objects.get(
+            price_list=self.price_list, item=self.item
+        )
+        self.assertEqual(latest.time, self.now - timedelta(hours=1))
+        self.assertEqual(latest.event.volume, Decimal("120"))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cached_lowest_sell, Decimal("95"))
+        batch = GlobalMarketDataBatch.objects.get(source="sync_past_market_data")
+        self.assertIsNotNone(batch.finished)
+        self.assertEqual(batch.last_staged_market_id, "3")
+
+    def test_resumes_after_the_last_finished_market_id(self):
+        GlobalMarketDataBatch.objects.create(
+            source="sync_past_market_data", last_staged_market_id="1"
+        )
+
+        with MarketApiStub(self.responses) as stub:
+            self.sync(stub)
+
+        self.assertNotIn("/market-stats/1", stub.requested_paths)
+        self.assertIn("/market-stats/2", stub.requested_paths)
+        self.assertEqual(ItemMarketDataEvent.objects.filter(item=self.item).count(), 0)
+        self.assertEqual(
+            ItemMarketDataEvent.objects.filter(item=self.another_item).count(), 3
+        )
+
+    def test_resyncing_updates_rather_than_duplicates_points(self):
+        with MarketApiStub(self.responses) as stub:
+            self.sync(stub)
+            self.sync(stub)
+
+        self.assertEqual(ItemMarketDataEvent.objects.count(), 6)
@@ -18,8 +18,11 @@ from goosetools.items.models import (
     InventoryItem,
     ItemLocation,
     StackedInventoryItem,
+    calc_estimate_prices,
 )
-from goosetools.items.views import get_items_in_location
+from goosetools.items.views import get_items_in_location, get_items_in_locations
+from goosetools.jobs.runner import idempotency_key, submit_job
+from goosetools.jobs.views import redirect_to_job
 from goosetools.market.forms import (
     BulkSellItemForm,
     BulkSellItemFormHead,
@@ -38,7 +41,7 @@ def forbidden(request):
 
 
 def stack_change_price(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
 
     if not stack.has_admin(request.gooseuser):
         return forbidden(request)
@@ -128,16 +131,14 @@ def edit_order_price(request, pk):
     )
 
 
-def estimate_price(item, head_form):
-    price_type = head_form.cleaned_data["price_to_use"]
-    price_list = head_form.cleaned_data["price_list"]
-    algo = head_form.cleaned_data["price_picking_algorithm"]
-    hours = head_form.cleaned_data["hours_to_lookback_over_price_data"]
-    if algo != "latest":
-        return item.calc_estimate_price(hours, price_list, price_type, algo)
-    else:
-        price = getattr(item.latest_market_data_for_list(price_list).event, price_type)
-        return price, 1
+def estimate_prices(item_ids, head_form):
+    return calc_estimate_prices(
+        item_ids,
+        head_form.cleaned_data["hours_to_lookback_over_price_data"],
+        head_form.cleaned_data["price_list"],
+        head_form.cleaned_data["price_to_use"],
+        head_form.cleaned_data["price_picking_algorithm"],
+    )
 
 
 @transaction.atomic
@@ -171,9 +172,14 @@ def sell_all_items(request, pk):
         algo = head_form.cleaned_data["price_picking_algorithm"]
         if algo != "latest":
             hours = head_form.cleaned_data["hours_to_lookback_over_price_data"]
+        estimates = estimate_prices(
+            [stack_data["item"].id for stack_data in items["stacks"].values()]
+            + [item.item_id for item in items["unstacked"]],
+            head_form,
+        )
         for stack_id, stack_data in items["stacks"].items():
             stack = stack_data["stack"]
-            estimate, datapoints = estimate_price(stack.item(), head_form)
+            estimate, datapoints = estimates[stack_data["item"].id]
             quantity = stack.quantity()
             if estimate is None or not estimate or estimate * quantity > min_price:
                 initial.append(
@@ -183,13 +189,13 @@ def sell_all_items(request, pk):
                         "listed_at_price": estimate,
                         "quality": f"{datapoints} datapoints",
                         "quantity": quantity,
-                        "item": stack.item(),
+                        "item": stack_data["item"],
                     }
                 )
             else:
                 filtered += 1
         for item in items["unstacked"]:
-            estimate, datapoints = estimate_price(item.item, head_form)
+            estimate, datapoints = estimates[item.item_id]
             quantity = item.quantity
             if estimate is None or not estimate or estimate * quantity > min_price:
                 initial.append(
@@ -212,47 +218,27 @@ def sell_all_items(request, pk):
     if request.method == "POST" and request.POST.get("do_buyback", False):
         formset = BulkSellItemFormSet(request.POST, request.FILES, initial=initial)
         if formset.is_valid() and head_form.is_valid():
+            sales = []
             for form in formset:
                 inv_item = form.cleaned_data["inv_item"]
                 stack = form.cleaned_data["stack"]
-                cut = 1 - Decimal(head_form.cleaned_data["overall_cut"] / 100)
                 uncommaed_price = form.cleaned_data["listed_at_price"].replace(",", "")
-                price = Decimal(uncommaed_price)
-                cut_price = price * cut
-                if inv_item:
-                    items = [inv_item]
-                else:
-                    items = stack.inventoryitem_set.all()
-                for item in items:
-                    if not item.can_sell():
-                        messages.error(
-                            request,
-                            f"Item {item} cannot be sold, maybe it is already being "
-                            f"sold or is in a pending contract?",
-                        )
-                        return HttpResponseRedirect(reverse("sell_all", args=[pk]))
-                    profit_line = IskTransaction(
-                        item=item,
-                        time=timezone.now(),
-                        isk=to_isk(m.floor(cut_price * item.quantity)),
-                        quantity=item.quantity,
-                        transaction_type="buyback",
-                        notes=f"Corp Buyback using price {price} and a cut for the "
-                        f"corp of {cut * 100}% ",
-                    )
-                    profit_line.full_clean()
-                    profit_line.save()
-                    sold_item = SoldItem(
-                        item=item, quantity=item.quantity, sold_via="internal"
-                    )
-                    sold_item.full_clean()
-                    sold_item.save()
-                    item.quantity = 0
-                    item.full_clean()
-                    item.save()
-
-            messages.success(request, "Items succesfully bought")
-            return HttpResponseRedirect(reverse("sold"))
+                sales.append(
+                    {
+                        "inv_item_id": inv_item and inv_item.id,
+                        "stack_id": stack and stack.id,
+                        "price": str(Decimal(uncommaed_price)),
+                    }
+                )
+            job = submit_job(
+                "sell_all_items",
+                request.gooseuser,
+                idempotency_key(request),
+                location_id=loc.id,
+                overall_cut=str(head_form.cleaned_data["overall_cut"]),
+                sales=sales,
+            )
+            return redirect_to_job(request, job)
         else:
             messages.error(request, f"Invalid {formset.errors} {head_form.errors}")
     else:
@@ -266,6 +252,7 @@ def sell_all_items(request, pk):
             "head_form": head_form,
             "pricelist": pricelist,
             "loc": loc,
+            "idempotency_key": idempotency_key(request),
             "title": "Change Price of An Existing Market Order",
             "from_date": (timezone.now() - timezone.timedelta(hours=hours)).date()
             if hours is not None
@@ -301,15 +288,17 @@ def sold(request):
 
 
 def orders(request):
-    characters = request.gooseuser.characters()
-    all_orders = []
-    for char in characters:
-        char_locs = CharacterLocation.objects.filter(character=char)
-        for char_loc in char_locs:
-            market_items = InventoryItem.objects.filter(marketorder__isnull=False)
-            items = get_items_in_location(char_loc, market_items)
-            if items["total_in_loc"] > 0:
-                all_orders.append(items)
+    char_locs = (
+        CharacterLocation.objects.filter(character__in=request.gooseuser.characters())
+        .select_related("character", "system")
+        .order_by("character_id", "id")
+    )
+    market_items = InventoryItem.objects.filter(marketorder__isnull=False)
+    all_orders = [
+        items
+        for items in get_items_in_locations(char_locs, market_items)
+        if items["total_in_loc"] > 0
+    ]
 
     return render(request, "market/orders.html", {"all_orders": all_orders})
 
@@ -362,7 +351,7 @@ def item_sold(order, remaining_quantity_to_sell):
 
 @transaction.atomic
 def all_stack_sold(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     if not stack.has_admin(request.gooseuser):
         return forbidden(request)
 
@@ -388,7 +377,7 @@ def sell_stack(quantity_remaining, request, stack):
 
 @transaction.atomic
 def stack_sold(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     if not stack.has_admin(request.gooseuser):
         return forbidden(request)
 
@@ -533,7 +522,7 @@ def sell_item(item, form, quantity_to_sell, new_stack=None):
 
 @transaction.atomic
 def stack_sell(request, pk):
-    stack = get_object_or_404(StackedInventoryItem, pk=pk)
+    stack = get_object_or_404(StackedInventoryItem.objects.with_totals(), pk=pk)
     if not stack.has_admin(request.gooseuser):
         messages.error(request, f"You do not have permission to sell stack {stack.id}")
         return HttpResponseRedirect(reverse("items"))
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.4 on 2021-08-22 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "type"], name="notification_user_type_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["permission", "type"], name="notification_perm_type_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import logging
 from abc import ABC, abstractmethod
 
+from django.core.cache import cache
 from django.db import models
 from django.db.models.query_utils import Q
 from django.urls.base import reverse, reverse_lazy
@@ -15,9 +16,12 @@ from goosetools.users.models import (
     GoosePermission,
     GooseUser,
 )
+from goosetools.utils import bump_cache_version, tenant_cache_key
 
 logger = logging.getLogger(__name__)
 
+NOTIFICATIONS_CACHE_SECONDS = 60 * 60 * 24
+
 
 class Notification(models.Model):
     user = models.ForeignKey(GooseUser, on_delete=models.CASCADE, null=True, blank=True)
@@ -31,20 +35,51 @@ class Notification(models.Model):
 
     @staticmethod
     def for_user(user: GooseUser):
-        permissions = user.groupmember_set.values_list(
-            "group__grouppermission__permission__name", flat=True
-        )
         return Notification.objects.filter(
-            Q(user=user) | Q(permission__name__in=permissions)
+            Q(user=user) | Q(permission_id__in=user.access_identity().permission_ids)
         ).order_by("-created_at", "priority", "type")
 
+    @staticmethod
+    def _version_keys(user_id):
+        return (
+            tenant_cache_key("notifications_version"),
+            tenant_cache_key("notifications_version", user_id),
+        )
+
+    @staticmethod
+    def changed(user=None):
+        """
+        Invalidates the cached rendered notifications of a user, or of everyone if
+        no user is given. Called whenever a NotificationType sends or dismisses.
+        """
+        tenant_key, user_key = Notification._version_keys(user and user.pk)
+        bump_cache_version(tenant_key if user is None else user_key)
+
     @staticmethod
     def for_user_rendered(user: GooseUser):
-        notifications = Notification.for_user(user)
+        versions = cache.get_many(Notification._version_keys(user.pk))
+        # A change to the users permissions changes which notifications they see.
+        identity = user.access_identity()
+        key = tenant_cache_key(
+            "notifications",
+            user.pk,
+            *[versions.get(k, 0) for k in Notification._version_keys(user.pk)],
+            *identity.version,
+        )
+        rendered_notifications = cache.get(key)
+        if rendered_notifications is None:
+            rendered_notifications = Notification.render_all(
+                Notification.for_user(user)
+            )
+            cache.set(key, rendered_notifications, NOTIFICATIONS_CACHE_SECONDS)
+        return rendered_notifications
+
+    @staticmethod
+    def render_all(notifications):
         rendered_notifications = []
         for n in notifications:
             if n.type in NOTIFICATION_TYPES:
-                rendered_n = NOTIFICATION_TYPES[n.type].render(n)
+                rendered_n = NOTIFICATION_TYPES[n.type].render(n).copy()
                 rendered_n.id = n.id
                 rendered_notifications.append(rendered_n)
             else:
@@ -52,6 +87,14 @@ class Notification(models.Model):
 
         return rendered_notifications
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "type"], name="notification_user_type_idx"),
+            models.Index(
+                fields=["permission", "type"], name="notification_perm_type_idx"
+            ),
+        ]
+
 
 class RenderedNotification:
     def __init__(
@@ -62,6 +105,13 @@ class RenderedNotification:
         self.action_url = action_url
         self.colour = colour
 
+    def copy(self):
+        # Types share one pre rendered instance, so copy it before giving it an id.
+        # The action url is resolved so the copy can be cached.
+        return RenderedNotification(
+            self.text, self.icon, str(self.action_url), self.colour
+        )
+
     def as_html(self) -> str:
         return f"<a href='{self.action_url}' class='{self.colour}'><i class='material-icons left'>{self.icon}</i>{self.text}</a>"
 
@@ -94,9 +144,11 @@ class UnStackableUserNotification(NotificationType):
             user=user,
             defaults={"created_at": timezone.now()},
         )
+        Notification.changed(user)
 
     def dismiss(self, n):
         Notification.objects.filter(type=self.notification_type, user=n.user).delete()
+        Notification.changed(n.user)
 
     def render(self, _):
         return self.pre_rendered
@@ -118,11 +170,13 @@ class UnStackablePermissionNotification(NotificationType):
             permission=GoosePermission.objects.get(name=self.permission),
             defaults={"created_at": timezone.now()},
         )
+        Notification.changed()
 
     def dismiss(self, _=None):
         Notification.objects.filter(
             type=self.notification_type, permission__name=self.permission
         ).delete()
+        Notification.changed()
 
     def render(self, _):
         return self.pre_rendered
@@ -144,6 +198,7 @@ class StackableUserNotification(NotificationType):
         else:
             n.data = {"count": n.data["count"] + 1}
         n.save()
+        Notification.changed(user)
 
     def dismiss_one(self, user):
         try:
@@ -153,11 +208,13 @@ class StackableUserNotification(NotificationType):
             else:
                 n.data = {"count": n.data["count"] - 1}
                 n.save()
+            Notification.changed(user)
         except Notification.DoesNotExist:
             pass
 
     def dismiss_all(self, user):
         Notification.objects.filter(type=self.notification_type, user=user).delete()
+        Notification.changed(user)
 
     def dismiss(self, n):
         self.dismiss_all(n.user)
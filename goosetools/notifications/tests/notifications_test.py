@@ -0,0 +1,39 @@
+from goosetools.notifications.models import Notification
+from goosetools.notifications.notification_types import NOTIFICATION_TYPES
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class NotificationRenderingTest(GooseToolsTestCase):
+    def rendered_texts(self, user):
+        return [n.text for n in Notification.for_user_rendered(user)]
+
+    def test_rendered_notifications_are_cached_until_sent_or_dismissed(self):
+        NOTIFICATION_TYPES["contract_made"].send(self.user)
+        self.assertEqual(
+            self.rendered_texts(self.user), ["You have 1 pending contract."]
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.rendered_texts(self.user), ["You have 1 pending contract."]
+            )
+
+        NOTIFICATION_TYPES["contract_made"].send(self.user)
+        self.assertEqual(
+            self.rendered_texts(self.user), ["You have 2 pending contracts."]
+        )
+        NOTIFICATION_TYPES["contract_made"].dismiss_all(self.user)
+        self.assertEqual(self.rendered_texts(self.user), [])
+
+    def test_permission_notifications_follow_the_users_permissions(self):
+        NOTIFICATION_TYPES["user_apps"].send()
+        self.assertEqual(self.rendered_texts(self.user), [])
+
+        self.user.give_group(self.user_admin_group)
+        self.assertEqual(
+            self.rendered_texts(self.user),
+            ["There are pending user applications that require attention"],
+        )
+
+        NOTIFICATION_TYPES["user_apps"].dismiss()
+        self.assertEqual(self.rendered_texts(self.user), [])
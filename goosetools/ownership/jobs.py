@@ -0,0 +1,32 @@
+from goosetools.jobs.runner import job_function
+from goosetools.ownership.views import (
+    sold_items_to_transfer,
+    transfer_sold_items,
+    valid_transfer,
+)
+from goosetools.users.models import Character
+from goosetools.venmo.models import TransferMethod
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@job_function("transfer_profit")
+def transfer_profit_job(
+    job, request, own_share_in_eggs, transfer_method_id, contract_character_id
+):
+    transfer_method = TransferMethod.objects.get(pk=transfer_method_id)
+    contract_character = (
+        Character.objects.get(pk=contract_character_id)
+        if contract_character_id
+        else None
+    )
+    to_transfer = sold_items_to_transfer(request.gooseuser)
+    if not valid_transfer(to_transfer, request, transfer_method, contract_character):
+        return "sold", []
+    log_id = transfer_sold_items(
+        to_transfer, own_share_in_eggs, request, transfer_method, contract_character
+    )
+    if log_id:
+        return "view_transfer_log", [log_id]
+    else:
+        return "sold", []
@@ -0,0 +1,123 @@
+import random
+from decimal import Decimal
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django_tenants.utils import tenant_context
+from djmoney.money import Money
+
+from goosetools.ownership.models import LootBucket, LootGroup, LootShare
+from goosetools.ownership.participation import Participation
+from goosetools.tenants.models import Client, SiteUser
+from goosetools.users.models import Character, Corp, GooseUser
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "benchmark_participation"
+    help = (
+        "Compares calling LootBucket.calculate_participation per sold item against "
+        "the batched Participation calculator on synthetic buckets, checking both "
+        "give the same splits. Everything written is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument("--buckets", type=int, default=50)
+        parser.add_argument("--users", type=int, default=40)
+        parser.add_argument(
+            "--tenant",
+            type=str,
+            default=None,
+            help="Schema name of the tenant to benchmark in, defaults to the first "
+            "non public tenant.",
+        )
+
+    def handle(self, *args, **options):
+        if options["tenant"]:
+            tenant = Client.objects.get(schema_name=options["tenant"])
+        else:
+            tenant = Client.objects.exclude(schema_name="public").first()
+        with tenant_context(tenant):
+            with transaction.atomic():
+                loot_groups = self.setup_loot_groups(
+                    options["buckets"], options["users"]
+                )
+                items = [
+                    (
+                        Money(Decimal(random.randint(1, 10**10)) / 100, "EEI"),
+                        random.choice(loot_groups),
+                    )
+                    for _ in range(options["items"])
+                ]
+                self.run_benchmark(items)
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def setup_loot_groups(num_buckets: int, num_users: int):
+        corp = Corp.objects.create(name="benchmark_participation_corp")
+        characters = []
+        for i in range(num_users):
+            user = GooseUser.objects.create(
+                site_user=SiteUser.create(f"Benchmark Participant {i}#0000"),
+                status="approved",
+            )
+            characters.append(
+                Character.objects.create(
+                    user=user, ingame_name=f"Benchmark Participant {i}", corp=corp
+                )
+            )
+        loot_groups = []
+        shares = []
+        for _ in range(num_buckets):
+            bucket = LootBucket.objects.create()
+            for _ in range(random.randint(1, 3)):
+                loot_group = LootGroup.objects.create(bucket=bucket)
+                loot_groups.append(loot_group)
+                cuts_left = 100
+                for character in random.sample(characters, random.randint(1, 30)):
+                    flat_cut = random.randint(0, min(cuts_left, 10))
+                    cuts_left = cuts_left - flat_cut
+                    shares.append(
+                        LootShare(
+                            character=character,
+                            loot_group=loot_group,
+                            share_quantity=random.randint(1, 5),
+                            flat_percent_cut=flat_cut,
+                            created_at=loot_group.created_at,
+                        )
+                    )
+        LootShare.objects.bulk_create(shares)
+        return loot_groups
+
+    def run_benchmark(self, items):
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            expected = [
+                loot_group.bucket.calculate_participation(isk, loot_group)
+                for isk, loot_group in items
+            ]
+            elapsed = perf_counter() - start
+        self.stdout.write(
+            f"calculate_participation: {len(items)} items in {elapsed:.2f}s "
+            f"with {len(queries)} queries"
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            participation = Participation.for_loot_groups(
+                {loot_group.id for _, loot_group in items}
+            )
+            actual = [
+                participation.calculate(isk, loot_group) for isk, loot_group in items
+            ]
+            elapsed = perf_counter() - start
+        self.stdout.write(
+            f"Participation: {len(items)} items in {elapsed:.2f}s "
+            f"with {len(queries)} queries"
+        )
+
+        if actual != expected:
+            self.stderr.write("The batched participation does not match!")
+            raise SystemExit(1)
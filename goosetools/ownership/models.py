@@ -3,8 +3,7 @@ from decimal import Decimal
 from django import forms
 from django.db import models
 from django.db.models.aggregates import Sum
-from django.db.models.expressions import Case, F, When
-from django.db.models.fields import IntegerField
+from django.db.models.expressions import F
 from django.db.models.functions import Coalesce
 from django.template.defaultfilters import date as _date
 from django.utils import timezone
@@ -196,26 +195,19 @@ class LootGroup(models.Model):
             and (num_chars - num_characters_in_group) > 0
         )
 
+    def _ledger_balance(self, field):
+        result = (
+            LootGroup.objects.filter(pk=self.pk)
+            .values_list(f"ledger_balance__{field}", flat=True)
+            .first()
+        )
+        return to_isk(result or 0)
+
     def isk_balance(self):
-        return to_isk(model_sum(self.inventoryitem_set, "isktransaction__isk"))
+        return self._ledger_balance("isk")
 
     def non_debt_egg_balance(self):
-        result = self.inventoryitem_set.aggregate(
-            eggs=Sum(
-                Case(
-                    When(
-                        eggtransaction__debt=False,
-                        then=F("eggtransaction__eggs"),
-                    ),
-                    output_field=IntegerField(),
-                    default=0,
-                )
-            )
-        )["eggs"]
-        if result is None:
-            return to_isk(0)
-        else:
-            return to_isk(result)
+        return self._ledger_balance("non_debt_eggs")
 
     def estimated_profit(self):
         return to_isk(
@@ -0,0 +1,100 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+
+from django import forms
+from django.db.models import F, Sum
+
+from goosetools.ownership.models import LootGroup, LootShare
+
+
+class Participation:
+    """
+    Splits isk between the participants of loot groups exactly like
+    LootBucket.calculate_participation, but loads the shares of every bucket involved
+    with a single query up front. Each loot groups split is worked out the first time
+    it is needed, after that calculating an items participation runs no queries.
+    """
+
+    def __init__(self, share_rows: Iterable[Dict]):
+        # bucket id -> {user id: [username, total shares in the bucket]}
+        self._bucket_shares: Dict[int, Dict[int, List]] = {}
+        # loot group id -> {user id: total flat cut in the loot group}
+        self._group_flat_cuts: Dict[int, Dict[int, int]] = {}
+        self._splits: Dict[int, Tuple] = {}
+        for row in share_rows:
+            users = self._bucket_shares.setdefault(row["bucket_id"], {})
+            user = users.setdefault(row["user_id"], [row["username"], 0])
+            user[1] = user[1] + row["shares"]
+            flat_cuts = self._group_flat_cuts.setdefault(row["loot_group_id"], {})
+            flat_cuts[row["user_id"]] = (
+                flat_cuts.get(row["user_id"], 0) + row["flat_cut"]
+            )
+
+    @staticmethod
+    def for_buckets(bucket_ids: Iterable[int]) -> "Participation":
+        return Participation(
+            LootShare.objects.filter(loot_group__bucket__in=bucket_ids)
+            .values(
+                "loot_group_id",
+                bucket_id=F("loot_group__bucket_id"),
+                user_id=F("character__user_id"),
+                username=F("character__user__site_user__username"),
+            )
+            .annotate(shares=Sum("share_quantity"), flat_cut=Sum("flat_percent_cut"))
+            .order_by("bucket_id", "user_id", "loot_group_id")
+        )
+
+    @staticmethod
+    def for_loot_groups(loot_group_ids: Iterable[int]) -> "Participation":
+        return Participation.for_buckets(
+            LootGroup.objects.filter(id__in=list(loot_group_ids)).values("bucket_id")
+        )
+
+    def _split(self, loot_group: LootGroup) -> Tuple:
+        if loot_group.id in self._splits:
+            return self._splits[loot_group.id]
+        users = self._bucket_shares.get(loot_group.bucket_id, {})
+        flat_cuts = self._group_flat_cuts.get(loot_group.id, {})
+        total_shares = sum(shares for _, shares in users.values()) if users else None
+        total_flat_cuts = sum(flat_cuts.values())
+        if total_flat_cuts > 100:
+            raise forms.ValidationError(
+                f"The Loot Group {loot_group.id} is trying to give out a total of {total_flat_cuts}% of flat cuts. Please fix the participations as this is impossible."
+            )
+        split = (
+            total_shares,
+            total_flat_cuts,
+            [
+                (
+                    user_id,
+                    username,
+                    shares,
+                    Decimal(flat_cuts.get(user_id, 0)),
+                    Decimal(shares) / total_shares,
+                )
+                for user_id, (username, shares) in users.items()
+            ],
+        )
+        self._splits[loot_group.id] = split
+        return split
+
+    def calculate(self, isk, loot_group: LootGroup):
+        total_shares, total_flat_cuts, users = self._split(loot_group)
+        result = {
+            "total_shares": total_shares,
+            "total_flat_cuts": total_flat_cuts,
+            "participation": {},
+        }
+        total_after_cuts = isk * Decimal(100 - total_flat_cuts) / 100
+        for user_id, username, shares, flat_cut, share_fraction in users:
+            flat_cut_isk = (flat_cut / 100) * isk
+            share_isk = share_fraction * total_after_cuts
+            result["participation"][user_id] = {
+                "username": username,
+                "shares": shares,
+                "flat_cut": flat_cut,
+                "flat_cut_isk": flat_cut_isk,
+                "share_isk": share_isk,
+                "total_isk": share_isk + flat_cut_isk,
+            }
+        return result
@@ -0,0 +1,134 @@
+import random
+from decimal import Decimal
+
+from django import forms
+from django.urls import reverse
+from django.utils import timezone
+
+from goosetools.items.models import CharacterLocation, InventoryItem, ItemLocation
+from goosetools.ownership.models import LootBucket, LootGroup, LootShare
+from goosetools.ownership.participation import Participation
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase, isk
+
+
+class ParticipationTest(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bucket = LootBucket.objects.create()
+        self.loot_group = LootGroup.objects.create(bucket=self.bucket)
+        self.other_loot_group = LootGroup.objects.create(bucket=self.bucket)
+        self.another_bucket = LootBucket.objects.create()
+        self.another_bucket_group = LootGroup.objects.create(bucket=self.another_bucket)
+        self.a_share(self.char, self.loot_group, 3, flat_cut=10)
+        self.a_share(self.other_char, self.loot_group, 2, flat_cut=5)
+        self.a_share(self.other_alt_char, self.loot_group, 1)
+        self.a_share(self.char, self.other_loot_group, 1, flat_cut=30)
+        self.a_share(self.other_char, self.another_bucket_group, 7)
+
+    @staticmethod
+    def a_share(character, loot_group, shares, flat_cut=0):
+        return LootShare.objects.create(
+            character=character,
+            loot_group=loot_group,
+            share_quantity=shares,
+            flat_percent_cut=flat_cut,
+            created_at=timezone.now(),
+        )
+
+    def assert_matches_calculate_participation(self, items):
+        participation = Participation.for_loot_groups(
+            {loot_group.id for _, loot_group in items}
+        )
+        for total, loot_group in items:
+            self.assertEqual(
+                participation.calculate(total, loot_group),
+                loot_group.bucket.calculate_participation(total, loot_group),
+            )
+
+    def test_splits_match_calculate_participation(self):
+        self.assert_matches_calculate_participation(
+            [
+                (isk(1000), self.loot_group),
+                (isk("1234567.89"), self.loot_group),
+                (isk("0.01"), self.other_loot_group),
+                (isk(0), self.other_loot_group),
+                (isk("333.33"), self.another_bucket_group),
+            ]
+        )
+
+    def test_randomised_splits_match_calculate_participation(self):
+        rng = random.Random(15)
+        characters = [self.char, self.other_char, self.other_alt_char]
+        loot_groups = [self.loot_group, self.other_loot_group]
+        for _ in range(5):
+            bucket = LootBucket.objects.create()
+            for _ in range(rng.randint(1, 3)):
+                loot_group = LootGroup.objects.create(bucket=bucket)
+                loot_groups.append(loot_group)
+                for character in rng.sample(characters, rng.randint(1, 3)):
+                    self.a_share(
+                        character,
+                        loot_group,
+                        rng.randint(1, 9),
+                        flat_cut=rng.randint(0, 33),
+                    )
+        self.assert_matches_calculate_participation(
+            [
+                (
+                    isk(Decimal(rng.randint(0, 10**12)) / 100),
+                    rng.choice(loot_groups),
+                )
+                for _ in range(50)
+            ]
+        )
+
+    def test_too_many_flat_cuts_is_an_error(self):
+        self.a_share(self.other_alt_char, self.other_loot_group, 1, flat_cut=71)
+        participation = Participation.for_loot_groups([self.other_loot_group.id])
+        with self.assertRaises(forms.ValidationError):
+            participation.calculate(isk(100), self.other_loot_group)
+
+    def test_loads_every_bucket_in_one_query(self):
+        loot_groups = [
+            self.loot_group,
+            self.other_loot_group,
+            self.another_bucket_group,
+        ]
+        with self.assertNumQueries(1):
+            participation = Participation.for_loot_groups(
+                [loot_group.id for loot_group in loot_groups]
+            )
+            for i in range(100):
+                participation.calculate(isk(i), loot_groups[i % len(loot_groups)])
+
+    def test_fleet_shares_page_totals_every_group_the_user_has_shares_in(self):
+        self.item.cached_lowest_sell = 10
+        self.item.save()
+        location = ItemLocation.objects.create(
+            character_location=CharacterLocation.objects.create(
+                character=self.char, system=self.system
+            )
+        )
+        InventoryItem.objects.create(
+            item=self.item,
+            quantity=100,
+            created_at=timezone.now(),
+            location=location,
+            loot_group=self.loot_group,
+        )
+
+        response = self.client.get(reverse("fleet_shares", args=[self.user.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        expected = sum(
+            loot_group.bucket.calculate_participation(
+                loot_group.estimated_profit(), loot_group
+            )["participation"][self.user.id]["total_isk"]
+            for loot_group in [self.loot_group, self.other_loot_group]
+        )
+        self.assertEqual(response.context["all_est"], expected)
+        self.assertEqual(response.context["sales_est"], isk(1000))
+        self.assertEqual(
+            sorted(item["loot_group_id"] for item in response.context["items"]),
+            sorted([self.loot_group.id, self.other_loot_group.id]),
+        )
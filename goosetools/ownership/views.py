@@ -4,6 +4,7 @@ from decimal import Decimal
 from typing import Dict, List
 
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import F, Sum
 from django.db.models.aggregates import Count
@@ -17,12 +18,16 @@ from django.utils.safestring import mark_safe
 from djmoney.money import Money
 from moneyed.localization import format_money
 
+from goosetools.bank.ledger import apply_egg_transactions, apply_isk_transactions
 from goosetools.bank.models import EggTransaction, IskTransaction
 from goosetools.contracts.models import Contract
+from goosetools.core.counters import invalidate_badge_counts
 from goosetools.core.models import System
 from goosetools.fleets.models import AnomType, Fleet, FleetAnom
 from goosetools.items.forms import InventoryItemForm
 from goosetools.items.models import CharacterLocation, InventoryItem, ItemLocation
+from goosetools.jobs.runner import idempotency_key, submit_job
+from goosetools.jobs.views import redirect_to_job
 from goosetools.market.models import SoldItem
 from goosetools.ownership.forms import (
     LootGroupForm,
@@ -37,11 +42,14 @@ from goosetools.ownership.models import (
     TransferLog,
     to_isk,
 )
+from goosetools.ownership.participation import Participation
 from goosetools.users.forms import CharacterForm
 from goosetools.users.models import Character, GooseUser
 from goosetools.users.utils import filter_controlled_qs_to_usable
 from goosetools.venmo.models import TransferMethod
 
+TRANSFER_BATCH_SIZE = 1000
+
 
 class ComplexEncoder(json.JSONEncoder):
     def default(self, o):
@@ -502,7 +510,10 @@ def fleet_shares(request, pk):
         prefix = f"{user.discord_username()}'s"
         prefix2 = "Their"
 
-    for loot_share in loot_shares:
+    participation = Participation.for_loot_groups(
+        loot_shares.values_list("loot_group_id", flat=True)
+    )
+    for loot_share in loot_shares.select_related("loot_group"):
         loot_group = loot_share.loot_group
         if loot_group.id in seen_groups:
             continue
@@ -518,12 +529,10 @@ def fleet_shares(request, pk):
         your_total_est_sales = estimated_profit + your_total_est_sales
         total_estimated_profit = loot_group.estimated_profit()
         real_profit = loot_group.non_debt_egg_balance()
-        estimated_participation = loot_group.bucket.calculate_participation(
+        estimated_participation = participation.calculate(
             total_estimated_profit, loot_group
         )
-        real_participation = loot_group.bucket.calculate_participation(
-            real_profit, loot_group
-        )
+        real_participation = participation.calculate(real_profit, loot_group)
         your_group_estimated_profit = estimated_participation["participation"][user.id][
             "total_isk"
         ]
@@ -534,7 +543,7 @@ def fleet_shares(request, pk):
                 "fleet_id": loot_group.fleet_anom.fleet.id
                 if loot_group.fleet_anom
                 else False,
-                "loot_bucket": loot_group.bucket.id,
+                "loot_bucket": loot_group.bucket_id,
                 "loot_group_id": loot_group.id,
                 "your_shares": estimated_participation["participation"][user.id][
                     "shares"
@@ -646,10 +655,11 @@ def generate_contract_requests(
         f"of ISK you are owed shown below:\n\n"
     )
     deposit_total = 0
+    users = GooseUser.objects.in_bulk(list(total_participation.keys()))
     for user_id, isk in total_participation.items():
         floored_isk = m.floor(isk.amount)
         if user_id != transferring_user.id:
-            user = GooseUser.objects.get(id=user_id)
+            user = users[user_id]
             command = command + f"<@!{user.discord_uid()}> {floored_isk} \n"
 
             Contract.create(
@@ -673,10 +683,11 @@ def make_transfer_command(
 ):
     deposit_total = 0
     user_transfers = []
+    users = GooseUser.objects.in_bulk(list(total_participation.keys()))
     for user_id, isk in total_participation.items():
         floored_isk = m.floor(isk.amount)
         if user_id != transferring_user.id:
-            user = GooseUser.objects.get(id=user_id)
+            user = users[user_id]
             user_transfers.append((user.discord_uid(), floored_isk))
             deposit_total = deposit_total + floored_isk
 
@@ -705,6 +716,43 @@ def make_deposit_command(
     )
 
 
+def _validate_transactions(transactions):
+    # full_clean queries for every foreign key, and a transfers foreign keys all come
+    # from rows just loaded from the database. So one transaction is fully cleaned and
+    # every other field of every transaction is checked against its field in one pass.
+    if not transactions:
+        return
+    transactions[0].full_clean()
+    fields = [
+        field
+        for field in transactions[0]._meta.concrete_fields
+        if not field.is_relation and not field.primary_key
+    ]
+    for transaction_to_check in transactions[1:]:
+        for field in fields:
+            try:
+                field.clean(
+                    getattr(transaction_to_check, field.attname), transaction_to_check
+                )
+            except ValidationError as e:
+                raise ValidationError({field.name: e.error_list})
+
+
+def write_transfer_transactions(deposit_transactions, egg_transactions):
+    """
+    Validates and then bulk inserts a transfers transactions. bulk_create skips the
+    signals which keep the balance ledgers up to date so they are applied here.
+    """
+    _validate_transactions(deposit_transactions)
+    _validate_transactions(egg_transactions)
+    IskTransaction.objects.bulk_create(
+        deposit_transactions, batch_size=TRANSFER_BATCH_SIZE
+    )
+    EggTransaction.objects.bulk_create(egg_transactions, batch_size=TRANSFER_BATCH_SIZE)
+    apply_isk_transactions([t.id for t in deposit_transactions])
+    apply_egg_transactions([t.id for t in egg_transactions])
+
+
 def transfer_sold_items(
     to_transfer, own_share_in_eggs, request, transfer_method, contract_character
 ):
@@ -717,12 +765,26 @@ def transfer_sold_items(
     explaination = {}
     current_now = timezone.now()
     last_item = None
-    for sold_item in to_transfer:
+    sold_items = list(
+        to_transfer.select_related(
+            "item__item",
+            "item__loot_group",
+            "item__marketorder",
+            "item__junkeditem",
+            "item__location__character_location__system",
+            "item__location__character_location__character__user",
+        )
+    )
+    participation_calculator = Participation.for_loot_groups(
+        {sold_item.item.loot_group_id for sold_item in sold_items}
+    )
+    deposit_transactions = []
+    egg_transactions = []
+    for sold_item in sold_items:
         last_item = sold_item.item
         quantity_to_transfer = sold_item.quantity_to_transfer()
         total_isk = to_isk(sold_item.isk_balance)
-        bucket = sold_item.item.loot_group.bucket
-        participation = bucket.calculate_participation(
+        participation = participation_calculator.calculate(
             total_isk, sold_item.item.loot_group
         )
         item_id = sold_item.item.id
@@ -733,43 +795,41 @@ def transfer_sold_items(
         total = total + total_isk
         count = count + quantity_to_transfer
         for user_id, result in participation["participation"].items():
-            user = GooseUser.objects.get(id=user_id)
             isk = result["total_isk"]
             floored_isk = to_isk(m.floor(isk.amount))
-            if request.gooseuser == user:
+            if request.gooseuser.id == user_id:
                 sellers_isk = sellers_isk + floored_isk
             else:
                 others_isk = others_isk + floored_isk
             left_over = left_over + isk - floored_isk
 
-            deposit_transaction = IskTransaction(
-                item=sold_item.item,
-                quantity=quantity_to_transfer,
-                time=current_now,
-                isk=-floored_isk,
-                transaction_type="egg_deposit",
+            deposit_transactions.append(
+                IskTransaction(
+                    item=sold_item.item,
+                    quantity=quantity_to_transfer,
+                    time=current_now,
+                    isk=-floored_isk,
+                    transaction_type="egg_deposit",
+                )
             )
-            deposit_transaction.full_clean()
-            deposit_transaction.save()
-            egg_transaction = EggTransaction(
-                item=sold_item.item,
-                quantity=quantity_to_transfer,
-                time=current_now,
-                eggs=floored_isk,
-                debt=False,
-                counterparty=user,
+            egg_transactions.append(
+                EggTransaction(
+                    item=sold_item.item,
+                    quantity=quantity_to_transfer,
+                    time=current_now,
+                    eggs=floored_isk,
+                    debt=False,
+                    counterparty_id=user_id,
+                )
             )
-            egg_transaction.full_clean()
-            egg_transaction.save()
             if user_id in total_participation:
                 total_participation[user_id] = (
                     total_participation[user_id] + floored_isk
                 )
             else:
                 total_participation[user_id] = floored_isk
-        sold_item.transfered_quantity = sold_item.quantity
-        sold_item.full_clean()
-        sold_item.save()
+
+    write_transfer_transactions(deposit_transactions, egg_transactions)
 
     left_over_floored = to_isk(m.floor(left_over.amount))
     if left_over.amount > 0:
@@ -844,19 +904,26 @@ def transfer_sold_items(
             f"Told all recipients to Send {contract_character} contracts in-game for "
             f"{t} ISK from {count} sold items!.",
         )
-    to_transfer.update(transfer_log=log.id)
+    SoldItem.objects.filter(id__in=[sold_item.id for sold_item in sold_items]).update(
+        transfered_quantity=F("quantity"), transfer_log=log.id
+    )
+    invalidate_badge_counts()
     return log.id
 
 
-def valid_transfer(to_transfer, request, form):
+def sold_items_to_transfer(gooseuser):
+    return SoldItem.objects.filter(
+        item__location__character_location__character__user=gooseuser,
+        quantity__gt=F("transfered_quantity"),
+    ).annotate(isk_balance=F("item__ledger_balance__isk"))
+
+
+def valid_transfer(to_transfer, request, transfer_method, contract_character):
     if to_transfer.count() == 0:
         messages.error(request, "You cannot transfer 0 items")
         return False
 
-    if (
-        form.cleaned_data["transfer_method"].transfer_type == "contract"
-        and not form.cleaned_data["character_to_send_contracts_to"]
-    ):
+    if transfer_method.transfer_type == "contract" and not contract_character:
         error_message = (
             "You must specify a character which people will be sending "
             "the contracts to get their profit "
@@ -917,23 +984,16 @@ def transfer_profit(request):
         )
 
         if form.is_valid():
-            to_transfer = SoldItem.objects.filter(
-                item__location__character_location__character__user=request.gooseuser,
-                quantity__gt=F("transfered_quantity"),
-            ).annotate(isk_balance=Sum("item__isktransaction__isk"))
-            if not valid_transfer(to_transfer, request, form):
-                return HttpResponseRedirect(reverse("sold"))
-            log_id = transfer_sold_items(
-                to_transfer,
-                form.cleaned_data["own_share_in_eggs"],
-                request,
-                form.cleaned_data["transfer_method"],
-                form.cleaned_data["character_to_send_contracts_to"],
+            contract_character = form.cleaned_data["character_to_send_contracts_to"]
+            job = submit_job(
+                "transfer_profit",
+                request.gooseuser,
+                idempotency_key(request),
+                own_share_in_eggs=form.cleaned_data["own_share_in_eggs"],
+                transfer_method_id=form.cleaned_data["transfer_method"].id,
+                contract_character_id=contract_character and contract_character.id,
             )
-            if log_id:
-                return HttpResponseRedirect(reverse("view_transfer_log", args=[log_id]))
-            else:
-                return HttpResponseRedirect(reverse("sold"))
+            return redirect_to_job(request, job)
     else:
         form = TransferProfitForm(
             initial={
@@ -949,7 +1009,11 @@ def transfer_profit(request):
     return render(
         request,
         "ownership/transfer_profit.html",
-        {"form": form, "title": "Transfer Profit"},
+        {
+            "form": form,
+            "idempotency_key": idempotency_key(request),
+            "title": "Transfer Profit",
+        },
     )
 
 
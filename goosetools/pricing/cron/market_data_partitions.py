@@ -0,0 +1,16 @@
+from django_cron import Schedule
+
+from goosetools.pricing.management.commands.market_data_partitions import Command
+from goosetools.tenants.cron import TenantCronJob
+
+
+class MarketDataPartitions(TenantCronJob):
+    RUN_EVERY_MINS = 60 * 24
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = "pricing.market_data_partitions"
+
+    def run_for_tenant(self, tenant):
+        Command.maintain(
+            Command.DEFAULT_MONTHS_AHEAD, migrate_default=False, drop=False
+        )
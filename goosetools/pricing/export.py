@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Optional
+
+from dateutil.parser import parse
+from django.utils import timezone
+
+from goosetools.pricing.models import DataSet, ItemMarketDataEvent
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_COLUMNS = [
+    "id",
+    "time",
+    "item_id",
+    "item__name",
+    "item__eve_echoes_market_id",
+    "unique_user_id",
+    "manual_override_price",
+    "sell",
+    "buy",
+    "lowest_sell",
+    "highest_buy",
+    "volume",
+]
+HEADERS = [column.replace("__", "_") for column in EXPORT_COLUMNS]
+PRICE_COLUMNS = {"sell", "buy", "lowest_sell", "highest_buy", "volume"}
+
+
+class ExportFormatUnavailable(Exception):
+    pass
+
+
+def parse_export_date(value: str) -> datetime:
+    """
+    Parses a from or to date, taking one without an offset to be in the current time
+    zone. Raises ValueError if it is not a date.
+    """
+    try:
+        parsed = parse(value)
+    except OverflowError as e:
+        raise ValueError(str(e))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def market_data_rows(
+    price_list: DataSet,
+    item_ids: Optional[List[int]] = None,
+    from_time: Optional[datetime] = None,
+    to_time: Optional[datetime] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[tuple]:
+    """
+    Every event in the price list oldest first as EXPORT_COLUMNS tuples, read through
+    a server side cursor chunk_size rows at a time so memory use does not depend on
+    how many there are.
+    """
+    events = ItemMarketDataEvent.objects.filter(price_list=price_list)
+    if item_ids is not None:
+        events = events.filter(item_id__in=item_ids)
+    if from_time is not None:
+        events = events.filter(time__gte=from_time)
+    if to_time is not None:
+        events = events.filter(time__lte=to_time)
+    return (
+        events.order_by("time", "id")
+        .values_list(*EXPORT_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADERS)
+    for batch in _batches(rows, EXPORT_CHUNK_SIZE):
+        writer.writerows([row[:1] + (row[1].isoformat(),) + row[2:] for row in batch])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        # Sent as a string so no precision is lost to floats.
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(rows: Iterable[tuple]) -> Iterator[str]:
+    for batch in _batches(rows, EXPORT_CHUNK_SIZE):
+        yield "".join(
+            json.dumps(dict(zip(HEADERS, map(_json_value, row)))) + "\n"
+            for row in batch
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    A write only file which keeps what has been written since it was last drained,
+    so a Parquet file can be sent a row group at a time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        self.position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(rows: Iterable[tuple]) -> Iterator[bytes]:
+    """
+    Writes one Parquet row group per EXPORT_CHUNK_SIZE rows with the prices as
+    decimal(20, 2) columns. Needs pyarrow, which is not a dependency of goosetools.
+    """
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        raise ExportFormatUnavailable(
+            "Parquet exports need pyarrow installed on the server."
+        )
+
+    types = {
+        "id": pyarrow.int64(),
+        "time": pyarrow.timestamp("us", tz="UTC"),
+        "item_id": pyarrow.int64(),
+        "manual_override_price": pyarrow.bool_(),
+    }
+    schema = pyarrow.schema(
+        [
+            (header, pyarrow.decimal128(20, 2))
+            if header in PRICE_COLUMNS
+            else (header, types.get(header, pyarrow.string()))
+            for header in HEADERS
+        ]
+    )
+
+    def generate():
+        sink = _ChunkSink()
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        for batch in _batches(rows, EXPORT_CHUNK_SIZE):
+            columns = list(zip(*batch))
+            writer.write_table(
+                pyarrow.Table.from_arrays(
+                    [
+                        pyarrow.array(column, type=field.type)
+                        for column, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
+
+
+# format: (content type, file extension, function turning rows into chunks)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv", csv_chunks),
+    "ndjson": ("application/x-ndjson", "ndjson", ndjson_chunks),
+    "parquet": ("application/vnd.apache.parquet", "parquet", parquet_chunks),
+}
@@ -28,6 +28,7 @@ class PriceListForm(forms.ModelForm):
             "data_set_type",
             "google_sheet_id",
             "google_sheet_cell_range",
+            "retention_days",
             "default",
         ]
 
@@ -0,0 +1,287 @@
+from datetime import datetime
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+from django.db import connection
+
+from goosetools.items.models import CHANGE_SEQUENCE, lock_change_sequence
+from goosetools.pricing.constants import PRICE_TYPES, ROLLUP_PERIODS
+
+# The per-event numeric columns which an ingest can write.
+MARKET_DATA_FIELDS = ["sell", "buy", "lowest_sell", "highest_buy", "volume"]
+
+
+def _apply_staged_sql(fields: List[str]) -> str:
+    columns = ", ".join(fields)
+    staged_columns = ", ".join(f"s.{f}" for f in fields)
+    set_clause = ", ".join(f"{f} = d.{f}" for f in fields)
+    data_columns = ", ".join(f"d.{f}" for f in fields)
+    # Updates the events already existing for each (price list, item, time), inserts
+    # the rest and updates the items cached lowest sell from their newest staged
+    # point, giving the items whose lowest sell changed a new change_seq. ON CONFLICT
+    # cannot be used for the events as automatically downloaded events have a NULL
+    # unique_user_id, so never conflict.
+    return f"""
+        WITH data AS (
+            SELECT DISTINCT ON (i.id, s.time) i.id AS item_id, s.time,
+                {staged_columns}
+            FROM global_items_globalmarketdatapoint s
+            JOIN items_item i ON i.eve_echoes_market_id = s.eve_echoes_market_id
+            WHERE s.batch_id = %s
+            ORDER BY i.id, s.time, s.id DESC
+        ), price_lists (price_list_id) AS (
+            SELECT unnest(%s::integer[])
+        ), updated AS (
+            UPDATE pricing_itemmarketdataevent e
+            SET {set_clause}
+            FROM data d, price_lists p
+            WHERE e.price_list_id = p.price_list_id
+                AND e.item_id = d.item_id
+                AND e.time = d.time
+            RETURNING e.id, e.price_list_id, e.item_id, e.time
+        ), inserted AS (
+            INSERT INTO pricing_itemmarketdataevent
+                (price_list_id, item_id, time, manual_override_price, {columns})
+            SELECT p.price_list_id, d.item_id, d.time, false, {data_columns}
+            FROM data d CROSS JOIN price_lists p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM updated u
+                WHERE u.price_list_id = p.price_list_id
+                    AND u.item_id = d.item_id
+                    AND u.time = d.time
+            )
+            RETURNING 1
+        ), lowest_sells AS (
+            UPDATE items_item i
+            SET cached_lowest_sell = newest.lowest_sell,
+                change_seq = nextval('{CHANGE_SEQUENCE}')
+            FROM (
+                SELECT DISTINCT ON (item_id) item_id, lowest_sell
+                FROM data
+                ORDER BY item_id, time DESC
+            ) newest
+            WHERE i.id = newest.item_id
+                AND i.cached_lowest_sell IS DISTINCT FROM newest.lowest_sell
+        )
+        SELECT
+            (SELECT count(*) FROM updated) + (SELECT count(*) FROM inserted),
+            (SELECT array_agg(DISTINCT item_id) FROM data),
+            (SELECT min(time) FROM data),
+            (SELECT max(time) FROM data),
+            (SELECT array_agg(id) FROM updated)
+    """
+
+
+def apply_staged_market_data(
+    batch_id: int, price_list_ids: List[int], fields: List[str]
+) -> int:
+    """
+    Upserts a batch of market data staged in the public schema into the current
+    tenants events with one statement, then refreshes the latest events and rollups of
+    every price list. Returns the number of events written.
+    """
+    for field in fields:
+        if field not in MARKET_DATA_FIELDS:
+            raise ValueError(f"Unknown market data field {field}")
+    lock_change_sequence()
+    with connection.cursor() as cursor:
+        cursor.execute(_apply_staged_sql(fields), [batch_id, list(price_list_ids)])
+        num_events, item_ids, since, until, updated_ids = cursor.fetchone()
+    if item_ids:
+        for price_list_id in price_list_ids:
+            refresh_latest_market_data(price_list_id, item_ids, updated_ids)
+        refresh_market_data_rollups(price_list_ids, item_ids, since, until)
+    return num_events
+
+
+# The latest event for an item in a price list is its newest manual override price if
+# it has one, otherwise its newest event. Ties are broken by the newest id.
+LATEST_EVENTS_SQL = """
+    SELECT DISTINCT ON (item_id) price_list_id, item_id, time, id
+    FROM pricing_itemmarketdataevent
+    WHERE price_list_id = %s {item_filter}
+    ORDER BY item_id, manual_override_price DESC, time DESC, id DESC
+"""
+
+
+def refresh_latest_market_data(
+    price_list_id: int,
+    item_ids: Optional[List[int]] = None,
+    updated_event_ids: Optional[List[int]] = None,
+) -> int:
+    """
+    Rebuilds the LatestItemMarketDataEvent rows of a price list, or just the given
+    items in it, from the raw events in a single statement. Rows still pointing at
+    one of updated_event_ids get a new change_seq too, as their prices have changed.
+    """
+    params: List = [price_list_id]
+    item_filter = ""
+    latest_item_filter = ""
+    if item_ids is not None:
+        item_filter = "AND item_id = ANY(%s::integer[])"
+        latest_item_filter = "AND l.item_id = ANY(%s::integer[])"
+        params.append(list(item_ids))
+    latest_events_sql = LATEST_EVENTS_SQL.format(item_filter=item_filter)
+    lock_change_sequence()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH latest AS ({latest_events_sql}), removed AS (
+                DELETE FROM pricing_latestitemmarketdataevent l
+                WHERE l.price_list_id = %s {latest_item_filter}
+                    AND NOT EXISTS (
+                        SELECT 1 FROM latest WHERE latest.item_id = l.item_id
+                    )
+                RETURNING l.price_list_id, l.item_id
+            ), tombstones AS (
+                INSERT INTO pricing_latestitemmarketdataeventtombstone
+                    (price_list_id, item_id, change_seq)
+                SELECT price_list_id, item_id, nextval('{CHANGE_SEQUENCE}')
+                FROM removed
+            )
+            INSERT INTO pricing_latestitemmarketdataevent
+                (price_list_id, item_id, time, event_id, change_seq)
+            SELECT price_list_id, item_id, time, id, nextval('{CHANGE_SEQUENCE}')
+            FROM latest
+            ON CONFLICT (price_list_id, item_id) DO UPDATE
+            SET time = EXCLUDED.time, event_id = EXCLUDED.event_id,
+                change_seq = EXCLUDED.change_seq
+            WHERE pricing_latestitemmarketdataevent.event_id
+                IS DISTINCT FROM EXCLUDED.event_id
+                OR EXCLUDED.event_id = ANY(%s::bigint[])
+            """,
+            params + params + [list(updated_event_ids or [])],
+        )
+        return cursor.rowcount
+
+
+def find_inconsistent_latest_market_data(price_list_id: int) -> List[Tuple]:
+    """
+    Returns (item_id, expected_event_id, actual_event_id) for every item in the price
+    list whose LatestItemMarketDataEvent row does not match the raw events.
+    """
+    latest_events_sql = LATEST_EVENTS_SQL.format(item_filter="")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH expected AS ({latest_events_sql}), actual AS (
+                SELECT l.item_id, l.event_id, e.item_id AS event_item_id,
+                    e.price_list_id AS event_price_list_id
+                FROM pricing_latestitemmarketdataevent l
+                JOIN pricing_itemmarketdataevent e ON e.id = l.event_id
+                WHERE l.price_list_id = %s
+            )
+            SELECT COALESCE(expected.item_id, actual.item_id),
+                expected.id, actual.event_id
+            FROM expected FULL OUTER JOIN actual
+                ON expected.item_id = actual.item_id
+            WHERE expected.id IS DISTINCT FROM actual.event_id
+                OR actual.event_item_id IS DISTINCT FROM actual.item_id
+                OR actual.event_price_list_id IS DISTINCT FROM %s
+            ORDER BY 1
+            """,
+            [price_list_id, price_list_id, price_list_id],
+        )
+        return cursor.fetchall()
+
+
+def _refresh_rollups_sql(filters: str) -> str:
+    price_values = ", ".join(f"('{t}', e.{t})" for t, _ in PRICE_TYPES)
+    event_filters = filters.format(alias="e", column="time")
+    rollup_filters = filters.format(alias="r", column="bucket")
+    # Recomputes every bucket of the period in the range from the raw events, removing
+    # buckets whose events have all gone.
+    return f"""
+        WITH rollups AS (
+            SELECT e.price_list_id, e.item_id, p.price_type,
+                date_trunc(%(period)s, e.time AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                    AS bucket,
+                (array_agg(p.price ORDER BY e.time, e.id))[1] AS open,
+                max(p.price) AS high,
+                min(p.price) AS low,
+                (array_agg(p.price ORDER BY e.time DESC, e.id DESC))[1] AS close,
+                sum(p.price) AS total,
+                count(*) AS count,
+                sum(e.volume) AS volume
+            FROM pricing_itemmarketdataevent e
+            CROSS JOIN LATERAL (VALUES {price_values}) p (price_type, price)
+            WHERE p.price IS NOT NULL {event_filters}
+            GROUP BY 1, 2, 3, 4
+        ), removed AS (
+            DELETE FROM pricing_itemmarketdatarollup r
+            WHERE r.period = %(period)s
+                {rollup_filters}
+                AND NOT EXISTS (
+                    SELECT 1 FROM rollups n
+                    WHERE n.price_list_id = r.price_list_id
+                        AND n.item_id = r.item_id
+                        AND n.price_type = r.price_type
+                        AND n.bucket = r.bucket
+                )
+        )
+        INSERT INTO pricing_itemmarketdatarollup (price_list_id, item_id, price_type,
+            period, bucket, open, high, low, close, total, count, volume)
+        SELECT price_list_id, item_id, price_type, %(period)s, bucket, open, high, low,
+            close, total, count, volume
+        FROM rollups
+        ON CONFLICT (price_list_id, item_id, price_type, period, bucket) DO UPDATE
+        SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+            close = EXCLUDED.close, total = EXCLUDED.total, count = EXCLUDED.count,
+            volume = EXCLUDED.volume
+    """
+
+
+def refresh_market_data_rollups(
+    price_list_ids: List[int],
+    item_ids: Optional[List[int]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> int:
+    """
+    Recomputes the hourly and daily ItemMarketDataRollup rows of the given price lists,
+    optionally only for some items and only for the buckets between since and until.
+    Buckets are rebuilt from the raw events, so buckets whose events have all gone are
+    removed.
+    """
+    filters = "AND {alias}.price_list_id = ANY(%(price_list_ids)s::integer[])"
+    if item_ids is not None:
+        filters += " AND {alias}.item_id = ANY(%(item_ids)s::integer[])"
+    if since is not None:
+        filters += (
+            " AND {alias}.{column} >= date_trunc(%(period)s, %(since)s "
+            "AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+        )
+    if until is not None:
+        filters += (
+            " AND {alias}.{column} < (date_trunc(%(period)s, %(until)s "
+            "AT TIME ZONE 'UTC') + %(interval)s::interval) AT TIME ZONE 'UTC'"
+        )
+    rows = 0
+    with connection.cursor() as cursor:
+        for period, _ in ROLLUP_PERIODS:
+            cursor.execute(
+                _refresh_rollups_sql(filters),
+                {
+                    "period": period,
+                    "interval": f"1 {period}",
+                    "price_list_ids": list(price_list_ids),
+                    "item_ids": list(item_ids) if item_ids is not None else None,
+                    "since": since,
+                    "until": until,
+                },
+            )
+            rows += cursor.rowcount
+    return rows
+
+
+class IngestTimer:
+    def __init__(self):
+        self.start = perf_counter()
+
+    def elapsed(self) -> float:
+        return perf_counter() - self.start
+
+    def report(self, num_rows: int, what: str) -> str:
+        elapsed = self.elapsed()
+        rate = num_rows / elapsed if elapsed > 0 else float("inf")
+        return f"{what}: {num_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/s)"
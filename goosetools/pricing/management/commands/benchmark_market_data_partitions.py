@@ -0,0 +1,175 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from goosetools.pricing.partitions import add_months, month_bounds, month_start
+
+BENCHMARK_SCHEMA = "market_data_partition_benchmark"
+
+COLUMNS = """
+    id bigint NOT NULL,
+    time timestamp with time zone NOT NULL,
+    price_list_id integer NOT NULL,
+    item_id integer NOT NULL,
+    manual_override_price boolean NOT NULL,
+    sell numeric(20, 2),
+    buy numeric(20, 2),
+    lowest_sell numeric(20, 2),
+    highest_buy numeric(20, 2),
+    volume numeric(20, 2)
+"""
+
+# The queries the site runs against the event table: calc_estimate_price, the item
+# price history graph and working out each items latest event.
+QUERIES = {
+    "estimate_price_24h": """
+        SELECT avg(lowest_sell) FROM {table}
+        WHERE item_id = %(item_id)s AND price_list_id = %(price_list_id)s
+            AND time >= %(now)s - interval '24 hours'
+    """,
+    "item_history_90d": """
+        SELECT time, lowest_sell, highest_buy, volume FROM {table}
+        WHERE item_id = %(item_id)s AND price_list_id = %(price_list_id)s
+            AND time >= %(now)s - interval '90 days'
+        ORDER BY time
+    """,
+    "latest_events": """
+        SELECT DISTINCT ON (item_id) item_id, id FROM {table}
+        WHERE price_list_id = %(price_list_id)s
+            AND time >= %(now)s - interval '7 days'
+        ORDER BY item_id, manual_override_price DESC, time DESC, id DESC
+    """,
+}
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "benchmark_market_data_partitions"
+    help = (
+        "Generates a synthetic market data event table in a scratch schema, once as "
+        "a plain table with the old indexes and once partitioned by month with the "
+        "new ones, and compares query timings between them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000000)
+        parser.add_argument("--items", type=int, default=5000)
+        parser.add_argument("--price_lists", type=int, default=2)
+        parser.add_argument("--repeats", type=int, default=5)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the scratch schema afterwards instead of dropping it.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {BENCHMARK_SCHEMA}")
+            try:
+                self.generate(cursor, options, now)
+                self.compare(cursor, options, now)
+            finally:
+                if not options["keep"]:
+                    cursor.execute(f"DROP SCHEMA {BENCHMARK_SCHEMA} CASCADE")
+
+    @staticmethod
+    def generate(cursor, options, now):
+        plain = f"{BENCHMARK_SCHEMA}.plain"
+        partitioned = f"{BENCHMARK_SCHEMA}.partitioned"
+        per_hour = options["items"] * options["price_lists"]
+        hours = -(-options["rows"] // per_hour)
+        print(
+            f"Generating {options['rows']} rows covering {hours} hours of "
+            f"{options['items']} items in {options['price_lists']} price lists"
+        )
+        cursor.execute(f"CREATE TABLE {plain} ({COLUMNS}, PRIMARY KEY (id))")
+        cursor.execute(
+            f"""
+            INSERT INTO {plain}
+            SELECT g,
+                %(now)s - (g / %(per_hour)s) * interval '1 hour',
+                1 + g %% %(price_lists)s,
+                1 + (g / %(price_lists)s) %% %(items)s,
+                false,
+                s, s * 0.9, s * 0.95, s * 0.85, floor(random() * 10000)
+            FROM (
+                SELECT g, round((random() * 1000000)::numeric, 2) s
+                FROM generate_series(0, %(rows)s - 1) g
+            ) generated
+            """,
+            {
+                "now": now,
+                "per_hour": per_hour,
+                "price_lists": options["price_lists"],
+                "items": options["items"],
+                "rows": options["rows"],
+            },
+        )
+        cursor.execute(f"CREATE INDEX ON {plain} (price_list_id, time DESC, item_id)")
+        cursor.execute(f"CREATE INDEX ON {plain} (item_id)")
+
+        cursor.execute(
+            f"""
+            CREATE TABLE {partitioned} ({COLUMNS}, PRIMARY KEY (id, time))
+            PARTITION BY RANGE (time)
+            """
+        )
+        cursor.execute(f"SELECT min(time) FROM {plain}")
+        month = month_start(cursor.fetchone()[0].astimezone(timezone.utc).date())
+        last_month = month_start(now.astimezone(timezone.utc).date())
+        while month <= last_month:
+            start, end = month_bounds(month)
+            cursor.execute(
+                f"""
+                CREATE TABLE {partitioned}_{month:%Y%m} PARTITION OF {partitioned}
+                FOR VALUES FROM (%s) TO (%s)
+                """,
+                [start, end],
+            )
+            month = add_months(month, 1)
+        cursor.execute(f"INSERT INTO {partitioned} SELECT * FROM {plain}")
+        cursor.execute(
+            f"CREATE INDEX ON {partitioned} (price_list_id, time DESC, item_id)"
+        )
+        cursor.execute(
+            f"CREATE INDEX ON {partitioned} (item_id, price_list_id, time DESC)"
+        )
+        cursor.execute(f"ANALYZE {plain}")
+        cursor.execute(f"ANALYZE {partitioned}")
+
+    @staticmethod
+    def time_query(cursor, sql, params, repeats):
+        timings = []
+        for _ in range(repeats):
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            timings.append(plan[0]["Execution Time"])
+        return statistics.median(timings)
+
+    def compare(self, cursor, options, now):
+        params = {
+            "item_id": max(1, options["items"] // 2),
+            "price_list_id": 1,
+            "now": now,
+        }
+        print(f"{'query':<22}{'before ms':>12}{'after ms':>12}")
+        for name, sql in QUERIES.items():
+            before = self.time_query(
+                cursor,
+                sql.format(table=f"{BENCHMARK_SCHEMA}.plain"),
+                params,
+                options["repeats"],
+            )
+            after = self.time_query(
+                cursor,
+                sql.format(table=f"{BENCHMARK_SCHEMA}.partitioned"),
+                params,
+                options["repeats"],
+            )
+            print(f"{name:<22}{before:>12.2f}{after:>12.2f}")
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import tenant_context
+
+from goosetools.pricing.ingest import (
+    find_inconsistent_latest_market_data,
+    refresh_latest_market_data,
+)
+from goosetools.pricing.models import DataSet
+from goosetools.tenants.models import Client
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "check_latest_market_data"
+    help = (
+        "Verifies every tenants latest market data table against the raw market data "
+        "events, optionally rebuilding any price list which does not match."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true")
+
+    def handle(self, *args, **options):
+        total_inconsistent = 0
+        for tenant in Client.objects.all():
+            with tenant_context(tenant):
+                if tenant.name != "public":
+                    print(f"Checking latest market data for {tenant.name}")
+                    for price_list in DataSet.objects.all():
+                        total_inconsistent += self.check_price_list(
+                            price_list, options["fix"]
+                        )
+        if total_inconsistent and not options["fix"]:
+            print(
+                f"Found {total_inconsistent} inconsistent items, rerun with --fix to "
+                f"rebuild them."
+            )
+            raise SystemExit(1)
+
+    @staticmethod
+    def check_price_list(price_list, fix):
+        inconsistent = find_inconsistent_latest_market_data(price_list.id)
+        for item_id, expected_event_id, actual_event_id in inconsistent:
+            print(
+                f"   {price_list}: item {item_id} should have latest event "
+                f"{expected_event_id} but has {actual_event_id}"
+            )
+        print(f"   {price_list}: {len(inconsistent)} inconsistent items.")
+        if inconsistent and fix:
+            refresh_latest_market_data(price_list.id)
+            print(f"   {price_list}: rebuilt latest market data.")
+        return len(inconsistent)
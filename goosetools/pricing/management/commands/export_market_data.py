@@ -0,0 +1,71 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import tenant_context
+
+from goosetools.pricing.export import (
+    EXPORT_FORMATS,
+    ExportFormatUnavailable,
+    market_data_rows,
+    parse_export_date,
+)
+from goosetools.pricing.models import DataSet
+from goosetools.tenants.models import Client
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "export_market_data"
+    help = (
+        "Exports a tenants market data events as CSV, NDJSON or Parquet, streaming "
+        "them to the output so any range can be exported in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("tenant", help="The schema name of the tenant.")
+        parser.add_argument(
+            "--price_list", type=int, help="Defaults to the default price list."
+        )
+        parser.add_argument(
+            "--items", type=int, nargs="+", help="Only export these item ids."
+        )
+        parser.add_argument("--from_date")
+        parser.add_argument("--to_date")
+        parser.add_argument("--format", choices=EXPORT_FORMATS.keys(), default="csv")
+        parser.add_argument("--output", help="A file to write to instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Client.objects.get(schema_name=options["tenant"])
+        except Client.DoesNotExist:
+            raise CommandError(f"No tenant called {options['tenant']}")
+        try:
+            from_date = options["from_date"] and parse_export_date(options["from_date"])
+            to_date = options["to_date"] and parse_export_date(options["to_date"])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        _, _, to_chunks = EXPORT_FORMATS[options["format"]]
+        binary = options["format"] == "parquet"
+
+        with tenant_context(tenant):
+            if options["price_list"] is None:
+                price_list = DataSet.get_default()
+            else:
+                price_list = DataSet.objects.get(pk=options["price_list"])
+            try:
+                chunks = to_chunks(
+                    market_data_rows(price_list, options["items"], from_date, to_date)
+                )
+            except ExportFormatUnavailable as e:
+                raise CommandError(str(e))
+
+            if options["output"]:
+                mode, newline = ("wb", None) if binary else ("w", "")
+                with open(options["output"], mode, newline=newline) as output:
+                    self.write_chunks(chunks, output)
+            else:
+                self.write_chunks(chunks, sys.stdout.buffer if binary else sys.stdout)
+
+    @staticmethod
+    def write_chunks(chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+
+from goosetools.pricing.ingest import refresh_latest_market_data
+from goosetools.pricing.models import DataSet
+from goosetools.pricing.partitions import (
+    delete_expired_events,
+    ensure_month_partitions,
+    expired_month_partitions,
+    migrate_default_partition,
+    remove_month_partition,
+)
+from goosetools.tenants.cron import run_for_tenants
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "market_data_partitions"
+    DEFAULT_MONTHS_AHEAD = 3
+    help = (
+        "Maintains the monthly partitions of the market data event table: creates "
+        "future partitions, moves rows out of the default partition and applies each "
+        "price lists retention policy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months_ahead",
+            action="store",
+            type=int,
+            default=self.DEFAULT_MONTHS_AHEAD,
+        )
+        parser.add_argument(
+            "--migrate_default",
+            action="store_true",
+            help="Move every row still in the default partition, such as rows from "
+            "before the table was partitioned, into monthly partitions.",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop expired partitions instead of just detaching them.",
+        )
+        parser.add_argument(
+            "--tenants",
+            action="store",
+            nargs="*",
+            help="Only run for these tenant schema names.",
+        )
+        parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            help="How many tenants to maintain at once.",
+        )
+
+    def handle(self, *args, **options):
+        run_for_tenants(
+            self.COMMAND_NAME,
+            lambda tenant: self.maintain(
+                options["months_ahead"], options["migrate_default"], options["drop"]
+            ),
+            options["tenants"],
+            options["workers"],
+        )
+
+    @staticmethod
+    def maintain(months_ahead, migrate_default, drop):
+        if migrate_default:
+            for month, moved in migrate_default_partition().items():
+                print(f"   Moved {moved} rows from the default partition into {month}")
+        for month in ensure_month_partitions(months_ahead):
+            print(f"   Created partition for {month}")
+
+        retentions = {}
+        for data_set in DataSet.objects.all():
+            retentions[data_set.id] = data_set.retention_days
+            if data_set.retention_days is not None:
+                deleted = delete_expired_events(data_set.id, data_set.retention_days)
+                print(f"   Deleted {deleted} expired events from {data_set}")
+
+        # A whole month can only go once every price list has a retention shorter
+        # than its age.
+        if retentions and None not in retentions.values():
+            orphaned = set()
+            for month in expired_month_partitions(max(retentions.values())):
+                orphaned |= remove_month_partition(month, drop)
+                print(
+                    f"   {'Dropped' if drop else 'Detached'} expired partition for "
+                    f"{month}"
+                )
+            by_price_list = {}
+            for price_list_id, item_id in orphaned:
+                by_price_list.setdefault(price_list_id, []).append(item_id)
+            for price_list_id, item_ids in by_price_list.items():
+                refresh_latest_market_data(price_list_id, item_ids)
@@ -0,0 +1,118 @@
+# Generated by Django 3.1.4 on 2021-08-17 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_primary_key_sql(table):
+    # Partitions can only have their parent tables primary key and the primary key of
+    # a detached partition has to go before the original one can come back.
+    return f"""
+DO $$
+DECLARE pk_name text;
+BEGIN
+    SELECT conname INTO pk_name FROM pg_constraint
+    WHERE conrelid = '{table}'::regclass AND contype = 'p';
+    EXECUTE format('ALTER TABLE {table} DROP CONSTRAINT %I', pk_name);
+END $$;
+"""
+
+
+# Turns pricing_itemmarketdataevent into a table partitioned by month on time. The
+# existing table is attached as the default partition so no rows are copied here,
+# run `manage.py market_data_partitions --migrate_default` afterwards to move them
+# into monthly partitions a month at a time.
+PARTITION_SQL = f"""
+ALTER TABLE pricing_itemmarketdataevent
+    RENAME TO pricing_itemmarketdataevent_default;
+ALTER INDEX pricing_ite_price_l_c8ffd1_idx
+    RENAME TO pricing_ite_price_l_c8ffd1_default_idx;
+{drop_primary_key_sql("pricing_itemmarketdataevent_default")}
+
+CREATE TABLE pricing_itemmarketdataevent (
+    LIKE pricing_itemmarketdataevent_default INCLUDING DEFAULTS
+) PARTITION BY RANGE (time);
+ALTER SEQUENCE pricing_itemmarketdataevent_id_seq
+    OWNED BY pricing_itemmarketdataevent.id;
+
+ALTER TABLE pricing_itemmarketdataevent
+    ADD CONSTRAINT pricing_itemmarketdataevent_id_time_pk PRIMARY KEY (id, time);
+ALTER TABLE pricing_itemmarketdataevent
+    ADD CONSTRAINT pricing_itemmarketdataevent_price_list_user_id_item_time_uniq
+    UNIQUE (price_list_id, unique_user_id, item_id, time);
+ALTER TABLE pricing_itemmarketdataevent
+    ADD CONSTRAINT pricing_itemmarketdataevent_item_id_fk_items_item_id
+    FOREIGN KEY (item_id) REFERENCES items_item (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE pricing_itemmarketdataevent
+    ADD CONSTRAINT pricing_itemmarketdataevent_price_list_id_fk_pricing_dataset_id
+    FOREIGN KEY (price_list_id) REFERENCES pricing_dataset (id)
+    DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX pricing_ite_price_l_c8ffd1_idx
+    ON pricing_itemmarketdataevent (price_list_id, time DESC, item_id);
+
+ALTER TABLE pricing_itemmarketdataevent
+    ATTACH PARTITION pricing_itemmarketdataevent_default DEFAULT;
+"""
+
+UNPARTITION_SQL = f"""
+ALTER TABLE pricing_itemmarketdataevent
+    DETACH PARTITION pricing_itemmarketdataevent_default;
+INSERT INTO pricing_itemmarketdataevent_default
+    SELECT * FROM pricing_itemmarketdataevent;
+ALTER SEQUENCE pricing_itemmarketdataevent_id_seq
+    OWNED BY pricing_itemmarketdataevent_default.id;
+DROP TABLE pricing_itemmarketdataevent CASCADE;
+
+ALTER TABLE pricing_itemmarketdataevent_default
+    RENAME TO pricing_itemmarketdataevent;
+ALTER INDEX pricing_ite_price_l_c8ffd1_default_idx
+    RENAME TO pricing_ite_price_l_c8ffd1_idx;
+{drop_primary_key_sql("pricing_itemmarketdataevent")}
+ALTER TABLE pricing_itemmarketdataevent ADD PRIMARY KEY (id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0014_auto_20210808_1758"),
+        ("items", "0011_auto_20210503_1822"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="retention_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="How many days of prices to keep, older prices are deleted apart from each items latest price. Leave blank to keep them forever.",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="latestitemmarketdataevent",
+            name="event",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="pricing.itemmarketdataevent",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="itemmarketdataevent",
+            name="unique_user_id",
+            field=models.TextField(
+                blank=True,
+                help_text="An optional unique ID you want to give this price.",
+                null=True,
+            ),
+        ),
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+        migrations.AddIndex(
+            model_name="itemmarketdataevent",
+            index=models.Index(
+                fields=["item", "price_list", "-time"],
+                name="pricing_ite_item_id_4d8d0e_idx",
+            ),
+        ),
+    ]
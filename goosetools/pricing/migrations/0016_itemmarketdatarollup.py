@@ -0,0 +1,99 @@
+# Generated by Django 3.1.4 on 2021-08-18 20:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_sql(period):
+    return f"""
+INSERT INTO pricing_itemmarketdatarollup (price_list_id, item_id, price_type, period,
+    bucket, open, high, low, close, total, count, volume)
+SELECT e.price_list_id, e.item_id, p.price_type, '{period}',
+    date_trunc('{period}', e.time AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+    (array_agg(p.price ORDER BY e.time, e.id))[1],
+    max(p.price),
+    min(p.price),
+    (array_agg(p.price ORDER BY e.time DESC, e.id DESC))[1],
+    sum(p.price),
+    count(*),
+    sum(e.volume)
+FROM pricing_itemmarketdataevent e
+CROSS JOIN LATERAL (VALUES ('sell', e.sell), ('buy', e.buy),
+    ('lowest_sell', e.lowest_sell), ('highest_buy', e.highest_buy))
+    p (price_type, price)
+WHERE p.price IS NOT NULL
+GROUP BY 1, 2, 3, 5;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0011_auto_20210503_1822"),
+        ("pricing", "0015_partition_itemmarketdataevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemMarketDataRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "price_type",
+                    models.TextField(
+                        choices=[
+                            ("sell", "sell"),
+                            ("buy", "buy"),
+                            ("lowest_sell", "lowest_sell"),
+                            ("highest_buy", "highest_buy"),
+                        ]
+                    ),
+                ),
+                (
+                    "period",
+                    models.TextField(choices=[("hour", "hour"), ("day", "day")]),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("open", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("high", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("low", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("close", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("total", models.DecimalField(decimal_places=2, max_digits=30)),
+                ("count", models.PositiveIntegerField()),
+                (
+                    "volume",
+                    models.DecimalField(decimal_places=2, max_digits=30, null=True),
+                ),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="items.item",
+                    ),
+                ),
+                (
+                    "price_list",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="pricing.dataset",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("price_list", "item", "price_type", "period", "bucket")
+                },
+            },
+        ),
+        migrations.RunSQL(
+            backfill_sql("hour") + backfill_sql("day"), migrations.RunSQL.noop
+        ),
+    ]
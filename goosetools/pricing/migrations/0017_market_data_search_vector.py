@@ -0,0 +1,153 @@
+# Generated by Django 3.1.4 on 2021-08-21 10:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Postgres 12 does not allow BEFORE row triggers on a partitioned table so the event
+# trigger is added to every partition, create_month_partition adds it to new ones.
+SEARCH_VECTOR_SQL = """
+CREATE FUNCTION pricing_market_data_search_vector(
+    event_item_id integer, event_time timestamp with time zone, user_id text
+) RETURNS tsvector AS $$
+    SELECT coalesce(
+        (SELECT search_vector FROM items_item WHERE id = event_item_id), ''::tsvector
+    ) || to_tsvector('english',
+        to_char(event_time AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')
+        || ' ' || coalesce(user_id, ''))
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION pricing_itemmarketdataevent_search_vector() RETURNS trigger AS $$
+BEGIN
+    -- Saving a model writes back whatever search_vector it loaded, only work it out
+    -- again when that or one of the searched columns has changed.
+    IF TG_OP = 'UPDATE'
+        AND NEW.search_vector IS NOT DISTINCT FROM OLD.search_vector
+        AND NEW.item_id = OLD.item_id AND NEW.time = OLD.time
+        AND NEW.unique_user_id IS NOT DISTINCT FROM OLD.unique_user_id THEN
+        RETURN NEW;
+    END IF;
+    NEW.search_vector := pricing_market_data_search_vector(
+        NEW.item_id, NEW.time, NEW.unique_user_id
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION pricing_latestitemmarketdataevent_search_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.search_vector IS NOT DISTINCT FROM OLD.search_vector
+        AND NEW.event_id = OLD.event_id AND NEW.time = OLD.time THEN
+        RETURN NEW;
+    END IF;
+    NEW.search_vector := pricing_market_data_search_vector(
+        NEW.item_id, NEW.time,
+        (SELECT e.unique_user_id FROM pricing_itemmarketdataevent e
+            WHERE e.id = NEW.event_id AND e.time = NEW.time)
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- Setting search_vector to NULL makes the BEFORE triggers work it out again.
+CREATE FUNCTION pricing_event_unique_user_id_changed() RETURNS trigger AS $$
+BEGIN
+    UPDATE pricing_latestitemmarketdataevent SET search_vector = NULL
+    WHERE event_id = NEW.id AND time = NEW.time;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION pricing_item_search_vector_changed() RETURNS trigger AS $$
+BEGIN
+    UPDATE pricing_itemmarketdataevent SET search_vector = NULL
+    WHERE item_id = NEW.id;
+    UPDATE pricing_latestitemmarketdataevent SET search_vector = NULL
+    WHERE item_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+UPDATE pricing_itemmarketdataevent SET search_vector =
+    pricing_market_data_search_vector(item_id, time, unique_user_id);
+UPDATE pricing_latestitemmarketdataevent l SET search_vector = e.search_vector
+FROM pricing_itemmarketdataevent e WHERE e.id = l.event_id AND e.time = l.time;
+
+DO $$
+DECLARE partition_name text;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'pricing_itemmarketdataevent'::regclass
+    LOOP
+        EXECUTE format(
+            'CREATE TRIGGER %I BEFORE INSERT OR UPDATE ON %I FOR EACH ROW '
+            'EXECUTE FUNCTION pricing_itemmarketdataevent_search_vector()',
+            partition_name || '_search_vector', partition_name
+        );
+    END LOOP;
+END $$;
+
+CREATE TRIGGER pricing_latestitemmarketdataevent_search_vector
+    BEFORE INSERT OR UPDATE ON pricing_latestitemmarketdataevent
+    FOR EACH ROW EXECUTE FUNCTION pricing_latestitemmarketdataevent_search_vector();
+
+CREATE TRIGGER pricing_event_unique_user_id_changed
+    AFTER UPDATE OF unique_user_id ON pricing_itemmarketdataevent
+    FOR EACH ROW WHEN (OLD.unique_user_id IS DISTINCT FROM NEW.unique_user_id)
+    EXECUTE FUNCTION pricing_event_unique_user_id_changed();
+
+CREATE TRIGGER pricing_item_search_vector_changed
+    AFTER UPDATE OF name, eve_echoes_market_id ON items_item
+    FOR EACH ROW WHEN (OLD.search_vector IS DISTINCT FROM NEW.search_vector)
+    EXECUTE FUNCTION pricing_item_search_vector_changed();
+"""
+
+# Dropping the trigger functions drops every trigger using them as well.
+DROP_SEARCH_VECTOR_SQL = """
+DROP FUNCTION pricing_item_search_vector_changed() CASCADE;
+DROP FUNCTION pricing_event_unique_user_id_changed() CASCADE;
+DROP FUNCTION pricing_latestitemmarketdataevent_search_vector() CASCADE;
+DROP FUNCTION pricing_itemmarketdataevent_search_vector() CASCADE;
+DROP FUNCTION pricing_market_data_search_vector(
+    integer, timestamp with time zone, text
+);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0012_item_search_vector"),
+        ("pricing", "0016_itemmarketdatarollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="itemmarketdataevent",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="latestitemmarketdataevent",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+        migrations.AddIndex(
+            model_name="itemmarketdataevent",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="pricing_event_search_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="latestitemmarketdataevent",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="pricing_latest_search_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.4 on 2021-08-22 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pricing", "0017_market_data_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="itemmarketdataevent",
+            index=models.Index(
+                fields=["price_list", "-time", "-id"], name="pricing_event_cursor_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="latestitemmarketdataevent",
+            index=models.Index(
+                fields=["price_list", "-time", "-id"], name="pricing_latest_cursor_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.1.4 on 2021-08-23 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0013_item_change_seq"),
+        ("pricing", "0018_market_data_cursor_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="latestitemmarketdataevent",
+            name="change_seq",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE pricing_latestitemmarketdataevent "
+            "SET change_seq = nextval('items_change_seq');",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="latestitemmarketdataevent",
+            index=models.Index(
+                fields=["price_list", "change_seq"], name="pricing_latest_change_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="LatestItemMarketDataEventTombstone",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("item_id", models.IntegerField()),
+                ("change_seq", models.BigIntegerField()),
+                (
+                    "price_list",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="pricing.dataset",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["price_list", "change_seq"],
+                        name="pricing_tombstone_change_idx",
+                    )
+                ],
+            },
+        ),
+    ]
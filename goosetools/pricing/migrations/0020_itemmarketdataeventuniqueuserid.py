@@ -0,0 +1,68 @@
+# Generated by Django 3.1.4 on 2021-08-24 19:40
+
+from django.db import migrations, models
+
+# Row triggers on the partitioned table are cloned onto every partition, including
+# ones attached later. Statements which skip row triggers, such as attaching,
+# detaching or truncating partitions, keep the ids up to date themselves.
+UNIQUE_USER_ID_SQL = """
+CREATE FUNCTION pricing_itemmarketdataevent_unique_user_id() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM pricing_itemmarketdataeventuniqueuserid
+        WHERE unique_user_id = OLD.unique_user_id AND event_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.unique_user_id IS NOT NULL THEN
+        INSERT INTO pricing_itemmarketdataeventuniqueuserid (unique_user_id, event_id)
+        VALUES (NEW.unique_user_id, NEW.id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+INSERT INTO pricing_itemmarketdataeventuniqueuserid (unique_user_id, event_id)
+SELECT DISTINCT ON (unique_user_id) unique_user_id, id
+FROM pricing_itemmarketdataevent
+WHERE unique_user_id IS NOT NULL
+ORDER BY unique_user_id, id;
+
+CREATE TRIGGER pricing_itemmarketdataevent_unique_user_id_insert
+    AFTER INSERT ON pricing_itemmarketdataevent
+    FOR EACH ROW WHEN (NEW.unique_user_id IS NOT NULL)
+    EXECUTE FUNCTION pricing_itemmarketdataevent_unique_user_id();
+
+CREATE TRIGGER pricing_itemmarketdataevent_unique_user_id_update
+    AFTER UPDATE OF unique_user_id ON pricing_itemmarketdataevent
+    FOR EACH ROW WHEN (OLD.unique_user_id IS DISTINCT FROM NEW.unique_user_id)
+    EXECUTE FUNCTION pricing_itemmarketdataevent_unique_user_id();
+
+CREATE TRIGGER pricing_itemmarketdataevent_unique_user_id_delete
+    AFTER DELETE ON pricing_itemmarketdataevent
+    FOR EACH ROW WHEN (OLD.unique_user_id IS NOT NULL)
+    EXECUTE FUNCTION pricing_itemmarketdataevent_unique_user_id();
+"""
+
+# Dropping the trigger function drops every trigger using it as well.
+DROP_UNIQUE_USER_ID_SQL = """
+DROP FUNCTION pricing_itemmarketdataevent_unique_user_id() CASCADE;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pricing", "0019_latest_change_seq"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemMarketDataEventUniqueUserId",
+            fields=[
+                (
+                    "unique_user_id",
+                    models.TextField(primary_key=True, serialize=False),
+                ),
+                ("event_id", models.IntegerField()),
+            ],
+        ),
+        migrations.RunSQL(UNIQUE_USER_ID_SQL, DROP_UNIQUE_USER_ID_SQL),
+    ]
@@ -1,9 +1,12 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
 
 from goosetools.items.models import Item
+from goosetools.pricing.constants import PRICE_TYPES, ROLLUP_PERIODS
 from goosetools.users.models import (
     BASIC_ACCESS,
     SHIP_PRICE_ADMIN,
@@ -46,6 +49,12 @@ class DataSet(models.Model):
 
     default = models.BooleanField(default=False)
     deletable = models.BooleanField(default=True)
+    retention_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="How many days of prices to keep, older prices are deleted apart "
+        "from each items latest price. Leave blank to keep them forever.",
+    )
 
     def get_absolute_url(self):
         return reverse("pricing:pricelist-detail", kwargs={"pk": self.pk})
@@ -151,10 +160,11 @@ class LatestDataPoint(models.Model):
 
 class ItemMarketDataEvent(models.Model):
     price_list = models.ForeignKey(DataSet, on_delete=models.CASCADE)
+    # Postgres only allows unique constraints on a partitioned table which include the
+    # partition key, so ItemMarketDataEventUniqueUserId makes this unique instead.
     unique_user_id = models.TextField(
         blank=True,
         null=True,
-        unique=True,
         help_text="An optional unique ID you want to give this price.",
     )
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
@@ -173,12 +183,37 @@ class ItemMarketDataEvent(models.Model):
         max_digits=20, decimal_places=2, null=True, blank=True
     )
     volume = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+    # The items search vector plus the time and unique id, kept up to date by triggers
+    # on each partition, see migration 0017.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def get_absolute_url(self):
         return reverse("pricing:event-detail", kwargs={"pk": self.pk})
 
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude)
+        if self.unique_user_id and (exclude is None or "unique_user_id" not in exclude):
+            if (
+                ItemMarketDataEventUniqueUserId.objects.filter(
+                    unique_user_id=self.unique_user_id
+                )
+                .exclude(event_id=self.pk)
+                .exists()
+            ):
+                raise ValidationError(
+                    {"unique_user_id": "A price with this unique ID already exists."}
+                )
+
     class Meta:
-        indexes = [models.Index(fields=["price_list", "-time", "item"])]
+        indexes = [
+            models.Index(fields=["price_list", "-time", "item"]),
+            models.Index(fields=["item", "price_list", "-time"]),
+            GinIndex(fields=["search_vector"], name="pricing_event_search_gin"),
+            # Serves MarketDataCursorPagination.
+            models.Index(
+                fields=["price_list", "-time", "-id"], name="pricing_event_cursor_idx"
+            ),
+        ]
         unique_together = [
             ["price_list", "unique_user_id", "item", "time"],
         ]
@@ -193,11 +228,91 @@ class LatestItemMarketDataEvent(models.Model):
     )
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     time = models.DateTimeField()
-    event = models.ForeignKey(ItemMarketDataEvent, on_delete=models.CASCADE)
+    # The event table is partitioned so its id alone cannot be referenced by a foreign
+    # key constraint.
+    event = models.ForeignKey(
+        ItemMarketDataEvent, on_delete=models.CASCADE, db_constraint=False
+    )
+    # A copy of the events search vector kept up to date by triggers.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set from items.models.CHANGE_SEQUENCE whenever refresh_latest_market_data
+    # inserts or changes the row.
+    change_seq = models.BigIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
-        indexes = [models.Index(fields=["price_list", "item", "time"])]
+        indexes = [
+            models.Index(fields=["price_list", "item", "time"]),
+            GinIndex(fields=["search_vector"], name="pricing_latest_search_gin"),
+            models.Index(
+                fields=["price_list", "-time", "-id"], name="pricing_latest_cursor_idx"
+            ),
+            models.Index(
+                fields=["price_list", "change_seq"], name="pricing_latest_change_idx"
+            ),
+        ]
         unique_together = ["price_list", "item"]
 
     def __str__(self):
         return f"Latest {str(self.event)}"
+
+
+class ItemMarketDataEventUniqueUserId(models.Model):
+    """
+    Every ItemMarketDataEvent unique_user_id in use, whose primary key makes them
+    unique across all the events partitions. Kept up to date by triggers on the
+    events, see migration 0020.
+    """
+
+    unique_user_id = models.TextField(primary_key=True)
+    event_id = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.unique_user_id} used by event {self.event_id}"
+
+
+class LatestItemMarketDataEventTombstone(models.Model):
+    """
+    Records refresh_latest_market_data removing an items latest price so clients
+    syncing latest prices by change_seq find out.
+    """
+
+    price_list = models.ForeignKey(DataSet, on_delete=models.CASCADE)
+    item_id = models.IntegerField()
+    change_seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["price_list", "change_seq"], name="pricing_tombstone_change_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"Latest price of {self.item_id} deleted @ {self.change_seq}"
+
+
+class ItemMarketDataRollup(models.Model):
+    """
+    The open, high, low and close of one price type of an item in a price list over an
+    hour or day starting at bucket (UTC). Maintained by refresh_market_data_rollups.
+    """
+
+    price_list = models.ForeignKey(DataSet, on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    price_type = models.TextField(choices=PRICE_TYPES)
+    period = models.TextField(choices=ROLLUP_PERIODS)
+    bucket = models.DateTimeField()
+    open = models.DecimalField(max_digits=20, decimal_places=2)
+    high = models.DecimalField(max_digits=20, decimal_places=2)
+    low = models.DecimalField(max_digits=20, decimal_places=2)
+    close = models.DecimalField(max_digits=20, decimal_places=2)
+    # Kept so averages over several buckets can be worked out exactly.
+    total = models.DecimalField(max_digits=30, decimal_places=2)
+    count = models.PositiveIntegerField()
+    volume = models.DecimalField(max_digits=30, decimal_places=2, null=True)
+
+    class Meta:
+        unique_together = [["price_list", "item", "price_type", "period", "bucket"]]
+
+    def __str__(self):
+        return f"{self.period} {self.price_type} of {self.item}@{self.bucket}"
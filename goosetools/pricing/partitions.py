@@ -0,0 +1,228 @@
+import re
+from datetime import date, datetime
+from typing import List, Optional, Set
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from goosetools.pricing.ingest import refresh_market_data_rollups
+from goosetools.pricing.models import DataSet
+
+EVENTS_TABLE = "pricing_itemmarketdataevent"
+UNIQUE_USER_IDS_TABLE = "pricing_itemmarketdataeventuniqueuserid"
+DEFAULT_PARTITION = f"{EVENTS_TABLE}_default"
+MONTH_PARTITION_RE = re.compile(rf"^{EVENTS_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{EVENTS_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def month_bounds(month: date):
+    start = timezone.make_aware(datetime(month.year, month.month, 1), timezone.utc)
+    next_month = add_months(month, 1)
+    end = timezone.make_aware(
+        datetime(next_month.year, next_month.month, 1), timezone.utc
+    )
+    return start, end
+
+
+def month_partitions() -> List[date]:
+    """
+    The months which currently have an attached partition in the current schema.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            [EVENTS_TABLE],
+        )
+        months = []
+        for (name,) in cursor.fetchall():
+            match = MONTH_PARTITION_RE.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+
+def months_in_default_partition() -> List[date]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT date_trunc('month', time AT TIME ZONE 'UTC')::date
+            FROM {DEFAULT_PARTITION}
+            ORDER BY 1
+            """
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_month_partition(month: date) -> int:
+    """
+    Creates and attaches the partition for a month, first moving any of that months
+    rows out of the default partition as Postgres will not attach a partition whose
+    range the default partition still holds rows for. The moved rows keep their search
+    vectors so the partitions search vector trigger is only added afterwards, and
+    their unique user ids, which deleting them from the default partition released,
+    are taken again. Returns the rows moved.
+    """
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {EVENTS_TABLE} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE time >= %s AND time < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        moved = cursor.rowcount
+        # The check constraint lets the attach skip scanning the new partition.
+        cursor.execute(
+            f"""
+            ALTER TABLE {name} ADD CONSTRAINT {name}_time_range
+            CHECK (time >= %s AND time < %s)
+            """,
+            [start, end],
+        )
+        cursor.execute(
+            f"""
+            ALTER TABLE {EVENTS_TABLE} ATTACH PARTITION {name}
+            FOR VALUES FROM (%s) TO (%s)
+            """,
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {name}_time_range")
+        # Postgres 12 can only have BEFORE row triggers on the partitions themselves.
+        cursor.execute(
+            f"""
+            CREATE TRIGGER {name}_search_vector BEFORE INSERT OR UPDATE ON {name}
+            FOR EACH ROW EXECUTE FUNCTION pricing_itemmarketdataevent_search_vector()
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {UNIQUE_USER_IDS_TABLE} (unique_user_id, event_id)
+            SELECT unique_user_id, id FROM {name} WHERE unique_user_id IS NOT NULL
+            """
+        )
+    return moved
+
+
+def ensure_month_partitions(months_ahead: int, now: Optional[datetime] = None):
+    """
+    Makes sure this month and the next `months_ahead` months have their own partition.
+    """
+    now = now or timezone.now()
+    existing = set(month_partitions())
+    created = []
+    this_month = month_start(now.astimezone(timezone.utc).date())
+    for i in range(months_ahead + 1):
+        month = add_months(this_month, i)
+        if month not in existing:
+            create_month_partition(month)
+            created.append(month)
+    return created
+
+
+def migrate_default_partition():
+    """
+    Moves every row in the default partition into its own monthly partition, one
+    month per transaction.
+    """
+    existing = set(month_partitions())
+    moved = {}
+    for month in months_in_default_partition():
+        if month in existing:
+            # Rows can only land in the default partition for a month without a
+            # partition, so this only happens if one was attached concurrently.
+            continue
+        moved[month] = create_month_partition(month)
+    return moved
+
+
+def delete_expired_events(price_list_id: int, retention_days: int) -> int:
+    """
+    Deletes a price lists events older than its retention, apart from any which are
+    still the latest event for their item, then rebuilds the rollups up to the cutoff
+    from what is left so they do not outlive the events.
+    """
+    cutoff = timezone.now() - timezone.timedelta(days=retention_days)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {EVENTS_TABLE} e
+            WHERE e.price_list_id = %s AND e.time < %s
+                AND NOT EXISTS (
+                    SELECT 1 FROM pricing_latestitemmarketdataevent l
+                    WHERE l.event_id = e.id
+                )
+            """,
+            [price_list_id, cutoff],
+        )
+        deleted = cursor.rowcount
+    refresh_market_data_rollups([price_list_id], until=cutoff)
+    return deleted
+
+
+def expired_month_partitions(max_retention_days: int) -> List[date]:
+    cutoff = timezone.now() - timezone.timedelta(days=max_retention_days)
+    expired = []
+    for month in month_partitions():
+        _, end = month_bounds(month)
+        if end <= cutoff:
+            expired.append(month)
+    return expired
+
+
+def remove_month_partition(month: date, drop: bool) -> Set:
+    """
+    Detaches, or if drop is set drops, a months partition, releasing its unique user
+    ids and rebuilding that months rollups without it. Any latest event rows left pointing at a removed event are
+    returned as (price_list_id, item_id) so they can be refreshed.
+    """
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT l.price_list_id, l.item_id
+            FROM pricing_latestitemmarketdataevent l
+            JOIN {name} e ON e.id = l.event_id
+            """
+        )
+        orphaned = set(cursor.fetchall())
+        cursor.execute(
+            f"""
+            DELETE FROM {UNIQUE_USER_IDS_TABLE} u
+            USING {name} e
+            WHERE u.unique_user_id = e.unique_user_id AND u.event_id = e.id
+            """
+        )
+        cursor.execute(f"ALTER TABLE {EVENTS_TABLE} DETACH PARTITION {name}")
+        if drop:
+            cursor.execute(f"DROP TABLE {name}")
+        refresh_market_data_rollups(
+            list(DataSet.objects.values_list("id", flat=True)),
+            since=start,
+            until=end - timezone.timedelta(microseconds=1),
+        )
+    return orphaned
@@ -1,33 +1,25 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from goosetools.pricing.models import ItemMarketDataEvent, LatestItemMarketDataEvent
+from goosetools.pricing.ingest import (
+    refresh_latest_market_data,
+    refresh_market_data_rollups,
+)
+from goosetools.pricing.models import DataPoint, ItemMarketDataEvent, LatestDataPoint
 
 
+# Bulk ingests write events with raw SQL and so skip this receiver, refreshing the
+# latest events and rollups for each price list once they are done instead.
 # noinspection PyUnusedLocal
 # pylint: disable=unused-argument
 @receiver(post_save, sender=ItemMarketDataEvent)
 def new_market_data(sender, instance, **kwargs):
-    try:
-        existing = LatestItemMarketDataEvent.objects.get(
-            price_list=instance.price_list, item=instance.item
-        )
-    except LatestItemMarketDataEvent.DoesNotExist:
-        existing = None
-
-    if (
-        existing is None
-        or existing.time < instance.time
-        or instance.manual_override_price
-    ):
-        LatestItemMarketDataEvent.objects.update_or_create(
-            price_list=instance.price_list,
-            item=instance.item,
-            defaults={
-                "time": instance.time,
-                "event": instance,
-            },
-        )
+    refresh_latest_market_data(
+        instance.price_list_id, [instance.item_id], [instance.id]
+    )
+    refresh_market_data_rollups(
+        [instance.price_list_id], [instance.item_id], instance.time, instance.time
+    )
 
 
 # noinspection PyUnusedLocal
@@ -36,21 +28,17 @@ def new_market_data(sender, instance, **kwargs):
 def new_data_point(sender, instance, **kwargs):
     try:
         existing = LatestDataPoint.objects.get(
-            data_set=instance.data_set, data_type=instance.item
+            data_set=instance.data_set, data_type=instance.data_type
         )
-    except LatestItemMarketDataEvent.DoesNotExist:
+    except LatestDataPoint.DoesNotExist:
         existing = None
 
-    if (
-        existing is None
-        or existing.time < instance.time
-        or instance.manual_override_price
-    ):
-        LatestItemMarketDataEvent.objects.update_or_create(
-            price_list=instance.price_list,
-            item=instance.item,
+    if existing is None or existing.point.time <= instance.time:
+        LatestDataPoint.objects.update_or_create(
+            data_set=instance.data_set,
+            data_type=instance.data_type,
             defaults={
-                "time": instance.time,
-                "event": instance,
+                "item": instance.item,
+                "point": instance,
             },
         )
@@ -0,0 +1,74 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.urls import reverse
+from django.utils import timezone
+
+from goosetools.pricing.models import DataSet, ItemMarketDataEvent
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class MarketDataCursorPaginationTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+        start = timezone.make_aware(timezone.datetime(2021, 8, 1), timezone.utc)
+        # Two events share each time so pages have to split ties on id.
+        self.events = [
+            ItemMarketDataEvent.objects.create(
+                price_list=self.price_list,
+                item=item,
+                time=start + timezone.timedelta(hours=hour),
+                sell=1,
+            )
+            for hour in range(3)
+            for item in (self.item, self.another_item)
+        ]
+
+    def follow(self, link):
+        cursor = parse_qs(urlparse(link).query)["cursor"][0]
+        return self.client.get(
+            reverse("pricing:itemmarketdataevent-list"),
+            {"from_date": "2021-07-01", "page_size": 4, "cursor": cursor},
+        )
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_cursor_pages_walk_forwards_and_back_without_offsets(self):
+        newest_first = [
+            e.id
+            for e in sorted(self.events, key=lambda e: (e.time, e.id), reverse=True)
+        ]
+
+        first = self.client.get(
+            reverse("pricing:itemmarketdataevent-list"),
+            {"from_date": "2021-07-01", "page_size": 4},
+        )
+        self.assertEqual(self.ids(first), newest_first[:4])
+        self.assertIsNone(first.data["previous"])
+
+        second = self.follow(first.data["next"])
+        self.assertEqual(self.ids(second), newest_first[4:])
+        self.assertIsNone(second.data["next"])
+
+        back = self.follow(second.data["previous"])
+        self.assertEqual(self.ids(back), newest_first[:4])
+        self.assertIsNone(back.data["previous"])
+
+    def test_oldest_first_ordering_and_invalid_cursors(self):
+        response = self.client.get(
+            reverse("pricing:itemmarketdataevent-list"),
+            {"from_date": "2021-07-01", "ordering": "time", "page_size": 10},
+        )
+        self.assertEqual(
+            self.ids(response),
+            [e.id for e in sorted(self.events, key=lambda e: (e.time, e.id))],
+        )
+
+        response = self.client.get(
+            reverse("pricing:itemmarketdataevent-list"),
+            {"from_date": "2021-07-01", "cursor": "not a cursor"},
+        )
+        self.assertEqual(response.status_code, 404)
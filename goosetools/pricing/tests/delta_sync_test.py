@@ -0,0 +1,162 @@
+import threading
+from unittest.mock import patch
+
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from goosetools.global_items.models import GlobalMarketDataBatch, GlobalMarketDataPoint
+from goosetools.items.models import (
+    ItemChangeProposal,
+    committed_change_seq,
+    next_change_seq,
+)
+from goosetools.pricing.ingest import (
+    apply_staged_market_data,
+    refresh_latest_market_data,
+)
+from goosetools.pricing.models import DataSet, ItemMarketDataEvent
+from goosetools.pricing.viewsets import LatestItemMarketDataEventViewSet
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class DeltaSyncTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+
+    def event(self, item, hours_ago=0):
+        return ItemMarketDataEvent.objects.create(
+            price_list=self.price_list,
+            item=item,
+            time=timezone.now() - timezone.timedelta(hours=hours_ago),
+            sell=1,
+        )
+
+    def poll(self, url_name, since):
+        response = self.client.get(reverse(url_name), {"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_latest_prices_since_a_token_include_changes_and_removals(self):
+        self.event(self.item)
+        condor = self.event(self.another_item)
+
+        first = self.poll("pricing:latestitemmarketdataevent-list", 0)
+        self.assertEqual(len(first["changed"]), 2)
+        self.assertFalse(first["more"])
+
+        unchanged = self.poll("pricing:latestitemmarketdataevent-list", first["token"])
+        self.assertEqual(unchanged["changed"], [])
+        self.assertEqual(unchanged["deleted"], [])
+        self.assertEqual(unchanged["token"], first["token"])
+
+        newer = self.event(self.item)
+        ItemMarketDataEvent.objects.filter(id=condor.id).delete()
+        refresh_latest_market_data(self.price_list.id)
+
+        delta = self.poll("pricing:latestitemmarketdataevent-list", first["token"])
+        self.assertEqual([row["event"]["id"] for row in delta["changed"]], [newer.id])
+        self.assertEqual(delta["deleted"], [self.another_item.id])
+        self.assertGreater(int(delta["token"]), int(first["token"]))
+
+    def test_approved_item_changes_are_synced_with_tombstones_for_deletes(self):
+        token = self.poll("item-list", 0)["token"]
+
+        ItemChangeProposal.objects.create(
+            change="update", existing_item=self.item, name="Pyerite"
+        ).approve(self.user)
+        ItemChangeProposal.objects.create(
+            change="delete", existing_item=self.another_item
+        ).approve(self.user)
+
+        delta = self.poll("item-list", token)
+        self.assertEqual([row["name"] for row in delta["changed"]], ["Pyerite"])
+        self.assertEqual(delta["deleted"], [self.another_item.id])
+
+    def test_a_poll_cut_short_hands_back_a_token_to_carry_on_from(self):
+        self.event(self.item)
+        self.event(self.another_item)
+
+        with patch.object(LatestItemMarketDataEventViewSet, "delta_limit", 1):
+            first = self.poll("pricing:latestitemmarketdataevent-list", 0)
+            second = self.poll("pricing:latestitemmarketdataevent-list", first["token"])
+
+        self.assertTrue(first["more"])
+        self.assertEqual(len(first["changed"]), 1)
+        self.assertEqual(len(second["changed"]), 1)
+        self.assertNotEqual(first["changed"], second["changed"])
+
+    def test_a_removal_and_re_add_between_polls_only_returns_the_re_add(self):
+        old = self.event(self.item)
+        token = self.poll("pricing:latestitemmarketdataevent-list", 0)["token"]
+
+        ItemMarketDataEvent.objects.filter(id=old.id).delete()
+        refresh_latest_market_data(self.price_list.id)
+        newer = self.event(self.item)
+
+        delta = self.poll("pricing:latestitemmarketdataevent-list", token)
+        self.assertEqual([row["event"]["id"] for row in delta["changed"]], [newer.id])
+        self.assertEqual(delta["deleted"], [])
+
+    def test_change_seqs_being_handed_out_are_not_committed_to_other_connections(self):
+        next_change_seq()
+        self.assertIsNotNone(committed_change_seq())
+
+        seen_elsewhere = []
+
+        def poll_elsewhere():
+            try:
+                connection.set_tenant(self.tenant)
+                seen_elsewhere.append(committed_change_seq())
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=poll_elsewhere)
+        thread.start()
+        thread.join()
+        self.assertEqual(seen_elsewhere, [None])
+
+    def test_polls_return_nothing_new_while_changes_are_being_written(self):
+        self.event(self.item)
+        token = self.poll("pricing:latestitemmarketdataevent-list", 0)["token"]
+        self.event(self.another_item)
+
+        with patch(
+            "goosetools.core.delta_sync.committed_change_seq", return_value=None
+        ):
+            delta = self.poll("pricing:latestitemmarketdataevent-list", token)
+
+        self.assertEqual(delta["changed"], [])
+        self.assertEqual(delta["token"], token)
+        self.assertEqual(
+            len(self.poll("pricing:latestitemmarketdataevent-list", token)["changed"]),
+            1,
+        )
+
+    def test_editing_the_latest_event_in_place_is_synced(self):
+        latest = self.event(self.item)
+        token = self.poll("pricing:latestitemmarketdataevent-list", 0)["token"]
+
+        latest.sell = 5
+        latest.save()
+
+        delta = self.poll("pricing:latestitemmarketdataevent-list", token)
+        self.assertEqual([row["event"]["id"] for row in delta["changed"]], [latest.id])
+
+    def test_re_ingesting_the_latest_event_with_new_prices_is_synced(self):
+        self.item.eve_echoes_market_id = "1"
+        self.item.save()
+        latest = self.event(self.item)
+        token = self.poll("pricing:latestitemmarketdataevent-list", 0)["token"]
+
+        batch = GlobalMarketDataBatch.start("test")
+        GlobalMarketDataPoint.objects.create(
+            batch=batch, eve_echoes_market_id="1", time=latest.time, sell=5
+        )
+        apply_staged_market_data(batch.id, [self.price_list.id], ["sell"])
+
+        delta = self.poll("pricing:latestitemmarketdataevent-list", token)
+        self.assertEqual([row["event"]["id"] for row in delta["changed"]], [latest.id])
+        self.assertEqual(ItemMarketDataEvent.objects.get(id=latest.id).sell, 5)
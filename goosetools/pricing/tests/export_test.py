@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from goosetools.pricing.models import DataSet, ItemMarketDataEvent
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class MarketDataExportTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+        self.time = timezone.make_aware(timezone.datetime(2021, 8, 1), timezone.utc)
+        for hour, item in enumerate([self.item, self.another_item, self.item]):
+            ItemMarketDataEvent.objects.create(
+                price_list=self.price_list,
+                item=item,
+                time=self.time + timezone.timedelta(hours=hour),
+                sell="1000.25",
+            )
+
+    def export(self, **params):
+        response = self.client.get(reverse("pricing:market_data_export"), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv_export_streams_the_filtered_events_oldest_first(self):
+        rows = list(
+            csv.DictReader(
+                io.StringIO(
+                    self.export(items=str(self.item.id), from_date="2021-08-01 01:00")
+                )
+            )
+        )
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["item_name"], "Tritanium")
+        self.assertEqual(rows[0]["sell"], "1000.25")
+
+    def test_ndjson_export_keeps_decimals_exact(self):
+        lines = self.export(format="ndjson").splitlines()
+
+        self.assertEqual(
+            [json.loads(line)["item_name"] for line in lines],
+            ["Tritanium", "Condor", "Tritanium"],
+        )
+        self.assertEqual(json.loads(lines[0])["sell"], "1000.25")
+
+    def test_exporting_a_price_list_you_cannot_view_is_denied(self):
+        hidden = DataSet.objects.create(name="hidden", api_type="manual")
+
+        response = self.client.get(
+            reverse("pricing:market_data_export"), {"pricelist_id": hidden.id}
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_dates_with_an_offset_are_accepted(self):
+        rows = list(
+            csv.DictReader(io.StringIO(self.export(from_date="2021-08-01T01:00:00Z")))
+        )
+
+        self.assertEqual([row["item_name"] for row in rows], ["Condor", "Tritanium"])
+
+    def test_the_command_exports_from_a_date_with_an_offset(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.csv")
+            call_command(
+                "export_market_data",
+                self.tenant.schema_name,
+                "--from_date=2021-08-01T02:00:00+00:00",
+                f"--output={path}",
+            )
+            with open(path, newline="") as output:
+                rows = list(csv.DictReader(output))
+
+        self.assertEqual([row["item_name"] for row in rows], ["Tritanium"])
+
+    def test_the_command_rejects_dates_it_cannot_parse(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "export_market_data", self.tenant.schema_name, "--from_date=never"
+            )
@@ -0,0 +1,147 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from goosetools.pricing.ingest import refresh_latest_market_data
+from goosetools.pricing.models import (
+    DataSet,
+    ItemMarketDataEvent,
+    ItemMarketDataEventUniqueUserId,
+    ItemMarketDataRollup,
+    LatestItemMarketDataEvent,
+)
+from goosetools.pricing.partitions import (
+    create_month_partition,
+    delete_expired_events,
+    month_partitions,
+    months_in_default_partition,
+    remove_month_partition,
+)
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class MarketDataPartitionsTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+
+    def event(self, time, item=None, **kwargs):
+        return ItemMarketDataEvent.objects.create(
+            price_list=self.price_list,
+            item=item or self.item,
+            time=time,
+            lowest_sell=1,
+            **kwargs,
+        )
+
+    def test_creating_a_month_partition_moves_its_rows_out_of_the_default(self):
+        january = timezone.make_aware(timezone.datetime(2015, 1, 10), timezone.utc)
+        february = timezone.make_aware(timezone.datetime(2015, 2, 10), timezone.utc)
+        self.event(january)
+        self.event(february)
+        self.assertEqual(
+            months_in_default_partition(), [date(2015, 1, 1), date(2015, 2, 1)]
+        )
+
+        moved = create_month_partition(date(2015, 1, 1))
+
+        self.assertEqual(moved, 1)
+        self.assertIn(date(2015, 1, 1), month_partitions())
+        self.assertEqual(months_in_default_partition(), [date(2015, 2, 1)])
+        self.assertEqual(ItemMarketDataEvent.objects.count(), 2)
+
+    def test_expired_events_are_deleted_apart_from_the_latest(self):
+        old = timezone.now() - timezone.timedelta(days=30)
+        self.event(old - timezone.timedelta(days=1))
+        latest = self.event(old)
+        another_item_event = self.event(old, item=self.another_item)
+        refresh_latest_market_data(self.price_list.id)
+
+        deleted = delete_expired_events(self.price_list.id, 7)
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(
+            set(ItemMarketDataEvent.objects.values_list("id", flat=True)),
+            {latest.id, another_item_event.id},
+        )
+        self.assertEqual(LatestItemMarketDataEvent.objects.count(), 2)
+
+    def test_expired_events_are_removed_from_the_rollups(self):
+        old = timezone.now() - timezone.timedelta(days=30)
+        self.event(old - timezone.timedelta(days=2), item=self.another_item)
+        self.event(old - timezone.timedelta(days=1))
+        latest = self.event(old)
+        refresh_latest_market_data(self.price_list.id)
+
+        delete_expired_events(self.price_list.id, 7)
+
+        self.assertEqual(
+            set(
+                ItemMarketDataRollup.objects.filter(
+                    price_type="lowest_sell", period="day"
+                ).values_list("item_id", "bucket__date")
+            ),
+            {
+                (self.another_item.id, (old - timezone.timedelta(days=2)).date()),
+                (self.item.id, latest.time.date()),
+            },
+        )
+
+    def test_removing_a_month_partition_removes_its_rollups(self):
+        january = timezone.make_aware(timezone.datetime(2015, 1, 10), timezone.utc)
+        february = timezone.make_aware(timezone.datetime(2015, 2, 10), timezone.utc)
+        self.event(january, item=self.another_item)
+        self.event(february, item=self.another_item)
+        create_month_partition(date(2015, 1, 1))
+
+        remove_month_partition(date(2015, 1, 1), drop=True)
+
+        self.assertEqual(
+            list(
+                ItemMarketDataRollup.objects.filter(period="day").values_list(
+                    "bucket", flat=True
+                )
+            ),
+            [february],
+        )
+
+    def test_unique_user_id_is_still_validated(self):
+        self.event(timezone.now(), unique_user_id="abc")
+        duplicate = ItemMarketDataEvent(
+            price_list=self.price_list,
+            item=self.another_item,
+            time=timezone.now(),
+            unique_user_id="abc",
+        )
+        with self.assertRaises(ValidationError):
+            duplicate.validate_unique()
+
+    def test_unique_user_id_is_unique_in_the_database_across_partitions(self):
+        january = timezone.make_aware(timezone.datetime(2015, 1, 10), timezone.utc)
+        self.event(january, unique_user_id="abc")
+        create_month_partition(date(2015, 1, 1))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ItemMarketDataEvent.objects.bulk_create(
+                [
+                    ItemMarketDataEvent(
+                        price_list=self.price_list,
+                        item=self.another_item,
+                        time=timezone.now(),
+                        unique_user_id="abc",
+                    )
+                ]
+            )
+
+    def test_removing_a_month_partition_frees_its_unique_user_ids(self):
+        january = timezone.make_aware(timezone.datetime(2015, 1, 10), timezone.utc)
+        self.event(january, unique_user_id="abc")
+        create_month_partition(date(2015, 1, 1))
+
+        remove_month_partition(date(2015, 1, 1), drop=True)
+
+        self.assertFalse(ItemMarketDataEventUniqueUserId.objects.exists())
+        self.event(timezone.now(), unique_user_id="abc")
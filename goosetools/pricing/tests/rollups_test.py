@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+from django.utils import timezone
+
+from goosetools.items.models import calc_estimate_prices
+from goosetools.pricing.ingest import refresh_market_data_rollups
+from goosetools.pricing.models import DataSet, ItemMarketDataEvent, ItemMarketDataRollup
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+class MarketDataRollupsTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+        self.hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def event(self, time, lowest_sell, volume=1, item=None):
+        return ItemMarketDataEvent.objects.create(
+            price_list=self.price_list,
+            item=item or self.item,
+            time=time,
+            lowest_sell=lowest_sell,
+            volume=volume,
+        )
+
+    def test_saving_events_keeps_the_hourly_and_daily_rollups_up_to_date(self):
+        earlier = self.hour - timezone.timedelta(hours=3)
+        self.event(earlier + timezone.timedelta(minutes=10), 5)
+        self.event(earlier + timezone.timedelta(minutes=20), 9)
+        self.event(earlier + timezone.timedelta(minutes=30), 2)
+        self.event(earlier + timezone.timedelta(minutes=40), 4)
+
+        hourly = ItemMarketDataRollup.objects.get(
+            price_list=self.price_list,
+            item=self.item,
+            price_type="lowest_sell",
+            period="hour",
+            bucket=earlier,
+        )
+        self.assertEqual(
+            (hourly.open, hourly.high, hourly.low, hourly.close),
+            (Decimal(5), Decimal(9), Decimal(2), Decimal(4)),
+        )
+        self.assertEqual(hourly.total, Decimal(20))
+        self.assertEqual(hourly.count, 4)
+        self.assertEqual(hourly.volume, Decimal(4))
+        self.assertTrue(
+            ItemMarketDataRollup.objects.filter(
+                period="day", price_type="lowest_sell", item=self.item
+            ).exists()
+        )
+        self.assertFalse(
+            ItemMarketDataRollup.objects.filter(price_type="sell").exists()
+        )
+
+    def test_refreshing_removes_buckets_whose_events_are_gone(self):
+        event = self.event(self.hour - timezone.timedelta(hours=2), 5)
+        ItemMarketDataEvent.objects.filter(id=event.id).delete()
+
+        refresh_market_data_rollups(
+            [self.price_list.id], [self.item.id], event.time, event.time
+        )
+
+        self.assertFalse(ItemMarketDataRollup.objects.exists())
+
+    def test_estimate_price_combines_rollups_and_raw_events(self):
+        now = timezone.now()
+        self.event(now - timezone.timedelta(hours=30), 1000)
+        self.event(now - timezone.timedelta(hours=23, minutes=59), 10)
+        self.event(now - timezone.timedelta(hours=5), 20)
+        self.event(now - timezone.timedelta(minutes=1), 60)
+
+        self.assertEqual(
+            self.item.calc_estimate_price(24, self.price_list, "lowest_sell", "min"),
+            (Decimal(10), 3),
+        )
+        self.assertEqual(
+            self.item.calc_estimate_price(24, self.price_list, "lowest_sell", "max"),
+            (Decimal(60), 3),
+        )
+        self.assertEqual(
+            self.item.calc_estimate_price(
+                24, self.price_list, "lowest_sell", "average"
+            ),
+            (Decimal(30), 3),
+        )
+        self.assertEqual(
+            self.item.calc_estimate_price(24, self.price_list, "sell", "average"),
+            (None, 0),
+        )
+
+    def test_estimating_many_items_at_once_matches_estimating_each(self):
+        now = timezone.now()
+        self.event(now - timezone.timedelta(hours=3), 10)
+        self.event(now - timezone.timedelta(hours=2), 30)
+        self.event(now - timezone.timedelta(hours=1), 7, item=self.another_item)
+        item_ids = [self.item.id, self.another_item.id, self.another_item.id + 1000]
+
+        for method in ["min", "max", "average"]:
+            estimates = calc_estimate_prices(
+                item_ids, 24, self.price_list, "lowest_sell", method
+            )
+            self.assertEqual(
+                estimates[self.item.id],
+                self.item.calc_estimate_price(
+                    24, self.price_list, "lowest_sell", method
+                ),
+            )
+            self.assertEqual(estimates[self.another_item.id], (Decimal(7), 1))
+            self.assertEqual(estimates[self.another_item.id + 1000], (None, 0))
+
+        latest = calc_estimate_prices(
+            item_ids, 24, self.price_list, "lowest_sell", "latest"
+        )
+        self.assertEqual(
+            latest,
+            {
+                self.item.id: (Decimal(30), 1),
+                self.another_item.id: (Decimal(7), 1),
+                self.another_item.id + 1000: (None, 0),
+            },
+        )
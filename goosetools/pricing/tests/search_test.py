@@ -0,0 +1,86 @@
+from django.contrib.postgres.search import SearchQuery
+from django.urls import reverse
+from django.utils import timezone
+
+from goosetools.pricing.ingest import refresh_latest_market_data
+from goosetools.pricing.models import (
+    DataSet,
+    ItemMarketDataEvent,
+    LatestItemMarketDataEvent,
+)
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+
+
+def search(term):
+    return SearchQuery(term, config="english", search_type="websearch")
+
+
+class MarketDataSearchTestCase(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        DataSet.ensure_default_exists()
+        self.price_list = DataSet.get_default()
+        self.time = timezone.make_aware(timezone.datetime(2021, 8, 1), timezone.utc)
+
+    def event(self, item, **kwargs):
+        return ItemMarketDataEvent.objects.create(
+            price_list=self.price_list, item=item, time=self.time, sell=1, **kwargs
+        )
+
+    def test_search_vectors_follow_the_event_and_its_item(self):
+        event = self.event(self.item, unique_user_id="firstbatch")
+        self.event(self.another_item)
+        refresh_latest_market_data(self.price_list.id)
+
+        self.assertEqual(
+            list(
+                ItemMarketDataEvent.objects.filter(
+                    search_vector=search("tritanium")
+                ).values_list("id", flat=True)
+            ),
+            [event.id],
+        )
+        self.assertEqual(
+            LatestItemMarketDataEvent.objects.get(
+                search_vector=search("firstbatch")
+            ).event_id,
+            event.id,
+        )
+
+        self.item.name = "Pyerite"
+        self.item.save()
+        ItemMarketDataEvent.objects.filter(id=event.id).update(
+            unique_user_id="secondbatch"
+        )
+
+        self.assertTrue(
+            ItemMarketDataEvent.objects.filter(
+                id=event.id, search_vector=search("pyerite secondbatch")
+            ).exists()
+        )
+        self.assertEqual(
+            LatestItemMarketDataEvent.objects.get(
+                search_vector=search("pyerite secondbatch")
+            ).event_id,
+            event.id,
+        )
+        self.assertFalse(
+            LatestItemMarketDataEvent.objects.filter(
+                search_vector=search("tritanium")
+            ).exists()
+        )
+
+    def test_datatables_search_counts_total_and_filtered_rows(self):
+        self.event(self.item)
+        self.event(self.another_item)
+
+        response = self.client.get(
+            reverse("pricing:itemmarketdataevent-list"),
+            {"from_date": "2021-07-01", "search[value]": "condor", "draw": 3},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["recordsTotal"], 2)
+        self.assertEqual(response.data["recordsFiltered"], 1)
+        self.assertEqual(response.data["draw"], 3)
+        self.assertEqual(len(response.data["data"]), 1)
@@ -11,6 +11,7 @@ from goosetools.pricing.views import (
     PriceListDeleteView,
     PriceListDetailView,
     PriceListUpdateView,
+    market_data_export,
     pricing_dashboard,
     pricing_data_dashboard,
 )
@@ -31,6 +32,7 @@ app_name = "pricing"
 urlpatterns = [
     path("api/", include(router.urls)),
     path("pricing_dashboard/", pricing_dashboard, name="pricing_dashboard"),
+    path("export/", market_data_export, name="market_data_export"),
     path(
         "pricing_data_dashboard/", pricing_data_dashboard, name="pricing_data_dashboard"
     ),
@@ -1,12 +1,23 @@
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import SuspiciousOperation
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views.generic import CreateView, DeleteView, DetailView, UpdateView
 
 from goosetools.industry.cron.lookup_ship_prices import import_price_list
+from goosetools.pricing.export import (
+    EXPORT_FORMATS,
+    ExportFormatUnavailable,
+    market_data_rows,
+    parse_export_date,
+)
 from goosetools.pricing.forms import EventForm, PriceListForm
+from goosetools.pricing.ingest import (
+    refresh_latest_market_data,
+    refresh_market_data_rollups,
+)
 from goosetools.pricing.models import DataSet, ItemMarketDataEvent
 from goosetools.utils import PassRequestToFormViewMixin
 
@@ -59,6 +70,48 @@ def pricing_data_dashboard(request):
     )
 
 
+def market_data_export(request):
+    """
+    Streams the market data events of a price list as CSV, NDJSON or Parquet, filtered
+    by `items` (comma separated item ids), `from_date` and `to_date`.
+    """
+    pricelist_id = request.GET.get("pricelist_id", None)
+    if pricelist_id is not None:
+        pricelist = get_object_or_404(DataSet, pk=pricelist_id)
+    else:
+        pricelist = DataSet.objects.get(default=True)
+    pricelist.access_controller.can_view(request.gooseuser, strict=True)
+
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Unknown export format {export_format}.")
+    content_type, extension, to_chunks = EXPORT_FORMATS[export_format]
+    try:
+        item_ids = request.GET.get("items", None)
+        if item_ids is not None:
+            item_ids = [int(item_id) for item_id in item_ids.split(",")]
+        from_date = request.GET.get("from_date", None)
+        if from_date:
+            from_date = parse_export_date(from_date)
+        to_date = request.GET.get("to_date", None)
+        if to_date:
+            to_date = parse_export_date(to_date)
+    except ValueError as e:
+        return HttpResponseBadRequest(f"Invalid export filter: {e}")
+
+    try:
+        chunks = to_chunks(
+            market_data_rows(pricelist, item_ids, from_date or None, to_date or None)
+        )
+    except ExportFormatUnavailable as e:
+        return HttpResponseBadRequest(str(e))
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response[
+        "Content-Disposition"
+    ] = f'attachment; filename="market_data_{pricelist.id}.{extension}"'
+    return response
+
+
 def pricing_dashboard(request):
     return render(
         request,
@@ -156,6 +209,15 @@ class EventDeleteView(DeleteView):
         )
         return context
 
+    def delete(self, request, *args, **kwargs):
+        response = super().delete(request, *args, **kwargs)
+        event = self.object
+        refresh_latest_market_data(event.price_list_id, [event.item_id])
+        refresh_market_data_rollups(
+            [event.price_list_id], [event.item_id], event.time, event.time
+        )
+        return response
+
 
 class EventCreateView(SuccessMessageMixin, PassRequestToFormViewMixin, CreateView):
     model = ItemMarketDataEvent
@@ -1,21 +1,35 @@
+import hashlib
 import re
+from base64 import b64decode, b64encode
 from collections import OrderedDict
+from urllib.parse import parse_qs, urlencode
 
 from dateutil.parser import parse
-from django.contrib.postgres.search import SearchQuery, SearchVector
-from django.db.models import F, TextField
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.db.models import F, Q, TextField
 from django.forms import CharField
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import mixins
-from rest_framework.exceptions import PermissionDenied, ValidationError
-from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    PageNumberPagination,
+)
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.viewsets import GenericViewSet
 
+from goosetools.core.delta_sync import DeltaSyncMixin
+from goosetools.items.models import ItemTombstone
 from goosetools.pricing.models import (
     DataSet,
     ItemMarketDataEvent,
     LatestItemMarketDataEvent,
+    LatestItemMarketDataEventTombstone,
 )
 from goosetools.pricing.serializers import (
     ItemMarketDataEventSerializer,
@@ -23,6 +37,23 @@ from goosetools.pricing.serializers import (
     PriceListSerializer,
 )
 from goosetools.users.models import BASIC_ACCESS, HasGooseToolsPerm
+from goosetools.utils import estimated_count, tenant_cache_key
+
+
+def cached_count(queryset, exact_below):
+    """
+    Counts a queryset with estimated_count, caching the count for
+    MARKET_DATA_COUNT_CACHE_SECONDS under its SQL so each DataTables draw with the
+    same price list, dates and search term reuses it.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+    key = tenant_cache_key("datatables_count", digest)
+    count = cache.get(key)
+    if count is None:
+        count, _ = estimated_count(queryset, exact_below)
+        cache.set(key, count, settings.MARKET_DATA_COUNT_CACHE_SECONDS)
+    return count
 
 
 class DataTablesServerSidePagination(LimitOffsetPagination):
@@ -30,14 +61,22 @@ class DataTablesServerSidePagination(LimitOffsetPagination):
     default_limit = 50
     limit_query_param = "length"
     pre_filtered_count = None
+    # Above this many rows the totals shown are Postgres's estimates.
+    exact_count_below = 10000
+
+    def get_count(self, queryset):
+        return cached_count(queryset, self.exact_count_below)
 
     def paginate_queryset(self, queryset, request, view=None):
         self.pre_filtered_count = self.get_count(queryset)
         search_term = request.GET.get("search[value]", False)
-        if search_term and view and hasattr(view, "searchable_fields"):
-            search_vector = SearchVector(*view.searchable_fields)
-            queryset = queryset.annotate(search=search_vector).filter(
-                search=SearchQuery(search_term, search_type="websearch")
+        if search_term and view and hasattr(view, "search_vector_field"):
+            queryset = queryset.filter(
+                **{
+                    view.search_vector_field: SearchQuery(
+                        search_term, config="english", search_type="websearch"
+                    )
+                }
             )
         if view and hasattr(view, "orderable_fields"):
             orders = []
@@ -75,17 +114,131 @@ class DataTablesServerSidePagination(LimitOffsetPagination):
         )
 
 
+class MarketDataCursorPagination(BasePagination):
+    """
+    Pages by seeking from the (time, id) of the row either side of the page instead
+    of an offset, so every page costs one index scan of page_size rows however deep
+    it is. `ordering` is "-time", the default, or "time" and the next and previous
+    links carry opaque cursors.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    base_url = None
+    page = None
+    descending = True
+    has_next = False
+    has_previous = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.descending = request.query_params.get("ordering", "-time") != "time"
+        cursor = self.decode_cursor(request)
+        backwards = cursor is not None and cursor[2]
+
+        # Walking backwards reads the rows before the cursor in the opposite order.
+        newest_first = self.descending != backwards
+        if cursor is not None:
+            time, pk, _ = cursor
+            if newest_first:
+                queryset = queryset.filter(Q(time__lt=time) | Q(time=time, id__lt=pk))
+            else:
+                queryset = queryset.filter(Q(time__gt=time) | Q(time=time, id__gt=pk))
+        order = ("-time", "-id") if newest_first else ("time", "id")
+        page = list(queryset.order_by(*order)[: self.page_size + 1])
+        has_more = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        if backwards:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = parse_qs(b64decode(encoded.encode("ascii")).decode("ascii"))
+            time = parse_datetime(position["t"][0])
+            pk = int(position["i"][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if time is None:
+            raise NotFound(self.invalid_cursor_message)
+        return time, pk, "r" in position
+
+    def encode_cursor(self, row, backwards):
+        position = {"t": row.time.isoformat(), "i": row.id}
+        if backwards:
+            position["r"] = 1
+        encoded = b64encode(urlencode(position).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class MarketDataPaginationMixin:
+    """
+    DataTables sends draw with every request and is paged by offset as it expects,
+    every other request is paged with MarketDataCursorPagination.
+    """
+
+    _paginator = None
+
+    @property
+    def paginator(self):
+        if self._paginator is None:
+            if "draw" in self.request.query_params:
+                self._paginator = DataTablesServerSidePagination()
+            else:
+                self._paginator = MarketDataCursorPagination()
+        return self._paginator
+
+
 class LatestItemMarketDataEventViewSet(
-    mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet
+    MarketDataPaginationMixin,
+    DeltaSyncMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    GenericViewSet,
 ):
     pagination_class = DataTablesServerSidePagination
     permission_classes = [HasGooseToolsPerm.of(BASIC_ACCESS)]
-    searchable_fields = [
-        "item__name",
-        "time",
-        "item__eve_echoes_market_id",
-        "event__unique_user_id",
-    ]
+    # Covers the item name and market id, the time and the unique user id.
+    search_vector_field = "search_vector"
     orderable_fields = {
         "event.time": "time",
         "event.item": "item__name",
@@ -100,13 +253,33 @@ class LatestItemMarketDataEventViewSet(
 
     serializer_class = LatestItemMarketDataEventSerializer
     queryset = LatestItemMarketDataEvent.objects.all()
+    delta_key = "item_id"
 
-    def get_queryset(self):
+    def get_pricelist(self):
         pricelist_id = self.request.GET.get("pricelist_id", None)
         if pricelist_id is None:
-            pricelist = DataSet.objects.get(default=True)
-        else:
-            pricelist = DataSet.objects.get(id=pricelist_id)
+            return DataSet.objects.get(default=True)
+        return DataSet.objects.get(id=pricelist_id)
+
+    def deleted_since(self, since, until, limit):
+        # Deleting an item deletes its latest prices without a tombstone of their own.
+        deleted = list(
+            LatestItemMarketDataEventTombstone.objects.filter(
+                price_list=self.get_pricelist(),
+                change_seq__gt=since,
+                change_seq__lte=until,
+            )
+            .order_by("change_seq")
+            .values_list("change_seq", "item_id")[:limit]
+        ) + list(
+            ItemTombstone.objects.filter(change_seq__gt=since, change_seq__lte=until)
+            .order_by("change_seq")
+            .values_list("change_seq", "item_id")[:limit]
+        )
+        return sorted(deleted)[:limit]
+
+    def get_queryset(self):
+        pricelist = self.get_pricelist()
 
         query_dict = {"price_list": pricelist}
 
@@ -139,16 +312,15 @@ def _searchable(f):
 
 
 class ItemMarketDataEventViewSet(
-    mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet
+    MarketDataPaginationMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    GenericViewSet,
 ):
     pagination_class = DataTablesServerSidePagination
     permission_classes = [HasGooseToolsPerm.of(BASIC_ACCESS)]
-    searchable_fields = [
-        "item__name",
-        "time",
-        "item__eve_echoes_market_id",
-        "unique_user_id",
-    ]
+    # Covers the item name and market id, the time and the unique user id.
+    search_vector_field = "search_vector"
     orderable_fields = {
         "time": "time",
         "item": "item__name",
@@ -1,9 +1,21 @@
 from django.contrib import admin
 from django_tenants.admin import TenantAdminMixin
 
-from goosetools.tenants.models import Client
+from goosetools.tenants.models import Client, TenantCronRun
 
 
 @admin.register(Client)
 class ClientAdmin(TenantAdminMixin, admin.ModelAdmin):
     list_display = ("name", "paid_until")
+
+
+@admin.register(TenantCronRun)
+class TenantCronRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "cron_code",
+        "tenant",
+        "started_at",
+        "duration_seconds",
+        "succeeded",
+    )
+    list_filter = ("cron_code", "succeeded", "tenant")
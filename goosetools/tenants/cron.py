@@ -0,0 +1,178 @@
+import io
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django_cron import CronJobBase
+from django_tenants.utils import tenant_context
+
+from goosetools.tenants.models import Client, TenantCronRun
+from goosetools.utils import cron_header_line
+
+
+class _ThreadOutput(io.TextIOBase):
+    """
+    Replaces sys.stdout while tenants are being run so everything a thread prints
+    for its tenant goes into that tenants buffer instead of being interleaved with
+    the output of the other tenants.
+    """
+
+    def __init__(self, stdout):
+        super().__init__()
+        self.stdout = stdout
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "buffer", None) or self.stdout
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+
+@contextmanager
+def _captured_output():
+    if isinstance(sys.stdout, _ThreadOutput):
+        yield sys.stdout
+        return
+    output = _ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        yield output
+    finally:
+        sys.stdout = output.stdout
+
+
+def cron_tenants(schema_names: Optional[Iterable[str]] = None) -> List[Client]:
+    """
+    The tenants a cron runs for, only those with the given schema names when any
+    are given or otherwise configured by CRON_TENANTS.
+    """
+    if not schema_names:
+        schema_names = settings.CRON_TENANTS
+    tenants = Client.objects.exclude(name="public").order_by("id")
+    if schema_names:
+        tenants = tenants.filter(schema_name__in=list(schema_names))
+    return list(tenants)
+
+
+def _run_for_tenant(code, func, tenant, output, close_connections):
+    buffer = io.StringIO()
+    output.local.buffer = buffer
+    started_at = timezone.now()
+    start = time.monotonic()
+    error = ""
+    try:
+        with tenant_context(tenant):
+            result = func(tenant)
+            if result is not None:
+                print(result)
+    except Exception:  # pylint: disable=broad-except
+        error = traceback.format_exc()
+    finally:
+        output.local.buffer = None
+    try:
+        return TenantCronRun.objects.create(
+            cron_code=code,
+            tenant=tenant,
+            started_at=started_at,
+            duration_seconds=time.monotonic() - start,
+            succeeded=not error,
+            output=buffer.getvalue(),
+            error=error,
+        )
+    finally:
+        if close_connections:
+            connections.close_all()
+
+
+def run_for_tenants(
+    code: str,
+    func: Callable[[Client], Optional[str]],
+    schema_names: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+) -> List[TenantCronRun]:
+    """
+    Calls func inside the schema of every tenant, up to CRON_TENANT_WORKERS tenants
+    at once each in their own thread and so with their own database connection.
+
+    A tenant failing does not stop the others from running. Each tenants output,
+    outcome and timing is printed once it finishes and kept as a TenantCronRun,
+    anything func returns is printed along with its output.
+    """
+    if workers is None:
+        workers = settings.CRON_TENANT_WORKERS
+    tenants = cron_tenants(schema_names)
+    TenantCronRun.objects.filter(
+        cron_code=code,
+        started_at__lt=timezone.now()
+        - timezone.timedelta(days=settings.CRON_TENANT_RUN_RETENTION_DAYS),
+    ).delete()
+    runs = []
+    with _captured_output() as output:
+        if workers <= 1 or len(tenants) <= 1:
+            for tenant in tenants:
+                runs.append(_run_for_tenant(code, func, tenant, output, False))
+                _print_run(runs[-1], output.stdout)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_run_for_tenant, code, func, tenant, output, True)
+                    for tenant in tenants
+                ]
+                for future in futures:
+                    runs.append(future.result())
+                    _print_run(runs[-1], output.stdout)
+    failed = [run.tenant.name for run in runs if not run.succeeded]
+    print(
+        f"Ran {code} for {len(runs)} tenants, {len(failed)} failed"
+        + (f": {', '.join(failed)}" if failed else ".")
+    )
+    return runs
+
+
+def _print_run(run, stdout):
+    outcome = "succeeded" if run.succeeded else "FAILED"
+    stdout.write(
+        f"====== {run.tenant.name} {outcome} in {run.duration_seconds:.2f}s ======\n"
+    )
+    stdout.write(run.output)
+    stdout.write(run.error)
+    stdout.flush()
+
+
+class TenantCronJob(CronJobBase):
+    """
+    A cron which does the same thing in every tenant. prepare is run once first, for
+    work shared by every tenant like downloading data, and the tenants are skipped
+    entirely when it returns False. run_for_tenant is then run inside each tenant by
+    run_for_tenants.
+
+    schema_names and workers are set by `manage.py run_tenant_crons` to run a cron
+    for only some tenants or with a different number of workers.
+    """
+
+    schema_names: Optional[List[str]] = None
+    workers: Optional[int] = None
+
+    def prepare(self) -> bool:
+        return True
+
+    def run_for_tenant(self, tenant: Client) -> Optional[str]:
+        raise NotImplementedError()
+
+    def do(self):
+        cron_header_line(self.code)
+        if self.prepare():
+            run_for_tenants(
+                self.code, self.run_for_tenant, self.schema_names, self.workers
+            )
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from goosetools.tenants.cron import TenantCronJob
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = "run_tenant_crons"
+    help = (
+        "Runs the given crons straight away, ignoring their schedules, optionally for "
+        "only some tenants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "codes",
+            nargs="*",
+            help="The codes of the crons to run, such as fleets.repeat_groups, or "
+            "every cron when none are given.",
+        )
+        parser.add_argument(
+            "--tenants",
+            action="store",
+            nargs="*",
+            help="Only run for these tenant schema names.",
+        )
+        parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            help="How many tenants to run each cron for at once.",
+        )
+
+    def handle(self, *args, **options):
+        crons = {}
+        for cron_class_path in settings.CRON_CLASSES:
+            cron_class = import_string(cron_class_path)
+            if issubclass(cron_class, TenantCronJob):
+                crons[cron_class.code] = cron_class
+        codes = options["codes"] or list(crons.keys())
+        unknown = [code for code in codes if code not in crons]
+        if unknown:
+            raise CommandError(
+                f"Unknown crons {', '.join(unknown)}, expected one of "
+                f"{', '.join(crons.keys())}"
+            )
+        for code in codes:
+            cron = crons[code]()
+            cron.schema_names = options["tenants"]
+            cron.workers = options["workers"]
+            cron.do()
@@ -0,0 +1,47 @@
+# Generated by Django 3.1.4 on 2021-08-30 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0006_auto_20210515_0919"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantCronRun",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cron_code", models.TextField()),
+                ("started_at", models.DateTimeField()),
+                ("duration_seconds", models.FloatField()),
+                ("succeeded", models.BooleanField()),
+                ("output", models.TextField(blank=True, default="")),
+                ("error", models.TextField(blank=True, default="")),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="tenants.client",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="tenantcronrun",
+            index=models.Index(
+                fields=["cron_code", "started_at"], name="tenantcronrun_code_idx"
+            ),
+        ),
+    ]
@@ -84,3 +84,29 @@ class Client(TenantMixin):
 
 class Domain(DomainMixin):
     pass
+
+
+class TenantCronRun(models.Model):
+    """
+    How long a cron took for one tenant and whether it succeeded, written by
+    goosetools.tenants.cron.run_for_tenants for every tenant it runs a cron in.
+    """
+
+    cron_code = models.TextField()
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    started_at = models.DateTimeField()
+    duration_seconds = models.FloatField()
+    succeeded = models.BooleanField()
+    output = models.TextField(blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        outcome = "succeeded" if self.succeeded else "failed"
+        return f"{self.cron_code} for {self.tenant.name} {outcome} at {self.started_at}"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["cron_code", "started_at"], name="tenantcronrun_code_idx"
+            )
+        ]
@@ -0,0 +1,56 @@
+from django_cron import Schedule
+
+from goosetools.tenants.cron import TenantCronJob, run_for_tenants
+from goosetools.tenants.models import TenantCronRun
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+from goosetools.users.models import GooseUser
+
+
+class CountUsers(TenantCronJob):
+    schedule = Schedule(run_every_mins=1)
+    code = "tests.count_users"
+    skip = False
+
+    def prepare(self):
+        return not self.skip
+
+    def run_for_tenant(self, tenant):
+        return f"{GooseUser.objects.count()} users"
+
+
+class TenantCronTestCase(GooseToolsTestCase):
+    def test_records_the_output_of_each_tenant(self):
+        CountUsers().do()
+
+        run = TenantCronRun.objects.get(cron_code="tests.count_users")
+        self.assertEqual(run.tenant, self.tenant)
+        self.assertTrue(run.succeeded)
+        self.assertEqual(run.output, f"{GooseUser.objects.count()} users\n")
+        self.assertEqual(run.error, "")
+
+    def test_a_failing_tenant_is_recorded_instead_of_raised(self):
+        def fail(tenant):
+            print(f"Failing {tenant.schema_name}")
+            raise Exception("Broken tenant")
+
+        runs = run_for_tenants("tests.fail", fail)
+
+        self.assertEqual(len(runs), 1)
+        run = TenantCronRun.objects.get(cron_code="tests.fail")
+        self.assertFalse(run.succeeded)
+        self.assertEqual(run.output, f"Failing {self.tenant.schema_name}\n")
+        self.assertIn("Broken tenant", run.error)
+
+    def test_only_runs_for_the_given_tenants(self):
+        cron = CountUsers()
+        cron.schema_names = ["not_a_tenant"]
+        cron.do()
+
+        self.assertFalse(TenantCronRun.objects.exists())
+
+    def test_skips_every_tenant_when_prepare_fails(self):
+        cron = CountUsers()
+        cron.skip = True
+        cron.do()
+
+        self.assertFalse(TenantCronRun.objects.exists())
@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Set, Tuple, Union
 from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.messages.api import get_messages
+from django.core.cache import cache
 from django.http.request import HttpRequest
 from django.http.response import HttpResponse
 from django.test.client import MULTIPART_CONTENT, Client
@@ -109,6 +110,8 @@ class DjangoTestCase(FastTenantTestCase):
 
     def setUp(self):
         super().setUp()
+        # Cached identities would otherwise outlive the rows they came from.
+        cache.clear()
         self.client = SubFolderTenantClient(self.tenant)
 
     @staticmethod
@@ -32,6 +32,8 @@ class UsersConfig(AppConfig):
         from django_tenants.migration_executors.base import run_migrations
         from django_tenants.signals import schema_migrated
 
+        # noinspection PyUnresolvedReferences
+        import goosetools.users.signals  # pylint: disable=unused-import
         from goosetools.users.handlers import handle_schema_migrated
 
         schema_migrated.connect(handle_schema_migrated, run_migrations)
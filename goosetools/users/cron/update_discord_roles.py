@@ -3,17 +3,15 @@ import time
 import requests
 from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
-from django_cron import CronJobBase, Schedule
-from django_tenants.utils import tenant_context
+from django_cron import Schedule
 from requests.models import HTTPError
 
-from goosetools.tenants.models import Client
+from goosetools.tenants.cron import TenantCronJob
 from goosetools.users.discord_helpers import (
     merge,
     setup_user_groups_from_discord_guild_roles,
 )
 from goosetools.users.models import DiscordGuild, GooseGroup, GooseUser
-from goosetools.utils import cron_header_line
 
 
 def refresh_from_discord():
@@ -111,22 +109,11 @@ def refresh_from_discord():
         return "Your Discord Connection is Broken, please go to Admin->Discord Settings to fix."
 
 
-def refresh_from_discord_all():
-    output = ""
-    for tenant in Client.objects.all():
-        if tenant.name != "public":
-            with tenant_context(tenant):
-                output = output + f"\n====== CLIENT {tenant.name} =========\n"
-                output = output + refresh_from_discord()
-    return output
-
-
-class UpdateDiscordRoles(CronJobBase):
+class UpdateDiscordRoles(TenantCronJob):
     RUN_EVERY_MINS = 60
 
     schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
     code = "users.update_discord_roles"
 
-    def do(self):
-        cron_header_line(self.code)
-        print(refresh_from_discord_all())
+    def run_for_tenant(self, tenant):
+        return refresh_from_discord()
@@ -108,6 +108,9 @@ class LoginAndApprovedUserMiddleware(AuthenticationMiddleware):
             request.gooseuser = (
                 hasattr(request.user, "gooseuser") and request.user.gooseuser
             )
+            if request.gooseuser:
+                # Every permission check for the rest of the request uses this.
+                request.access_identity = request.gooseuser.access_identity()
 
         if settings.SINGLE_TENANT:
             request.site_prefix = settings.URL_PREFIX
@@ -4,10 +4,11 @@ from typing import List, Union
 
 import requests
 from django.conf import settings
-from django.contrib.postgres.aggregates.general import StringAgg
 from django.contrib.sites.models import Site
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
-from django.db import models
+from django.db import connection, models
+from django.db.models.functions import Coalesce
 from django.http.response import HttpResponseForbidden
 from django.utils import timezone
 from django_comments.models import Comment
@@ -18,6 +19,7 @@ from timezone_field import TimeZoneField
 from goosetools.notifications.notification_types import NOTIFICATION_TYPES
 from goosetools.tenants.models import SiteUser
 from goosetools.user_forms.models import DynamicForm
+from goosetools.utils import bump_cache_version, tenant_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -559,31 +561,29 @@ class GooseUser(models.Model):
             self.status = new_status
             self.save()
 
+    def access_identity(self):
+        """
+        This users AccessIdentity, kept on the instance for the rest of the request
+        and reloaded if it has been invalidated since.
+        """
+        identity = getattr(self, "_access_identity", None)
+        if identity is None or not identity.is_current():
+            identity = AccessIdentity.for_user(self)
+            self._access_identity = identity
+        return identity
+
     def groups(self):
-        return self.groupmember_set.aggregate(
-            groups=StringAgg(
-                "group__name",
-                delimiter=", ",
-            )
-        )["groups"]
+        return ", ".join(self.access_identity().group_names) or None
 
     def has_perm(self, name_or_list: Union[str, List[str]]):
         if isinstance(name_or_list, str):
             perm_list = [name_or_list]
         else:
             perm_list = name_or_list
-        # pylint: disable=no-member
-        return (
-            self.groupmember_set.filter(
-                group__grouppermission__permission__name__in=perm_list
-            ).count()
-            > 0
-        )
+        return not self.access_identity().permission_names.isdisjoint(perm_list)
 
     def has_perm_by_id(self, perm_id: int):
-        return self.groupmember_set.filter(
-            group__grouppermission__permission__id=perm_id
-        ).exists()
+        return perm_id in self.access_identity().permission_ids
 
     def permissions(self):
         return self.groupmember_set.values(
@@ -620,10 +620,10 @@ class GooseUser(models.Model):
         return SUPERUSER_GROUP_NAME in self.groups()
 
     def characters(self):
-        return self.character_set.all()
+        return Character.objects.filter(pk__in=self.access_identity().character_ids)
 
     def in_corp(self, corp):
-        return self.characters().filter(corp=corp).exists()
+        return getattr(corp, "pk", corp) in self.access_identity().corp_ids
 
     def _discord_account(self):
         return self.site_user.socialaccount_set.get(provider="discord")
@@ -951,6 +951,155 @@ class PermissibleEntity(models.Model):
         ordering = ["order"]
 
 
+class AccessIdentity:
+    """
+    Everything about a user that permission checks need: their permissions,
+    groups, corps and characters. It is loaded in one query and then cached across
+    requests until GroupMember, GroupPermission or Character rows change, see
+    goosetools.users.signals.
+    """
+
+    def __init__(
+        self,
+        user_id,
+        permission_ids,
+        permission_names,
+        group_names,
+        corp_ids,
+        character_ids,
+        version=None,
+    ):
+        self.user_id = user_id
+        self.permission_ids = set(permission_ids)
+        self.permission_names = set(permission_names)
+        self.group_names = list(group_names)
+        self.corp_ids = set(corp_ids)
+        self.character_ids = list(character_ids)
+        self.version = version
+
+    @staticmethod
+    def _version_keys(user_id):
+        return (
+            tenant_cache_key("access_identity_version"),
+            tenant_cache_key("access_identity_version", user_id),
+        )
+
+    @staticmethod
+    def _current_version(user_id):
+        keys = AccessIdentity._version_keys(user_id)
+        versions = cache.get_many(keys)
+        return tuple(versions.get(key, 0) for key in keys)
+
+    @staticmethod
+    def invalidate(user_id=None):
+        """
+        Invalidates one users cached identity, or everyones if no user is given.
+        """
+        tenant_key, user_key = AccessIdentity._version_keys(user_id)
+        bump_cache_version(tenant_key if user_id is None else user_key)
+
+    def is_current(self):
+        return self.version == AccessIdentity._current_version(self.user_id)
+
+    @staticmethod
+    def for_user(gooseuser):
+        version = AccessIdentity._current_version(gooseuser.id)
+        key = tenant_cache_key("access_identity", gooseuser.id)
+        identity = cache.get(key)
+        if identity is None or identity.version != version:
+            identity = AccessIdentity.load(gooseuser.id, version)
+            cache.set(key, identity, settings.ACCESS_IDENTITY_CACHE_SECONDS)
+        return identity
+
+    @staticmethod
+    def load(user_id, version=None):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    ARRAY(
+                        SELECT DISTINCT p.id FROM users_groupmember gm
+                        JOIN users_grouppermission gp ON gp.group_id = gm.group_id
+                        JOIN users_goosepermission p ON p.id = gp.permission_id
+                        WHERE gm.user_id = %(user_id)s
+                    ),
+                    ARRAY(
+                        SELECT DISTINCT p.name FROM users_groupmember gm
+                        JOIN users_grouppermission gp ON gp.group_id = gm.group_id
+                        JOIN users_goosepermission p ON p.id = gp.permission_id
+                        WHERE gm.user_id = %(user_id)s
+                    ),
+                    ARRAY(
+                        SELECT g.name FROM users_groupmember gm
+                        JOIN users_goosegroup g ON g.id = gm.group_id
+                        WHERE gm.user_id = %(user_id)s
+                        ORDER BY gm.id
+                    ),
+                    ARRAY(
+                        SELECT DISTINCT corp_id FROM users_character
+                        WHERE user_id = %(user_id)s
+                    ),
+                    ARRAY(
+                        SELECT id FROM users_character
+                        WHERE user_id = %(user_id)s ORDER BY id
+                    )
+                """,
+                {"user_id": user_id},
+            )
+            return AccessIdentity(user_id, *cursor.fetchone(), version=version)
+
+    def matching_entities_q(self):
+        return (
+            (models.Q(user__isnull=True) | models.Q(user_id=self.user_id))
+            & (models.Q(corp__isnull=True) | models.Q(corp_id__in=self.corp_ids))
+            & (
+                models.Q(permission__isnull=True)
+                | models.Q(permission_id__in=self.permission_ids)
+            )
+        )
+
+
+class CrudAccessControllerQuerySet(models.QuerySet):
+    def allowing(self, identity: AccessIdentity, func: str):
+        """
+        The controllers which let the identity do func, one of can_admin, can_edit,
+        can_view, can_use or can_delete, with the same rules as
+        CrudAccessController._can_do: the highest order matching entity wins, a deny
+        beats an allow of the same order and admins can do everything.
+        """
+        levels = self._levels(identity, "can_admin")
+        allowed = models.Q(can_admin_allow__gt=models.F("can_admin_deny"))
+        if func != "can_admin":
+            levels.update(self._levels(identity, func))
+            allowed |= models.Q(**{f"{func}_allow__gt": models.F(f"{func}_deny")})
+        return self.annotate(**levels).filter(allowed)
+
+    @staticmethod
+    def _levels(identity: AccessIdentity, func: str):
+        # The reverse relation from PermissibleEntity shares its name with func.
+        entities = (
+            PermissibleEntity.objects.filter(identity.matching_entities_q())
+            .filter(**{func: models.OuterRef("pk")})
+            .order_by()
+            .values(func)
+        )
+
+        def max_order(allow_or_deny, default):
+            return Coalesce(
+                models.Subquery(
+                    entities.filter(allow_or_deny=allow_or_deny)
+                    .annotate(max_order=models.Max("order"))
+                    .values("max_order")
+                ),
+                default,
+            )
+
+        return {
+            f"{func}_allow": max_order(True, -2),
+            f"{func}_deny": max_order(False, -1),
+        }
+
+
 class CrudAccessController(models.Model):
     adminable_by = models.ManyToManyField(PermissibleEntity, related_name="can_admin")
     editable_by = models.ManyToManyField(PermissibleEntity, related_name="can_edit")
@@ -958,6 +1107,8 @@ class CrudAccessController(models.Model):
     usable_by = models.ManyToManyField(PermissibleEntity, related_name="can_use")
     deletable_by = models.ManyToManyField(PermissibleEntity, related_name="can_delete")
 
+    objects = CrudAccessControllerQuerySet.as_manager()
+
     def ordered_adminable_by(self):
         return self.adminable_by.order_by("order")
 
@@ -975,11 +1126,7 @@ class CrudAccessController(models.Model):
 
     @staticmethod
     def make_permissions_id_cache(gooseuser):
-        return set(
-            gooseuser.groupmember_set.values_list(
-                "group__grouppermission__permission__id", flat=True
-            )
-        )
+        return gooseuser.access_identity().permission_ids
 
     def can_admin(self, gooseuser, permissions_id_cache=None, strict=False):
         return self._can_do(
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from goosetools.users.models import (
+    AccessIdentity,
+    Character,
+    GooseGroup,
+    GoosePermission,
+    GroupMember,
+    GroupPermission,
+)
+
+
+def _user_id(instance):
+    # Read from __dict__ so a deferred field is not loaded just to remember it.
+    return instance.__dict__.get("user_id")
+
+
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_init, sender=GroupMember)
+@receiver(post_init, sender=Character)
+def user_identity_loaded(sender, instance, **kwargs):
+    instance._identity_user_id = _user_id(instance)
+
+
+# Moving a character or group membership to another user changes the identity of the
+# user it came from as well.
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_save, sender=GroupMember)
+@receiver(post_delete, sender=GroupMember)
+@receiver(post_save, sender=Character)
+@receiver(post_delete, sender=Character)
+def user_identity_changed(sender, instance, **kwargs):
+    AccessIdentity.invalidate(instance.user_id)
+    if instance._identity_user_id not in (None, instance.user_id):
+        AccessIdentity.invalidate(instance._identity_user_id)
+    instance._identity_user_id = _user_id(instance)
+
+
+# A group or permission change can affect any number of users so every identity in
+# the tenant is invalidated.
+# noinspection PyUnusedLocal
+# pylint: disable=unused-argument
+@receiver(post_save, sender=GroupPermission)
+@receiver(post_delete, sender=GroupPermission)
+@receiver(post_save, sender=GooseGroup)
+@receiver(post_delete, sender=GooseGroup)
+@receiver(post_save, sender=GoosePermission)
+@receiver(post_delete, sender=GoosePermission)
+def identities_changed(sender, instance, **kwargs):
+    AccessIdentity.invalidate()
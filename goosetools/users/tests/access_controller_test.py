@@ -0,0 +1,123 @@
+import random
+
+from goosetools.tenants.models import SiteUser
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+from goosetools.users.models import (
+    LOOT_TRACKER,
+    USER_ADMIN_PERMISSION,
+    Character,
+    Corp,
+    CrudAccessController,
+    GoosePermission,
+    GooseUser,
+    PermissibleEntity,
+)
+
+FUNCS = ["can_admin", "can_edit", "can_view", "can_use", "can_delete"]
+RELATIONS = {
+    "can_admin": "adminable_by",
+    "can_edit": "editable_by",
+    "can_view": "viewable_by",
+    "can_use": "usable_by",
+    "can_delete": "deletable_by",
+}
+
+
+class AccessControllerResolverTest(GooseToolsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.give_group(self.user_admin_group)
+        self.other_corp = Corp.objects.create(name="Other Corp")
+        Character.objects.create(
+            user=self.other_user, ingame_name="Other Corp Char", corp=self.other_corp
+        )
+        self.no_access_user = GooseUser.objects.create(
+            site_user=SiteUser.create("No Access User#1234"), status="approved"
+        )
+        self.users = [self.user, self.other_user, self.no_access_user]
+        self.corps = [self.corp, self.other_corp]
+        self.permissions = list(
+            GoosePermission.objects.filter(
+                name__in=[LOOT_TRACKER, USER_ADMIN_PERMISSION]
+            )
+        )
+
+    def a_random_entity(self, rng):
+        entity = PermissibleEntity.objects.create(
+            user=rng.choice(self.users + [None]),
+            corp=rng.choice(self.corps + [None]),
+            permission=rng.choice(self.permissions + [None]),
+            allow_or_deny=rng.random() < 0.6,
+        )
+        # Mostly use the real levels but sometimes a small shared order so allows
+        # and denies of the same order get tested.
+        if rng.random() < 0.7:
+            entity.reset_order_to_level()
+        else:
+            entity.order = rng.randint(0, 3)
+        entity.save()
+        return entity
+
+    def a_random_controller(self, rng):
+        controller = CrudAccessController.objects.create()
+        for relation in RELATIONS.values():
+            for _ in range(rng.randint(0, 4)):
+                getattr(controller, relation).add(self.a_random_entity(rng))
+        return controller
+
+    def assert_resolver_matches_python(self, controllers):
+        for user in self.users:
+            identity = user.access_identity()
+            for func in FUNCS:
+                expected = {c.id for c in controllers if getattr(c, func)(user)}
+                resolved = set(
+                    CrudAccessController.objects.allowing(identity, func).values_list(
+                        "id", flat=True
+                    )
+                )
+                self.assertEqual(resolved, expected, f"{user} {func}")
+
+    def test_resolver_agrees_with_python_checks_for_random_controllers(self):
+        for seed in range(5):
+            rng = random.Random(seed)
+            controllers = [self.a_random_controller(rng) for _ in range(20)]
+            self.assert_resolver_matches_python(controllers)
+
+    def test_deny_overrides_an_allow_of_the_same_level(self):
+        controller = CrudAccessController.objects.create()
+        allow = PermissibleEntity.allow_user(self.user)
+        allow.reset_order_to_level()
+        allow.save()
+        deny = PermissibleEntity(user=self.user, allow_or_deny=False, order=allow.order)
+        deny.save()
+        controller.viewable_by.add(allow, deny)
+
+        self.assertFalse(controller.can_view(self.user))
+        self.assertFalse(
+            CrudAccessController.objects.allowing(
+                self.user.access_identity(), "can_view"
+            )
+            .filter(pk=controller.pk)
+            .exists()
+        )
+
+    def test_admins_can_do_everything(self):
+        controller = CrudAccessController.objects.create()
+        controller.give_admin(self.other_user)
+        identity = self.other_user.access_identity()
+
+        for func in FUNCS:
+            self.assertTrue(
+                CrudAccessController.objects.allowing(identity, func)
+                .filter(pk=controller.pk)
+                .exists()
+            )
+
+    def test_filtering_takes_one_query_however_many_entities(self):
+        rng = random.Random(0)
+        for _ in range(10):
+            self.a_random_controller(rng)
+        identity = self.user.access_identity()
+
+        with self.assertNumQueries(1):
+            list(CrudAccessController.objects.allowing(identity, "can_view"))
@@ -0,0 +1,62 @@
+from goosetools.tests.goosetools_test_case import GooseToolsTestCase
+from goosetools.users.models import (
+    BASIC_ACCESS,
+    LOOT_TRACKER,
+    USER_ADMIN_PERMISSION,
+    AccessIdentity,
+    Character,
+    Corp,
+    GooseUser,
+)
+
+
+class AccessIdentityTest(GooseToolsTestCase):
+    def test_permission_checks_only_query_once(self):
+        AccessIdentity.invalidate(self.user.pk)
+        user = GooseUser.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(user.has_perm(BASIC_ACCESS))
+            self.assertTrue(user.has_perm([USER_ADMIN_PERMISSION, LOOT_TRACKER]))
+            self.assertFalse(user.has_perm(USER_ADMIN_PERMISSION))
+            self.assertTrue(user.in_corp(self.corp))
+            self.assertEqual(user.groups(), "basic_access")
+
+    def test_a_new_request_reuses_the_cached_identity(self):
+        GooseUser.objects.get(pk=self.user.pk).has_perm(BASIC_ACCESS)
+        user = GooseUser.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm(BASIC_ACCESS))
+
+    def test_changing_groups_or_characters_invalidates_the_identity(self):
+        self.assertFalse(self.user.has_perm(USER_ADMIN_PERMISSION))
+        self.user.give_group(self.user_admin_group)
+        self.assertTrue(self.user.has_perm(USER_ADMIN_PERMISSION))
+
+        self.basic_access_group.link_permission(USER_ADMIN_PERMISSION)
+        self.assertTrue(self.other_user.has_perm(USER_ADMIN_PERMISSION))
+
+        other_corp = Corp.objects.create(name="Other Corp")
+        self.assertFalse(self.user.in_corp(other_corp))
+        Character.objects.create(
+            user=self.user, ingame_name="Other Corp Char", corp=other_corp
+        )
+        self.assertTrue(self.user.in_corp(other_corp))
+        self.assertEqual(self.user.characters().count(), 2)
+
+    def test_moving_a_character_invalidates_the_identity_it_came_from(self):
+        other_corp = Corp.objects.create(name="Other Corp")
+        char = Character.objects.create(
+            user=self.user, ingame_name="Other Corp Char", corp=other_corp
+        )
+        self.assertTrue(self.user.in_corp(other_corp))
+
+        char = Character.objects.get(pk=char.pk)
+        char.user = self.other_user
+        char.save()
+
+        self.assertFalse(GooseUser.objects.get(pk=self.user.pk).in_corp(other_corp))
+        self.assertTrue(
+            GooseUser.objects.get(pk=self.other_user.pk).in_corp(other_corp)
+        )
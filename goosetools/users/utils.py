@@ -9,25 +9,20 @@ from goosetools.users.models import CrudAccessController
 logger = logging.getLogger(__name__)
 
 
-def filter_controlled_qs_by(controllable_qs, func, request, return_as_qs=False):
-    controllable_qs = controllable_qs.select_related(
-        "access_controller"
-    ).prefetch_related(
-        "access_controller__viewable_by",
-        "access_controller__adminable_by",
-    )
-    valid_items = []
-    permissions_id_cache = CrudAccessController.make_permissions_id_cache(
-        request.gooseuser
+def allowed_controllers(func, request):
+    return CrudAccessController.objects.allowing(
+        request.gooseuser.access_identity(), func
     )
-    for f in controllable_qs.all():
-        if getattr(f.access_controller, func)(request.gooseuser, permissions_id_cache):
-            valid_items.append(f)
 
+
+def filter_controlled_qs_by(controllable_qs, func, request, return_as_qs=False):
+    controllable_qs = controllable_qs.select_related("access_controller").filter(
+        access_controller__in=allowed_controllers(func, request).values("pk")
+    )
     if return_as_qs:
-        return controllable_qs.filter(id__in=[v.id for v in valid_items])
+        return controllable_qs
     else:
-        return valid_items
+        return list(controllable_qs)
 
 
 def filter_controlled_qs_to_viewable(controllable_qs, request, return_as_qs=False):
@@ -48,7 +43,11 @@ def can_view(clazz):
         @wraps(function)
         def wrap(request, pk, *args, **kwargs):
             f = get_object_or_404(clazz, pk=pk)
-            if f.access_controller.can_view(request.gooseuser):
+            if (
+                allowed_controllers("can_view", request)
+                .filter(pk=f.access_controller_id)
+                .exists()
+            ):
                 return function(request, pk, *args, **kwargs)
             return HttpResponseForbidden()
 
@@ -67,7 +66,11 @@ def can_admin(clazz):
         @wraps(function)
         def wrap(request, pk, *args, **kwargs):
             f = get_object_or_404(clazz, pk=pk)
-            if f.access_controller.can_admin(request.gooseuser):
+            if (
+                allowed_controllers("can_admin", request)
+                .filter(pk=f.access_controller_id)
+                .exists()
+            ):
                 return function(request, pk, *args, **kwargs)
             return HttpResponseForbidden()
 
@@ -86,7 +89,11 @@ def can_edit(clazz):
         @wraps(function)
         def wrap(request, pk, *args, **kwargs):
             f = get_object_or_404(clazz, pk=pk)
-            if f.access_controller.can_edit(request.gooseuser):
+            if (
+                allowed_controllers("can_edit", request)
+                .filter(pk=f.access_controller_id)
+                .exists()
+            ):
                 return function(request, pk, *args, **kwargs)
             return HttpResponseForbidden()
 
@@ -105,7 +112,11 @@ def can_delete(clazz):
         @wraps(function)
         def wrap(request, pk, *args, **kwargs):
             f = get_object_or_404(clazz, pk=pk)
-            if f.access_controller.can_delete(request.gooseuser):
+            if (
+                allowed_controllers("can_delete", request)
+                .filter(pk=f.access_controller_id)
+                .exists()
+            ):
                 return function(request, pk, *args, **kwargs)
             return HttpResponseForbidden()
 
@@ -124,7 +135,11 @@ def can_use(clazz):
         @wraps(function)
         def wrap(request, pk, *args, **kwargs):
             f = get_object_or_404(clazz, pk=pk)
-            if f.access_controller.can_use(request.gooseuser):
+            if (
+                allowed_controllers("can_use", request)
+                .filter(pk=f.access_controller_id)
+                .exists()
+            ):
                 return function(request, pk, *args, **kwargs)
             return HttpResponseForbidden()
 
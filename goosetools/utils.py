@@ -1,3 +1,10 @@
+import json
+import zlib
+from functools import partial
+from typing import Iterable, Iterator, Tuple, Union
+
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.utils import timezone
 
 
@@ -12,3 +19,58 @@ class PassRequestToFormViewMixin:
         kwargs = super().get_form_kwargs()
         kwargs["request"] = self.request
         return kwargs
+
+
+def tenant_cache_key(*parts):
+    return ":".join(str(part) for part in (connection.schema_name,) + parts)
+
+
+def _incr_cache_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def bump_cache_version(key):
+    """
+    Bumps a version number which cache keys include so everything cached under the
+    old version is ignored. It is bumped again once the current transaction commits
+    in case another request cached data before the change was visible to it.
+    """
+    _incr_cache_version(key)
+    transaction.on_commit(partial(_incr_cache_version, key))
+
+
+def estimated_count(queryset, exact_below: int = 1000) -> Tuple[int, bool]:
+    """
+    Counts a queryset exactly when it has fewer than exact_below rows, which costs at
+    most reading that many rows. Otherwise returns Postgres's estimate of how many
+    rows it has, so counting costs the same however large the table grows. Returns
+    the count and whether it is exact.
+    """
+    queryset = queryset.order_by()
+    count = queryset[:exact_below].count()
+    if count < exact_below:
+        return count, True
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(int(plan[0]["Plan"]["Plan Rows"]), exact_below), False
+
+
+def gzip_chunks(chunks: Iterable[Union[str, bytes]]) -> Iterator[bytes]:
+    """
+    Gzips a stream of chunks as they are produced, for streaming responses.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()